@@ -1,23 +1,39 @@
+import argparse
 import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # --- CONFIGURATION ---
 JSON_FILE_PATH = Path("resume_data.json")
 OUTPUT_MARKDOWN_PATH = Path("generated_resume.md")
+
+# Batch mode settings (used with --batch)
+BATCH_OUTPUT_DIR = Path("generated_resumes")
+BATCH_WORKERS = os.cpu_count() or 1
+# How many records each worker may have queued at once. This keeps memory
+# flat no matter how many profiles are in the input.
+BATCH_QUEUE_PER_WORKER = 8
 # ---------------------
 
 def generate_resume_md(resume_data: dict) -> str:
     """
     Generates the full resume content in Markdown format from a dictionary.
+    The pieces are collected in a list and joined once at the end, so the cost
+    grows linearly with the size of the resume.
     """
+    parts = []
     
     # --- Header with Personal Info ---
     name = resume_data.get("name", "Your Name")
     title = resume_data.get("title", "Your Title")
     contact = resume_data.get("contact", {})
     
-    md_content = f"# {name}\n"
-    md_content += f"## {title}\n\n"
+    parts.append(f"# {name}\n")
+    parts.append(f"## {title}\n\n")
     
     contact_info = []
     if "email" in contact:
@@ -27,28 +43,140 @@ def generate_resume_md(resume_data: dict) -> str:
     if "github" in contact:
         contact_info.append(f"**GitHub:** {contact['github']}")
     
-    md_content += " | ".join(contact_info) + "\n\n"
+    parts.append(" | ".join(contact_info) + "\n\n")
     
     # --- Summary Section ---
     if "summary" in resume_data:
-        md_content += f"## Summary\n"
-        md_content += f"{resume_data['summary']}\n\n"
+        parts.append("## Summary\n")
+        parts.append(f"{resume_data['summary']}\n\n")
 
     # --- Work Experience Section ---
-    md_content += "## Work Experience\n"
+    parts.append("## Work Experience\n")
     for job in resume_data.get("experience", []):
-        md_content += f"### {job.get('title')} at {job.get('company')}\n"
-        md_content += f"*{job.get('dates')}*\n\n"
+        parts.append(f"### {job.get('title')} at {job.get('company')}\n")
+        parts.append(f"*{job.get('dates')}*\n\n")
         for accomplishment in job.get("accomplishments", []):
-            md_content += f"- {accomplishment}\n"
-        md_content += "\n"
+            parts.append(f"- {accomplishment}\n")
+        parts.append("\n")
         
     # --- Skills Section ---
     if "skills" in resume_data:
-        md_content += "## Skills\n"
-        md_content += ", ".join(resume_data.get("skills", [])) + "\n"
+        parts.append("## Skills\n")
+        parts.append(", ".join(resume_data.get("skills", [])) + "\n")
+
+    return "".join(parts)
+
+def _slugify(text: str) -> str:
+    """Turns a name into something safe to use in a file name."""
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    return slug or "resume"
+
+def iter_batch_jobs(source: Path):
+    """
+    Yields (job_id, kind, payload) tuples for every profile in the source,
+    without loading the whole source into memory.
+    A directory yields one job per '*.json' file; any other file is read as
+    JSON Lines, one profile per line.
+    """
+    if source.is_dir():
+        for json_path in sorted(source.glob("*.json")):
+            yield json_path.stem, "file", str(json_path)
+        return
+
+    with source.open("r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                yield f"{line_number:06d}", "line", line
+
+def render_batch_record(job: tuple, output_dir: str) -> tuple:
+    """
+    Renders one profile and writes it straight to disk. Runs inside a worker
+    process, so only a small status tuple travels back to the parent.
+    Returns (job_id, output_path or None, seconds, error message or None).
+    """
+    job_id, kind, payload = job
+    started = time.perf_counter()
+    try:
+        if kind == "file":
+            with open(payload, "r", encoding="utf-8") as f:
+                cv_data = json.load(f)
+            file_name = f"{job_id}.md"
+        else:
+            cv_data = json.loads(payload)
+            file_name = f"{job_id}-{_slugify(str(cv_data.get('name', '')))}.md"
 
-    return md_content
+        output_path = os.path.join(output_dir, file_name)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(generate_resume_md(cv_data))
+        return job_id, output_path, time.perf_counter() - started, None
+    except json.JSONDecodeError as e:
+        return job_id, None, time.perf_counter() - started, f"invalid JSON ({e})"
+    except Exception as e:
+        return job_id, None, time.perf_counter() - started, str(e)
+
+def run_batch(source: Path, output_dir: Path = BATCH_OUTPUT_DIR, workers: int = BATCH_WORKERS) -> dict:
+    """
+    Renders every profile in a directory or JSON Lines file across a process pool.
+    Only a bounded number of records are in flight at any time, and every
+    worker writes its own output file, so memory stays flat for large batches.
+    Returns a small report with counts and throughput.
+    """
+    if not source.exists():
+        print(f"Error: The batch source '{source}' was not found.")
+        return {}
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    max_in_flight = max(1, workers) * BATCH_QUEUE_PER_WORKER
+    rendered = 0
+    failed = 0
+    worker_seconds = 0.0
+    started = time.perf_counter()
+
+    print(f"Rendering resumes from '{source}' with {workers} worker(s)...")
+
+    def collect(future):
+        nonlocal rendered, failed, worker_seconds
+        job_id, _, seconds, error = future.result()
+        worker_seconds += seconds
+        if error:
+            failed += 1
+            print(f"Could not render record '{job_id}'. Error: {error}")
+        else:
+            rendered += 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for job in iter_batch_jobs(source):
+            pending.append(executor.submit(render_batch_record, job, str(output_dir)))
+            if len(pending) >= max_in_flight:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+
+    elapsed = time.perf_counter() - started
+    total = rendered + failed
+    report = {
+        "rendered": rendered,
+        "failed": failed,
+        "elapsed_seconds": elapsed,
+        "records_per_second": total / elapsed if elapsed > 0 else 0.0,
+        "avg_ms_per_record": (worker_seconds / total) * 1000 if total else 0.0,
+    }
+
+    print(f"\n✅ Rendered {rendered} resume(s) into '{output_dir}' ({failed} failed).")
+    print(
+        f"Throughput: {report['records_per_second']:.1f} records/s | "
+        f"{report['avg_ms_per_record']:.2f} ms per record (worker time) | "
+        f"{elapsed:.2f} s total"
+    )
+    return report
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
 
 def main():
     """
@@ -76,4 +204,13 @@ def main():
         print(f"An unexpected error occurred: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate Markdown resumes from JSON data.")
+    parser.add_argument("--batch", type=Path, help="A directory of '*.json' profiles or a JSON Lines file.")
+    parser.add_argument("--output-dir", type=Path, default=BATCH_OUTPUT_DIR, help="Where batch resumes are written.")
+    parser.add_argument("--workers", type=positive_int, default=BATCH_WORKERS, help="Number of worker processes.")
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch(args.batch, args.output_dir, args.workers)
+    else:
+        main()
@@ -1,6 +1,15 @@
+import argparse
+import os
 import platform
+import random
+import re
+import shutil
+import struct
+import tempfile
 import time
-from datetime import datetime as dt
+import zlib
+from bisect import bisect_left
+from datetime import date, datetime as dt, timedelta
 
 # --- CONFIGURATION ---
 # Determine the hosts file path based on the operating system
@@ -14,79 +23,617 @@ HOSTS_PATH = (
 
 REDIRECT_IP = "127.0.0.1"
 
-# List of websites you want to block
+# List of websites you want to block. Each entry covers the site and all of its
+# subdomains, and the 'www.' variant is added to the hosts file automatically.
 SITES_TO_BLOCK = [
-    "www.facebook.com", "facebook.com",
-    "www.twitter.com", "twitter.com",
-    "www.instagram.com", "instagram.com",
-    "www.youtube.com", "youtube.com",
-    "www.tiktok.com", "tiktok.com"
+    "facebook.com",
+    "twitter.com",
+    "instagram.com",
+    "youtube.com",
+    "tiktok.com",
 ]
 
+# Optional local blocklists to merge in. Hosts-file ("0.0.0.0 example.com"),
+# plain-domain ("example.com") and adblock ("||example.com^") lines are all understood.
+BLOCKLIST_FILES = []
+
+# Where the compiled blocklist is cached. It is rebuilt only when a blocklist file changes.
+BLOCKLIST_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blocklist.bin")
+
 # Set the working hours (e.g., from 9 AM to 5 PM)
 START_HOUR = 9
 END_HOUR = 17
+
+# Focus windows per weekday (0 = Monday ... 6 = Sunday), as "HH:MM" pairs.
+# A day can have several windows, and "24:00" means midnight at the end of the day.
+# A window whose end is before its start (e.g. ("22:00", "02:00")) runs past midnight
+# into the next day; it belongs to the day it starts on, also for HOLIDAYS.
+# Days that are missing have no focus time. By default every day uses the working hours above.
+FOCUS_SCHEDULE = {
+    weekday: [(f"{START_HOUR:02d}:00", f"{END_HOUR:02d}:00")] for weekday in range(7)
+}
+# Example:
+# FOCUS_SCHEDULE = {
+#     0: [("09:00", "12:00"), ("13:00", "17:30")],
+#     4: [("09:00", "13:00")],
+# }
+
+# Dates (YYYY-MM-DD) with no focus time at all
+HOLIDAYS = []
+
+# Longest single sleep, in seconds. The scheduler wakes up at least this often
+# to recompute the next transition (e.g. after the machine was suspended) and to
+# re-apply the block, in case a write failed or someone else edited the hosts file.
+MAX_SLEEP_SECONDS = 300
+
+# Markers around the entries this script owns. Everything outside them is left untouched.
+MANAGED_BLOCK_START = "# >>> site-blocker managed block >>>"
+MANAGED_BLOCK_END = "# <<< site-blocker managed block <<<"
 # ---------------------
 
-def block_sites():
+class HostsFile:
+    """
+    A parsed hosts file split into the lines we don't own and a set of the
+    domains inside our managed block. The set gives O(1) lookups, so blocking
+    or unblocking costs the same whether the block holds 10 or 100k domains.
+    """
+
+    def __init__(self, path, text: str = ""):
+        self.path = path
+        self.original_text = text
+        self.outside_lines = []
+        self.managed = set()
+        self._block_index = None  # Where the managed block sits among outside_lines
+        self._parse(text)
+
+    @classmethod
+    def load(cls, path=None) -> "HostsFile":
+        """Reads and parses the hosts file (a missing file counts as empty)."""
+        path = path or HOSTS_PATH
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                return cls(path, file.read())
+        except FileNotFoundError:
+            return cls(path)
+
+    def _parse(self, text: str):
+        inside = False
+        for line in text.splitlines():
+            stripped = line.strip()
+            if stripped == MANAGED_BLOCK_START:
+                inside = True
+                if self._block_index is None:
+                    self._block_index = len(self.outside_lines)
+            elif stripped == MANAGED_BLOCK_END:
+                inside = False
+            elif inside:
+                fields = stripped.split("#", 1)[0].split()
+                # Every host name after the IP belongs to us
+                self.managed.update(host.lower() for host in fields[1:])
+            else:
+                self.outside_lines.append(line)
+
+    def drop_legacy_entries(self, sites):
+        """
+        Removes old-style 'REDIRECT_IP site' lines written outside the managed
+        block by earlier versions of this script. Host names are compared as
+        whole tokens, so 'notfacebook.com' never matches 'facebook.com'.
+        """
+        sites = {site.lower() for site in sites}
+        kept = []
+        for index, line in enumerate(self.outside_lines):
+            fields = line.split("#", 1)[0].split()
+            is_legacy = (
+                len(fields) >= 2
+                and fields[0] == REDIRECT_IP
+                and all(host.lower() in sites for host in fields[1:])
+            )
+            if is_legacy:
+                if self._block_index is not None and index < self._block_index:
+                    self._block_index -= 1
+            else:
+                kept.append(line)
+        removed = len(self.outside_lines) - len(kept)
+        self.outside_lines = kept
+        return removed
+
+    def render(self) -> str:
+        """Builds the full file content, with the managed block in its original place (or at the end)."""
+        lines = list(self.outside_lines)
+        if self.managed:
+            block = [MANAGED_BLOCK_START]
+            block.extend(f"{REDIRECT_IP} {site}" for site in sorted(self.managed))
+            block.append(MANAGED_BLOCK_END)
+            index = len(lines) if self._block_index is None else self._block_index
+            lines[index:index] = block
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def save(self) -> bool:
+        """
+        Writes the file only if its content changed. The new content goes to a
+        temporary file next to the hosts file and is then renamed over it, so
+        readers never see a half-written file.
+        Returns True if the file was rewritten.
+        """
+        new_text = self.render()
+        if new_text == self.original_text:
+            return False
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(prefix=".hosts-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(new_text)
+                file.flush()
+                os.fsync(file.fileno())
+            try:
+                shutil.copymode(self.path, temp_path)
+            except FileNotFoundError:
+                os.chmod(temp_path, 0o644)
+            try:
+                os.replace(temp_path, self.path)
+            except OSError:
+                # Some setups (e.g. a bind-mounted /etc/hosts in containers) can't
+                # be replaced by rename, so fall back to a single in-place write.
+                with open(self.path, "w", encoding="utf-8") as file:
+                    file.write(new_text)
+                os.remove(temp_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.original_text = new_text
+        return True
+
+def block_sites(sites=None, hosts_path=None):
     """
-    Blocks the specified websites by adding entries to the hosts file.
+    Blocks the specified websites by writing them into the managed block of the hosts file.
+    By default that is SITES_TO_BLOCK plus the compiled BLOCKLIST_FILES.
+    Returns True if the hosts file had to be rewritten, False if it was already
+    up to date, and None if it could not be updated.
     """
+    sites = get_sites_to_block() if sites is None else sites
     print("Focus mode activated. Blocking distracting sites...")
     try:
-        with open(HOSTS_PATH, "r+") as file:
-            content = file.read()
-            for site in SITES_TO_BLOCK:
-                if site not in content:
-                    file.write(f"{REDIRECT_IP} {site}\n")
+        hosts = HostsFile.load(hosts_path)
+        wanted = {site.lower() for site in sites}
+        if not hosts.drop_legacy_entries(sites) and hosts.managed == wanted:
+            return False  # Already blocked, nothing to write
+        hosts.managed = wanted
+        return hosts.save()
     except PermissionError:
         print("\nERROR: Permission denied.")
         print("Please run this script with administrator privileges (e.g., using 'sudo').")
         exit()
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
+    return None
 
-def unblock_sites():
+def unblock_sites(sites=None, hosts_path=None):
     """
-    Unblocks the websites by removing the entries from the hosts file.
+    Unblocks the websites by removing the managed block from the hosts file.
+    Returns True if the hosts file had to be rewritten, False if it was already
+    up to date, and None if it could not be updated.
     """
+    sites = get_sites_to_block() if sites is None else sites
     print("Focus mode deactivated. Unblocking sites...")
     try:
-        with open(HOSTS_PATH, "r+") as file:
-            lines = file.readlines()
-            file.seek(0)  # Rewind to the beginning of the file
-            for line in lines:
-                # Write the line back if it doesn't contain any of the blocked sites
-                if not any(site in line for site in SITES_TO_BLOCK):
-                    file.write(line)
-            file.truncate() # Remove any leftover content
+        hosts = HostsFile.load(hosts_path)
+        hosts.drop_legacy_entries(sites)
+        hosts.managed = set()
+        return hosts.save()
     except PermissionError:
         print("\nERROR: Permission denied.")
         print("Please run this script with administrator privileges (e.g., using 'sudo').")
         exit()
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
+    return None
+
+# --- BLOCKLISTS ---
+_DOMAIN_PATTERN = re.compile(r"^(?!-)[a-z0-9_-]{1,63}(?<!-)(\.(?!-)[a-z0-9_-]{1,63}(?<!-))+$")
+_LOCAL_HOSTS = {"localhost", "localhost.localdomain", "local", "broadcasthost", "ip6-localhost", "ip6-loopback"}
+_BLOCKLIST_MAGIC = b"SBTRIE1\n"
+
+def normalize_domain(raw: str):
+    """
+    Lowercases a domain, strips the trailing dot and IDNA-encodes it. Returns None if it isn't
+    valid, including IP addresses and other names whose top-level label is all digits.
+    """
+    domain = raw.strip().strip(".").lower()
+    if not domain or domain in _LOCAL_HOSTS:
+        return None
+    if not domain.isascii():
+        try:
+            domain = domain.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    if len(domain) > 253 or not _DOMAIN_PATTERN.match(domain):
+        return None
+    if domain.rsplit(".", 1)[-1].isdigit():
+        return None  # '0.0.0.0', '127.0.0.1' or '1.2.3' would otherwise end up as rules
+    return domain
+
+def parse_blocklist_line(line: str):
+    """
+    Extracts the domains from one blocklist line, whatever its format:
+    hosts ('0.0.0.0 a.com b.com'), adblock ('||a.com^$third-party') or plain ('a.com').
+    Comments, exceptions and rules that need more than a domain are ignored.
+    """
+    line = line.strip()
+    if not line or line[0] in "#!":
+        return []
+
+    if line.startswith("||"):
+        rule = line[2:].split("$", 1)[0]
+        if not rule.endswith("^"):
+            return []
+        rule = rule[:-1]
+        if any(char in rule for char in "/*^|"):
+            return []  # Path or wildcard rules can't be expressed in a hosts file
+        domain = normalize_domain(rule)
+        return [domain] if domain else []
+    if line.startswith("@@") or "##" in line or line[0] in "[|/":
+        return []
+
+    fields = line.split("#", 1)[0].split()
+    if len(fields) > 1:
+        fields = fields[1:]  # Hosts format: the first field is the IP address
+    domains = (normalize_domain(field) for field in fields)
+    return [domain for domain in domains if domain]
+
+class DomainTrie:
+    """
+    A trie of domain labels stored from the TLD down ('www.example.com' is
+    com -> example -> www). A rule blocks its whole subtree, so adding
+    'example.com' drops 'ads.example.com', and adding 'ads.example.com' after
+    'example.com' is a no-op.
+    """
+
+    _RULE = ""  # Marker key for a node that is itself a rule; never a valid label
+
+    def __init__(self):
+        self.root = {}
+        self.rule_count = 0
+
+    def add(self, domain: str) -> bool:
+        """Adds a rule. Returns False if it was already covered by an existing rule."""
+        node = self.root
+        for label in reversed(domain.split(".")):
+            if self._RULE in node:
+                return False
+            node = node.setdefault(label, {})
+        if self._RULE in node:
+            return False
+        self.rule_count += 1 - self._count_rules(node)
+        node.clear()
+        node[self._RULE] = True
+        return True
+
+    def _count_rules(self, node: dict) -> int:
+        count = 0
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            for label, child in current.items():
+                if label == self._RULE:
+                    count += 1
+                else:
+                    stack.append(child)
+        return count
+
+    def covers(self, host: str) -> bool:
+        """Returns True if the host or one of its parent domains is a rule."""
+        node = self.root
+        for label in reversed(host.lower().strip(".").split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self._RULE in node:
+                return True
+        return False
+
+    def rules(self):
+        """Yields every rule as a reversed domain ('com.example'), in no particular order."""
+        stack = [(self.root, "")]
+        while stack:
+            node, prefix = stack.pop()
+            for label, child in node.items():
+                if label == self._RULE:
+                    yield prefix
+                else:
+                    stack.append((child, f"{prefix}.{label}" if prefix else label))
+
+    def __len__(self):
+        return self.rule_count
+
+    def save(self, path, sources=()):
+        """
+        Writes the rules in a compact binary file: a magic header, the
+        fingerprint of the source files, and the zlib-compressed sorted rules.
+        """
+        # Sorted as plain strings, which is the order CompiledBlocklist searches in
+        payload = zlib.compress("\n".join(sorted(self.rules())).encode("ascii"), 6)
+        fingerprint = _sources_fingerprint(sources).encode("utf-8")
+        with open(path, "wb") as file:
+            file.write(_BLOCKLIST_MAGIC)
+            file.write(struct.pack("<II", len(self), len(fingerprint)))
+            file.write(fingerprint)
+            file.write(payload)
+
+class CompiledBlocklist:
+    """
+    The read-only, loaded form of a saved DomainTrie. It keeps the sorted
+    reversed rules in a list and answers lookups with binary search, so
+    loading never has to rebuild the trie.
+    """
+
+    def __init__(self, reversed_rules, fingerprint: str = ""):
+        self.reversed_rules = reversed_rules
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def load(cls, path) -> "CompiledBlocklist":
+        with open(path, "rb") as file:
+            data = file.read()
+        if not data.startswith(_BLOCKLIST_MAGIC):
+            raise ValueError(f"'{path}' is not a compiled blocklist.")
+        offset = len(_BLOCKLIST_MAGIC)
+        count, fingerprint_size = struct.unpack_from("<II", data, offset)
+        offset += 8
+        fingerprint = data[offset:offset + fingerprint_size].decode("utf-8")
+        payload = zlib.decompress(data[offset + fingerprint_size:]).decode("ascii")
+        rules = payload.split("\n") if count else []
+        return cls(rules, fingerprint)
+
+    def covers(self, host: str) -> bool:
+        """Returns True if the host or one of its parent domains is blocked."""
+        labels = host.lower().strip(".").split(".")
+        key = ""
+        for label in reversed(labels):
+            key = f"{key}.{label}" if key else label
+            index = bisect_left(self.reversed_rules, key)
+            if index < len(self.reversed_rules) and self.reversed_rules[index] == key:
+                return True
+        return False
+
+    def domains(self):
+        """Yields the rules as normal domains ('example.com')."""
+        for rule in self.reversed_rules:
+            yield ".".join(reversed(rule.split(".")))
+
+    def __len__(self):
+        return len(self.reversed_rules)
+
+def _sources_fingerprint(sources) -> str:
+    """Identifies the exact versions of the blocklist files (plus the built-in list)."""
+    parts = [",".join(sorted(SITES_TO_BLOCK))]
+    for source in sources:
+        stat = os.stat(source)
+        parts.append(f"{os.path.abspath(source)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+def build_blocklist(sources=None, extra_sites=None) -> DomainTrie:
+    """Reads every blocklist file line by line and merges the domains into one trie."""
+    sources = BLOCKLIST_FILES if sources is None else sources
+    trie = DomainTrie()
+    for site in SITES_TO_BLOCK if extra_sites is None else extra_sites:
+        domain = normalize_domain(site)
+        if domain:
+            trie.add(domain)
+    for source in sources:
+        with open(source, "r", encoding="utf-8", errors="replace") as file:
+            for line in file:
+                for domain in parse_blocklist_line(line):
+                    trie.add(domain)
+    return trie
+
+def load_blocklist(sources=None, cache_path=None) -> CompiledBlocklist:
+    """
+    Returns the compiled blocklist, reusing the cache file when none of the
+    sources changed since it was written, and rebuilding it otherwise.
+    Blocklist files that don't exist are reported and skipped.
+    """
+    sources = BLOCKLIST_FILES if sources is None else sources
+    cache_path = cache_path or BLOCKLIST_CACHE
+    # A missing file is left out rather than losing the whole list; once it shows
+    # up, the fingerprint changes and the list is rebuilt with it
+    available = []
+    for source in sources:
+        if os.path.isfile(source):
+            available.append(source)
+        else:
+            print(f"Warning: blocklist file '{source}' not found, skipping it.")
+    sources = available
+    fingerprint = _sources_fingerprint(sources)
+    try:
+        compiled = CompiledBlocklist.load(cache_path)
+        if compiled.fingerprint == fingerprint:
+            return compiled
+    except (OSError, ValueError, zlib.error, struct.error):
+        pass  # Missing or unreadable cache, so build a fresh one
+
+    trie = build_blocklist(sources)
+    try:
+        trie.save(cache_path, sources)
+        return CompiledBlocklist.load(cache_path)
+    except OSError:
+        return CompiledBlocklist(sorted(trie.rules()), fingerprint)
+
+def get_sites_to_block(sources=None, cache_path=None):
+    """
+    Returns the host names to write into the hosts file. A hosts file can't
+    match subdomains, so each rule is written along with its 'www.' variant.
+    """
+    sites = []
+    for domain in load_blocklist(sources, cache_path).domains():
+        sites.append(domain)
+        if not domain.startswith("www."):
+            sites.append(f"www.{domain}")
+    return sites
+
+def benchmark_blocklist(count: int = 200_000, lookups: int = 100_000):
+    """Times ingestion, saving, loading and lookups on a synthetic blocklist."""
+    rng = random.Random(42)
+    words = ["ads", "track", "cdn", "metrics", "pixel", "news", "shop", "video", "social", "img"]
+    tlds = ["com", "net", "org", "io", "co.uk"]
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "blocklist.txt")
+        with open(source, "w", encoding="utf-8") as file:
+            for index in range(count):
+                domain = f"{rng.choice(words)}{index}.{rng.choice(tlds)}"
+                style = index % 3
+                if style == 0:
+                    file.write(f"0.0.0.0 {domain}\n")
+                elif style == 1:
+                    file.write(f"||{domain}^\n")
+                else:
+                    file.write(f"www.{domain}\n")
+        cache = os.path.join(folder, "blocklist.bin")
+
+        started = time.perf_counter()
+        trie = build_blocklist([source], extra_sites=[])
+        ingest_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        trie.save(cache, [source])
+        save_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        compiled = CompiledBlocklist.load(cache)
+        load_seconds = time.perf_counter() - started
+
+        hosts = [f"sub.{rng.choice(words)}{rng.randrange(count * 2)}.{rng.choice(tlds)}" for _ in range(lookups)]
+        started = time.perf_counter()
+        hits = sum(compiled.covers(host) for host in hosts)
+        lookup_seconds = time.perf_counter() - started
+        cache_size = os.path.getsize(cache)
+
+    print(f"Input lines:  {count:,} -> {len(trie):,} rules after dedup")
+    print(f"Ingest:       {ingest_seconds * 1000:.0f} ms")
+    print(f"Save:         {save_seconds * 1000:.0f} ms ({cache_size / 1024:.0f} KiB on disk)")
+    print(f"Load:         {load_seconds * 1000:.1f} ms")
+    print(f"Lookups:      {lookups / lookup_seconds:,.0f}/s ({hits:,} of {lookups:,} blocked)")
+
+def _to_minutes(hhmm: str) -> int:
+    """Converts 'HH:MM' into minutes after midnight ('24:00' is 1440)."""
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+class FocusScheduler:
+    """
+    Decides when focus mode starts and ends, and sleeps until exactly the next
+    change instead of polling. The clock, sleep function and hosts path can be
+    swapped out, which makes it easy to drive from a test.
+    """
+
+    def __init__(self, schedule=None, holidays=None, hosts_path=None,
+                 clock=dt.now, sleep=time.sleep, sites=None):
+        schedule = FOCUS_SCHEDULE if schedule is None else schedule
+        self.windows = {}
+        self.overnight = {}  # Start weekday -> the parts of its windows that fall on the next day
+        for weekday, windows in schedule.items():
+            for start, end in windows:
+                start, end = _to_minutes(start), _to_minutes(end)
+                if start > end:
+                    self.windows.setdefault(weekday, []).append((start, 1440))
+                    self.overnight.setdefault(weekday, []).append((0, end))
+                else:
+                    self.windows.setdefault(weekday, []).append((start, end))
+        self.holidays = {date.fromisoformat(day) for day in (HOLIDAYS if holidays is None else holidays)}
+        self.hosts_path = hosts_path
+        self.clock = clock
+        self.sleep = sleep
+        self.sites = sites
+        self.focus_active = None  # Unknown until the first tick
+
+    def _day_windows(self, day: date):
+        windows = [] if day in self.holidays else self.windows.get(day.weekday(), [])
+        previous_day = day - timedelta(days=1)
+        if previous_day not in self.holidays:
+            windows = windows + self.overnight.get(previous_day.weekday(), [])
+        return sorted(windows)
+
+    def is_focus_time(self, moment: dt) -> bool:
+        """Returns True if 'moment' falls inside one of the focus windows."""
+        minute_of_day = moment.hour * 60 + moment.minute + moment.second / 60
+        return any(start <= minute_of_day < end for start, end in self._day_windows(moment.date()))
+
+    def next_transition(self, moment: dt):
+        """
+        Returns the first time after 'moment' when focus mode switches on or off,
+        or None if nothing changes in the next year.
+        """
+        current = self.is_focus_time(moment)
+        midnight = dt.combine(moment.date(), dt.min.time())
+        for day_offset in range(367):
+            day_start = midnight + timedelta(days=day_offset)
+            boundaries = sorted({
+                minute for window in self._day_windows(day_start.date()) for minute in window
+            })
+            # Midnight itself is a boundary too, because the next day may differ
+            for minute in boundaries + [1440]:
+                candidate = day_start + timedelta(minutes=minute)
+                if candidate > moment and self.is_focus_time(candidate) != current:
+                    return candidate
+        return None
+
+    def apply(self, focus: bool):
+        """
+        Brings the hosts file in line with the wanted state. Returns True if it was
+        rewritten, False if it already matched and None if the update failed.
+        """
+        if focus:
+            return block_sites(self.sites, self.hosts_path)
+        return unblock_sites(self.sites, self.hosts_path)
+
+    def tick(self) -> float:
+        """
+        Applies the state for the current time and returns how many seconds to sleep
+        until the next transition. The hosts file is checked on every tick (and only
+        written when it differs), so a failed write or an outside edit is repaired
+        within MAX_SLEEP_SECONDS. focus_active only changes once the apply worked.
+        """
+        now = self.clock()
+        focus = self.is_focus_time(now)
+        if self.apply(focus) is not None:
+            self.focus_active = focus
+
+        upcoming = self.next_transition(now)
+        if upcoming is None:
+            return MAX_SLEEP_SECONDS
+        print(f"Next change at {upcoming:%Y-%m-%d %H:%M}.")
+        return min(max((upcoming - now).total_seconds(), 0.0), MAX_SLEEP_SECONDS)
+
+    def run(self):
+        """Runs until interrupted."""
+        while True:
+            self.sleep(self.tick())
 
 def main():
     """
-    Main loop to check the time and decide whether to block or unblock sites.
+    Runs the focus scheduler, which blocks or unblocks sites exactly when the schedule changes.
     """
     print("Site Blocker is running. Press Ctrl+C to stop.")
     try:
-        while True:
-            current_hour = dt.now().hour
-            if START_HOUR <= current_hour < END_HOUR:
-                # We are within working hours, so block the sites
-                block_sites()
-            else:
-                # We are outside working hours, so unblock them
-                unblock_sites()
-            
-            # Wait for 5 minutes before checking again
-            time.sleep(300)
+        FocusScheduler().run()
     except KeyboardInterrupt:
         print("\nScript stopped by user. Unblocking all sites as a safety measure.")
         unblock_sites()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Block distracting websites during focus hours.")
+    parser.add_argument("--compile-blocklist", action="store_true", help="Rebuild the blocklist cache and exit.")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=200_000, metavar="ENTRIES",
+                        help="Time blocklist loading and lookups on a synthetic list and exit.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_blocklist(args.benchmark)
+    elif args.compile_blocklist:
+        if os.path.exists(BLOCKLIST_CACHE):
+            os.remove(BLOCKLIST_CACHE)
+        print(f"✅ Compiled {len(load_blocklist()):,} blocklist rules into '{BLOCKLIST_CACHE}'")
+    else:
+        main()
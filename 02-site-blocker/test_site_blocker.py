@@ -0,0 +1,104 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime as dt
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import site_blocker
+from site_blocker import FocusScheduler
+
+
+class MidnightWindowTests(unittest.TestCase):
+    """A window whose end is before its start runs into the next day."""
+
+    def setUp(self):
+        # Friday 22:00 - Saturday 02:00, plus a normal Monday window
+        self.scheduler = FocusScheduler(
+            schedule={4: [("22:00", "02:00")], 0: [("09:00", "17:00")]},
+            holidays=["2026-10-30"],
+        )
+
+    def test_active_on_both_sides_of_midnight(self):
+        self.assertFalse(self.scheduler.is_focus_time(dt(2026, 10, 23, 21, 59)))
+        self.assertTrue(self.scheduler.is_focus_time(dt(2026, 10, 23, 22, 0)))
+        self.assertTrue(self.scheduler.is_focus_time(dt(2026, 10, 24, 0, 0)))
+        self.assertTrue(self.scheduler.is_focus_time(dt(2026, 10, 24, 1, 59)))
+        self.assertFalse(self.scheduler.is_focus_time(dt(2026, 10, 24, 2, 0)))
+
+    def test_transitions_skip_midnight(self):
+        self.assertEqual(self.scheduler.next_transition(dt(2026, 10, 23, 12, 0)), dt(2026, 10, 23, 22, 0))
+        self.assertEqual(self.scheduler.next_transition(dt(2026, 10, 23, 22, 0)), dt(2026, 10, 24, 2, 0))
+        self.assertEqual(self.scheduler.next_transition(dt(2026, 10, 24, 2, 0)), dt(2026, 10, 26, 9, 0))
+
+    def test_holiday_on_the_start_day_cancels_both_parts(self):
+        self.assertFalse(self.scheduler.is_focus_time(dt(2026, 10, 30, 23, 0)))
+        self.assertFalse(self.scheduler.is_focus_time(dt(2026, 10, 31, 1, 0)))
+
+
+class TickTests(unittest.TestCase):
+    """The hosts file is brought back in line on every tick, not only at transitions."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.hosts_path = os.path.join(self.directory.name, "hosts")
+        Path(self.hosts_path).write_text("127.0.0.1 localhost\n", encoding="utf-8")
+        self.now = dt(2026, 10, 26, 10, 0)  # Monday, inside the window
+        self.scheduler = FocusScheduler(
+            schedule={0: [("09:00", "17:00")]}, holidays=[], hosts_path=self.hosts_path,
+            clock=lambda: self.now, sleep=lambda seconds: None, sites=["example.com"],
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def hosts_text(self):
+        return Path(self.hosts_path).read_text(encoding="utf-8")
+
+    def test_outside_edit_is_repaired_on_the_next_tick(self):
+        self.scheduler.tick()
+        self.assertIn("example.com", self.hosts_text())
+
+        Path(self.hosts_path).write_text("127.0.0.1 localhost\n", encoding="utf-8")
+        self.now = dt(2026, 10, 26, 10, 5)
+        self.scheduler.tick()
+        self.assertIn("example.com", self.hosts_text())
+        self.assertTrue(self.scheduler.focus_active)
+
+    def test_failed_apply_keeps_the_old_state(self):
+        original = site_blocker.block_sites
+        site_blocker.block_sites = lambda sites=None, hosts_path=None: None
+        try:
+            self.scheduler.tick()
+        finally:
+            site_blocker.block_sites = original
+        self.assertIsNone(self.scheduler.focus_active)
+
+        self.scheduler.tick()
+        self.assertTrue(self.scheduler.focus_active)
+        self.assertIn("example.com", self.hosts_text())
+
+    def test_sleep_is_capped_so_the_block_is_rechecked(self):
+        self.assertLessEqual(self.scheduler.tick(), site_blocker.MAX_SLEEP_SECONDS)
+
+
+class BlocklistTests(unittest.TestCase):
+    def test_missing_file_is_skipped_until_it_appears(self):
+        with tempfile.TemporaryDirectory() as directory:
+            present, missing = os.path.join(directory, "a.txt"), os.path.join(directory, "b.txt")
+            cache_path = os.path.join(directory, "blocklist.bin")
+            Path(present).write_text("ads.example.com\n", encoding="utf-8")
+
+            sites = site_blocker.get_sites_to_block([present, missing], cache_path)
+            self.assertIn("ads.example.com", sites)
+            self.assertNotIn("tracker.example.net", sites)
+
+            Path(missing).write_text("0.0.0.0 tracker.example.net\n", encoding="utf-8")
+            sites = site_blocker.get_sites_to_block([present, missing], cache_path)
+            self.assertIn("tracker.example.net", sites)
+
+
+if __name__ == "__main__":
+    unittest.main()
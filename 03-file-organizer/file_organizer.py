@@ -1,5 +1,14 @@
 from pathlib import Path
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import errno
+import hashlib
+import json
+import os
 import shutil
+import threading
+import time
 
 # --- CONFIGURATION ---
 # The folder to organize. Path.home() gets your user's home directory.
@@ -16,41 +25,722 @@ CATEGORIES = {
     "Compressed": [".zip", ".rar", ".gz", ".tar", ".7z"],
     "Executables": [".exe", ".msi", ".dmg", ".pkg"]
 }
+
+# Suffix -> category lookup, built once from CATEGORIES (the first category listing a suffix wins)
+EXTENSION_INDEX = {}
+for _category, _extensions in CATEGORIES.items():
+    for _extension in _extensions:
+        EXTENSION_INDEX.setdefault(_extension, _category)
+
+# Look at the first bytes of a file to recognize its real type:
+#   None      -> use the extension only
+#   "unknown" -> only sniff files whose extension isn't in CATEGORIES (or that have none)
+#   "all"     -> also sniff known files, so mislabeled ones end up in the right place
+SNIFF_CONTENT = "unknown"
+SNIFF_BYTES = 512
+
+# Known file signatures: (offset, magic bytes, category, may override the extension).
+# Container formats (ZIP, OLE2, ISO-BMFF) are shared by many file types, so they are
+# only trusted when the extension doesn't tell us anything. ISO-BMFF ('ftyp') files
+# are refined by their major brand below, and 'MZ' only overrides the extension
+# when the file really has a PE header.
+MAGIC_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "Images", True),
+    (0, b"\x89PNG\r\n\x1a\n", "Images", True),
+    (0, b"GIF87a", "Images", True),
+    (0, b"GIF89a", "Images", True),
+    (8, b"WEBP", "Images", True),
+    (0, b"%PDF-", "Documents", True),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "Documents", False),
+    (4, b"ftyp", "Videos", False),
+    (8, b"AVI ", "Videos", True),
+    (0, b"\x1a\x45\xdf\xa3", "Videos", True),
+    (0, b"ID3", "Music", True),
+    (0, b"fLaC", "Music", True),
+    (8, b"WAVE", "Music", True),
+    (0, b"PK\x03\x04", "Compressed", False),
+    (0, b"Rar!\x1a\x07", "Compressed", True),
+    (0, b"7z\xbc\xaf\x27\x1c", "Compressed", True),
+    (0, b"\x1f\x8b", "Compressed", True),
+    (257, b"ustar", "Compressed", True),
+    (0, b"MZ", "Executables", False),
+]
+
+# Major brands (bytes 8-12) of ISO-BMFF files that are not videos, or that are known to be
+FTYP_BRANDS = {
+    b"heic": "Images", b"heix": "Images", b"hevc": "Images", b"heim": "Images",
+    b"heis": "Images", b"mif1": "Images", b"msf1": "Images", b"avif": "Images", b"avis": "Images",
+    b"M4A ": "Music", b"M4B ": "Music", b"M4P ": "Music", b"F4A ": "Music",
+    b"isom": "Videos", b"iso2": "Videos", b"mp41": "Videos", b"mp42": "Videos",
+    b"avc1": "Videos", b"qt  ": "Videos", b"M4V ": "Videos", b"3gp4": "Videos",
+    b"3gp5": "Videos", b"3g2a": "Videos", b"f4v ": "Videos",
+}
+
+# Sniffed results are cached by (device, inode, size, mtime), so unchanged files are never read twice
+CLASSIFY_CACHE_PATH = Path.home() / ".cache" / "file_organizer" / "classify_cache.json"
+CLASSIFY_CACHE_MAX_ENTRIES = 500_000
+
+# Optional duplicate handling while organizing:
+#   None         -> move every file, duplicates included
+#   "hardlink"   -> replace each duplicate with a hard link to the first copy, then move it
+#   "quarantine" -> move duplicates into the DUPLICATES_FOLDER instead of their category
+#   "skip"       -> leave duplicates where they are
+DEDUP_MODE = None
+DUPLICATES_FOLDER = "Duplicates"
+
+# Files are compared by size first, then by a hash of their first and last
+# DEDUP_EDGE_BYTES, and only fully hashed if those still match.
+DEDUP_EDGE_BYTES = 64 * 1024
+
+# Hashes are cached by (device, inode, size, mtime) between runs
+HASH_CACHE_PATH = Path.home() / ".cache" / "file_organizer" / "hash_cache.json"
+HASH_CACHE_MAX_ENTRIES = 500_000
+
+# How many files are moved at the same time
+MOVE_WORKERS = 8
+
+# Chunk size used when a file has to be copied to another device
+COPY_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+# How many moves may be queued at once (keeps memory flat on huge trees)
+MAX_PENDING_MOVES = MOVE_WORKERS * 64
+
+# Append-only record of every run, kept in the organized folder. It lets an
+# interrupted run resume and a finished run be undone.
+JOURNAL_NAME = ".file_organizer_journal.jsonl"
+JOURNAL_FLUSH_EVERY = 1000
+
+# How many individual errors to show in the summary
+MAX_ERRORS_SHOWN = 10
 # ---------------------
 
-def organize_folder(path: Path):
+def _load_json_cache(path) -> dict:
+    """Reads a JSON cache file, or returns an empty cache if it is missing or broken."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_json_cache(path: Path, cache: dict, max_entries: int):
+    """Writes a JSON cache file atomically, dropping the oldest entries once it is too big."""
+    overflow = len(cache) - max_entries
+    if overflow > 0:
+        for key in list(cache)[:overflow]:
+            del cache[key]
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+        return True
+    except OSError as e:
+        print(f"Could not save the cache '{path.name}'. Error: {e}")
+        return False
+
+def _stat_key(stat_result) -> str:
+    """Identifies one version of one file: (device, inode, size, mtime)."""
+    return f"{stat_result.st_dev}:{stat_result.st_ino}:{stat_result.st_size}:{stat_result.st_mtime_ns}"
+
+def categorize(item: Path) -> str:
+    """Returns the category folder name for a file based on its extension, or 'Other'."""
+    return EXTENSION_INDEX.get(item.suffix.lower(), "Other")
+
+class FileClassifier:
+    """
+    Picks a category for each file: the extension index first, then (if
+    enabled) the file's magic bytes. Sniffing reads at most SNIFF_BYTES into
+    one reusable buffer, and its results are cached on disk so a rerun on a
+    mostly unchanged tree doesn't open the files again.
+    """
+
+    def __init__(self, sniff=SNIFF_CONTENT, cache_path=CLASSIFY_CACHE_PATH):
+        self.sniff = sniff
+        self.cache_path = cache_path
+        self.cache = _load_json_cache(cache_path) if sniff and cache_path else {}
+        self.cache_dirty = False
+        self.sniffed = 0
+        self.cache_hits = 0
+        self._buffer = bytearray(SNIFF_BYTES)
+        self._view = memoryview(self._buffer)
+
+    def save_cache(self):
+        """Writes the cache back to disk if anything new was sniffed."""
+        if self.cache_dirty and self.cache_path:
+            if _save_json_cache(self.cache_path, self.cache, CLASSIFY_CACHE_MAX_ENTRIES):
+                self.cache_dirty = False
+
+    def sniff_category(self, item: Path):
+        """
+        Reads the first bytes of the file and returns (category, may_override) or None.
+        Raises OSError if the file can't be read.
+        """
+        with open(item, "rb", buffering=0) as f:
+            size = f.readinto(self._buffer)
+        self.sniffed += 1
+        header = self._view[:size]
+        for offset, magic, category, may_override in MAGIC_SIGNATURES:
+            if header[offset:offset + len(magic)] != magic:
+                continue
+            if magic == b"ftyp" and bytes(header[8:12]) in FTYP_BRANDS:
+                return FTYP_BRANDS[bytes(header[8:12])], True
+            if magic == b"MZ" and size >= 64:
+                pe_offset = int.from_bytes(header[60:64], "little")
+                if header[pe_offset:pe_offset + 4] == b"PE\0\0":
+                    return category, True
+            return category, may_override
+        return None
+
+    def classify(self, item: Path, entry: os.DirEntry = None) -> str:
+        """
+        Returns the category folder name for a file. Passing the scandir entry
+        lets the file be stat-ed only when sniffing actually needs it.
+        """
+        by_extension = categorize(item)
+        if not self.sniff or (self.sniff == "unknown" and by_extension != "Other"):
+            return by_extension
+
+        stat_result = entry.stat() if entry is not None else item.stat()
+        key = _stat_key(stat_result)
+        if key in self.cache:
+            self.cache_hits += 1
+            sniffed = self.cache[key]
+        else:
+            try:
+                sniffed = self.sniff_category(item)
+            except OSError:
+                return by_extension  # Not cached, so the next run tries again
+            self.cache[key] = sniffed
+            self.cache_dirty = True
+
+        if sniffed is None:
+            return by_extension
+        category, may_override = sniffed
+        if by_extension == "Other" or may_override:
+            return category
+        return by_extension
+
+class DuplicateFinder:
+    """
+    Spots files whose content was already seen in this run, reading as little
+    as possible: a file with a size nobody else has is never opened, files of
+    the same size are compared by a hash of their edges, and only the ones
+    that still match are hashed in full.
+    """
+
+    def __init__(self, cache_path=HASH_CACHE_PATH):
+        self.cache_path = cache_path
+        self.cache = _load_json_cache(cache_path) if cache_path else {}
+        self.cache_dirty = False
+        self.by_size = {}  # size -> files kept so far with that size
+        self.edge_reads = 0
+        self.full_reads = 0
+        self.cache_hits = 0
+
+    def _hash(self, candidate: dict, kind: str) -> str:
+        """Returns the 'edge' or 'full' hash of a candidate, using the cache when possible."""
+        entry = self.cache.setdefault(candidate["key"], {})
+        if kind in entry:
+            self.cache_hits += 1
+            return entry[kind]
+
+        size = candidate["size"]
+        digest = hashlib.blake2b(digest_size=20)
+        with open(candidate["locate"](), "rb") as f:
+            if kind == "edge":
+                self.edge_reads += 1
+                digest.update(f.read(DEDUP_EDGE_BYTES))
+                if size > DEDUP_EDGE_BYTES:
+                    f.seek(max(size - DEDUP_EDGE_BYTES, DEDUP_EDGE_BYTES))
+                    digest.update(f.read(DEDUP_EDGE_BYTES))
+            else:
+                self.full_reads += 1
+                while True:
+                    chunk = f.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+        entry[kind] = digest.hexdigest()
+        # For small files the edges are the whole file
+        if kind == "edge" and size <= 2 * DEDUP_EDGE_BYTES:
+            entry["full"] = entry["edge"]
+        self.cache_dirty = True
+        return entry[kind]
+
+    def check(self, item: Path, stat_result) -> tuple:
+        """
+        Compares a file with the ones seen before it. Returns (candidate, original):
+        'original' is the earlier candidate with the same content, or None.
+        A file that can't be read is treated as unique.
+        Keep the new candidate with track() once you know where it will live.
+        """
+        candidate = {"key": _stat_key(stat_result), "size": stat_result.st_size,
+                     "inode": (stat_result.st_dev, stat_result.st_ino), "locate": lambda: item}
+        if stat_result.st_size == 0:
+            return candidate, None  # Empty files are all "equal", not worth reporting
+
+        same_size = self.by_size.get(stat_result.st_size)
+        if not same_size:
+            return candidate, None
+
+        for earlier in same_size:
+            if earlier["inode"] == candidate["inode"]:
+                return candidate, earlier  # Already a hard link to the same file
+            try:
+                if (self._hash(earlier, "edge") == self._hash(candidate, "edge")
+                        and self._hash(earlier, "full") == self._hash(candidate, "full")):
+                    return candidate, earlier
+            except OSError:
+                continue  # Either file can't be read right now: don't call them duplicates
+        return candidate, None
+
+    def track(self, candidate: dict, locate=None):
+        """Remembers a kept file. 'locate' returns its current path once it has been moved."""
+        if locate is not None:
+            candidate["locate"] = locate
+        if candidate["size"]:
+            self.by_size.setdefault(candidate["size"], []).append(candidate)
+
+    def save_cache(self):
+        if self.cache_dirty and self.cache_path:
+            if _save_json_cache(self.cache_path, self.cache, HASH_CACHE_MAX_ENTRIES):
+                self.cache_dirty = False
+
+def _settled_path(future, source: Path, target: Path) -> Path:
+    """Waits for a move to finish and returns where the file ended up."""
+    try:
+        future.result()
+        return target
+    except Exception:
+        return source
+
+def _replace_with_hardlink(original: Path, duplicate: Path):
+    """Swaps a duplicate file for a hard link to the original, atomically."""
+    temp_path = duplicate.with_name(f".{duplicate.name}.link")
+    os.link(original, temp_path)
+    os.replace(temp_path, duplicate)
+
+def iter_tree(root: Path, recursive: bool = False, done_dirs=frozenset(), rel_dir: str = ""):
+    """
+    Streams the folder with os.scandir, using the type information cached on
+    each DirEntry instead of an extra stat per item. Yields ("file", entry) for
+    every file and ("dir", relative path) once a folder and everything below it
+    has been listed. Folders in done_dirs (from a resumed run) are skipped.
+    """
+    subdirs = []
+    with os.scandir(root / rel_dir) as entries:
+        for entry in entries:
+            if entry.is_file():
+                if not rel_dir and entry.name == JOURNAL_NAME:
+                    continue
+                yield "file", entry
+            elif recursive and entry.is_dir(follow_symlinks=False):
+                # Leave the top-level category folders alone, they are the destination
+                if not rel_dir and (entry.name in CATEGORIES or entry.name in ("Other", DUPLICATES_FOLDER)):
+                    continue
+                child = os.path.join(rel_dir, entry.name)
+                if child not in done_dirs:
+                    subdirs.append(child)
+
+    for child in subdirs:
+        yield from iter_tree(root, recursive, done_dirs, child)
+    yield "dir", rel_dir
+
+class MoveJournal:
+    """
+    An append-only JSON Lines log of organizer runs. Each run writes a 'start'
+    record, an 'intent' record before a file is moved and a 'move' record once it
+    was, a 'dir' record for every finished folder and an 'end' record. Undoing a
+    run adds an 'undo' record. A file is only moved after its intent is on disk,
+    so a killed run never leaves a moved file the journal doesn't know about.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+        self._unflushed = 0
+        self._lock = threading.Lock()  # Guards writes to the file
+        self._sync_lock = threading.Lock()  # One fsync at a time
+        self._written = 0
+        self._durable = 0
+
+    def __enter__(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+        self._file = None
+
+    def write(self, record: dict, flush: bool = False) -> int:
+        """Appends a record and returns its sequence number, for sync()."""
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._written += 1
+            sequence = self._written
+            self._unflushed += 1
+        if flush or self._unflushed >= JOURNAL_FLUSH_EVERY:
+            self.sync(sequence)
+        return sequence
+
+    def sync(self, sequence: int):
+        """
+        Makes sure every record up to 'sequence' is on disk. Move workers call this
+        before touching a file; whoever gets the lock first fsyncs everything written
+        so far, so the other workers usually find their record already durable.
+        """
+        with self._sync_lock:
+            if self._durable >= sequence:
+                return
+            with self._lock:
+                self._file.flush()
+                written = self._written
+                self._unflushed = 0
+            os.fsync(self._file.fileno())
+            self._durable = written
+
+    def last_run(self, with_moves: bool = False):
+        """
+        Reads the journal and returns the most recent run as a dict, or None.
+        Moves are only kept in memory when with_moves is True (needed for undo).
+        """
+        run = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # A half-written last line from a crash
+                    op = record.get("op")
+                    if op == "start":
+                        run = {"run": record["run"], "recursive": record.get("recursive", False),
+                               "moves": [], "move_count": 0, "dirs": set(), "intents": {},
+                               "ended": False, "undone": False}
+                    elif run is None or record.get("run") != run["run"]:
+                        continue
+                    elif op == "intent":
+                        run["intents"][record["src"]] = record["dst"]
+                    elif op == "move":
+                        run["move_count"] += 1
+                        run["intents"].pop(record["src"], None)
+                        if with_moves:
+                            run["moves"].append((record["src"], record["dst"]))
+                    elif op == "dir":
+                        run["dirs"].add(record["path"])
+                    elif op == "end":
+                        run["ended"] = True
+                    elif op == "undo":
+                        run["undone"] = True
+        except FileNotFoundError:
+            return None
+        if run is not None:
+            # Moves that were announced but never confirmed, because the run was killed.
+            # Whether each one actually happened is for the caller to check on disk.
+            run["unconfirmed"] = list(run.pop("intents").items())
+        return run
+
+def _rename_without_overwrite(source: Path, target: Path):
+    """
+    Renames a file, failing with FileExistsError instead of replacing an existing
+    target: the new name is hard-linked first and the old one removed after. On a
+    filesystem without hard links the name is reserved with an exclusive create.
+    """
+    try:
+        os.link(source, target, follow_symlinks=False)
+    except OSError as e:
+        if e.errno not in (errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP):
+            raise
+        with open(target, "xb"):
+            pass
+        os.replace(source, target)
+    else:
+        os.unlink(source)
+
+def _unique_name(destination_folder: Path, name: str, taken: set) -> str:
+    """
+    Picks a name in the destination folder that no file has and no other move of this
+    run has claimed, adding ' (1)', ' (2)', ... before the extension when needed.
+    """
+    stem, suffix = os.path.splitext(name)
+    candidate, number = name, 0
+    while candidate in taken or os.path.lexists(destination_folder / candidate):
+        number += 1
+        candidate = f"{stem} ({number}){suffix}"
+    taken.add(candidate)
+    return candidate
+
+def _copy_then_unlink(source: Path, target: Path):
+    """
+    Moves a file across devices: copies it in chunks to a temporary name next
+    to the target, puts it in place without overwriting anything and only then
+    removes the source.
+    """
+    temp_target = target.with_name(f".{target.name}.part")
+    try:
+        with source.open("rb") as src, temp_target.open("wb") as dst:
+            while True:
+                chunk = src.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+        shutil.copystat(source, temp_target)
+        _rename_without_overwrite(temp_target, target)
+    except BaseException:
+        temp_target.unlink(missing_ok=True)
+        raise
+    source.unlink()
+
+def move_file(source: Path, destination_folder: Path, same_device: bool,
+              journal=None, sequence: int = 0, name: str = None) -> str:
+    """
+    Moves one file into the destination folder, as 'name' (default: its own name).
+    Files on the same device are simply renamed; anything else goes through a
+    chunked copy. An existing file is never overwritten: the move fails instead.
+    Returns 'rename' or 'copy' depending on the path taken.
+    With a journal, waits until record 'sequence' (the move's intent) is on disk first.
+    """
+    target = destination_folder / (name or source.name)
+    if os.path.lexists(target):
+        raise FileExistsError(f"'{target}' already exists")
+
+    if journal is not None:
+        journal.sync(sequence)
+    if same_device:
+        try:
+            _rename_without_overwrite(source, target)
+            return "rename"
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    _copy_then_unlink(source, target)
+    return "copy"
+
+def _print_summary(action: str, moved: Counter, methods: Counter, errors: list, elapsed: float):
+    total = sum(moved.values())
+    print(f"\n{action} {total} file(s) in {elapsed:.2f} s "
+          f"({methods['rename']} renamed, {methods['copy']} copied across devices).")
+    for category, count in sorted(moved.items()):
+        print(f"  {category}: {count}")
+    if errors:
+        print(f"Could not move {len(errors)} file(s):")
+        for error in errors[:MAX_ERRORS_SHOWN]:
+            print(f"  {error}")
+        if len(errors) > MAX_ERRORS_SHOWN:
+            print(f"  ... and {len(errors) - MAX_ERRORS_SHOWN} more")
+
+def organize_folder(path: Path, recursive: bool = False, resume: bool = False, dedup=DEDUP_MODE):
     """
     Organizes all files in the specified path into subdirectories based on CATEGORIES.
+    The folder is streamed with os.scandir (recursively if asked), every
+    destination folder is created once, and the moves run on a small thread pool.
+    Every move is journaled so an interrupted run can be resumed or undone.
+    With 'dedup' set, duplicate files are hard-linked, quarantined or skipped.
     """
     if not path.is_dir():
         print(f"Error: The path '{path}' is not a valid directory.")
         return
 
+    journal = MoveJournal(path / JOURNAL_NAME)
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    done_dirs = set()
+    if resume:
+        last_run = journal.last_run()
+        if last_run is None or last_run["ended"]:
+            print("Nothing to resume: the last run finished.")
+            return
+        run_id, done_dirs, recursive = last_run["run"], last_run["dirs"], last_run["recursive"]
+        print(f"Resuming run {run_id} ({last_run['move_count']} file(s) already moved, "
+              f"{len(done_dirs)} folder(s) done).")
+
     print(f"Starting to organize files in: {path}")
+    started = time.perf_counter()
 
-    # Iterate over all files in the specified directory
-    for item in path.iterdir():
-        # We only want to process files, not subdirectories
-        if item.is_file():
-            destination_category = "Other" # Default category
-            
-            # Check which category the file belongs to
-            for category, extensions in CATEGORIES.items():
-                if item.suffix.lower() in extensions:
-                    destination_category = category
-                    break
-            
-            # Create the destination folder if it doesn't already exist
-            destination_folder = path / destination_category
-            destination_folder.mkdir(exist_ok=True)
-            
-            # Move the file to its new home
+    classifier = FileClassifier()
+    finder = DuplicateFinder() if dedup else None
+    duplicates = 0
+    duplicate_bytes = 0
+    saved_bytes = 0
+    source_device = path.stat().st_dev
+    destinations = {}  # category -> (folder, same_device), each folder created once
+    taken_names = defaultdict(set)  # category -> names claimed by this run's moves
+
+    moved = Counter()
+    methods = Counter()
+    errors = []
+    pending = deque()
+    finished_dirs = deque()  # (moves submitted before the folder was done, folder)
+    submitted = 0
+    collected = 0
+
+    def collect():
+        nonlocal collected
+        category, item, name, future = pending.popleft()
+        collected += 1
+        try:
+            methods[future.result()] += 1
+            moved[category] += 1
+            journal.write({"op": "move", "run": run_id, "src": os.path.relpath(item, path),
+                           "dst": os.path.join(category, name)})
+        except Exception as e:
+            errors.append(f"'{os.path.basename(item)}': {e}")
+        # Futures are collected in order, so a folder is done once all of its moves are
+        while finished_dirs and finished_dirs[0][0] <= collected:
+            write_dir(finished_dirs.popleft()[1])
+
+    def write_dir(folder):
+        # Folders finished before the first move need no record: the run isn't journaled yet
+        if journaled:
+            journal.write({"op": "dir", "run": run_id, "path": folder}, flush=True)
+
+    # The start record is written just before the first move, so a run that moves
+    # nothing leaves no trace and can't hide the previous run from --undo
+    journaled = resume
+    with journal, ThreadPoolExecutor(max_workers=MOVE_WORKERS) as executor:
+        for kind, value in iter_tree(path, recursive, done_dirs):
+            if kind == "dir":
+                finished_dirs.append((submitted, value))
+                if submitted == collected:
+                    while finished_dirs:
+                        write_dir(finished_dirs.popleft()[1])
+                continue
+
+            item = Path(value.path)
+            category = classifier.classify(item, value)
+            candidate = None
+            if finder:
+                try:
+                    stat_result = value.stat()
+                    candidate, original = finder.check(item, stat_result)
+                except OSError as e:
+                    errors.append(f"'{value.name}': {e}")
+                    continue
+                if original is not None:
+                    candidate = None
+                    duplicates += 1
+                    duplicate_bytes += stat_result.st_size
+                    if dedup == "skip":
+                        continue
+                    if dedup == "quarantine":
+                        category = DUPLICATES_FOLDER
+                    elif dedup == "hardlink" and original["inode"] != (stat_result.st_dev, stat_result.st_ino):
+                        try:
+                            _replace_with_hardlink(original["locate"](), item)
+                            saved_bytes += stat_result.st_size
+                        except OSError as e:
+                            # The original went to another device: the duplicate is simply moved too
+                            if e.errno != errno.EXDEV:
+                                errors.append(f"'{value.name}': could not hard-link duplicate ({e})")
+
+            if category not in destinations:
+                destination_folder = path / category
+                destination_folder.mkdir(exist_ok=True)
+                destinations[category] = (destination_folder, destination_folder.stat().st_dev == source_device)
+            destination_folder, same_device = destinations[category]
+
+            # Files from different subfolders can share a name; each gets its own
+            name = _unique_name(destination_folder, item.name, taken_names[category])
+            if not journaled:
+                journal.write({"op": "start", "run": run_id, "root": str(path.resolve()),
+                               "recursive": recursive}, flush=True)
+                journaled = True
+            sequence = journal.write({"op": "intent", "run": run_id, "src": os.path.relpath(item, path),
+                                      "dst": os.path.join(category, name)})
+            future = executor.submit(move_file, item, destination_folder, same_device, journal, sequence, name)
+            pending.append((category, value.path, name, future))
+            if candidate is not None:
+                target = destination_folder / name
+                finder.track(candidate, lambda f=future, s=item, t=target: _settled_path(f, s, t))
+            submitted += 1
+            if len(pending) >= MAX_PENDING_MOVES:
+                collect()
+
+        while pending:
+            collect()
+        if journaled:
+            journal.write({"op": "end", "run": run_id}, flush=True)
+
+    classifier.save_cache()
+    _print_summary("Moved", moved, methods, errors, time.perf_counter() - started)
+    if classifier.sniff:
+        print(f"Content sniffing: {classifier.sniffed} file(s) read, {classifier.cache_hits} cache hit(s).")
+    if finder:
+        finder.save_cache()
+        action = {"hardlink": "hard-linked", "quarantine": "quarantined", "skip": "skipped"}.get(dedup, dedup)
+        print(f"Duplicates: {duplicates} file(s), {duplicate_bytes / 1024 ** 2:.1f} MiB {action}, "
+              f"{saved_bytes / 1024 ** 2:.1f} MiB saved.")
+        print(f"Hashing: {finder.edge_reads} edge read(s), {finder.full_reads} full read(s), "
+              f"{finder.cache_hits} cache hit(s).")
+
+def undo_last_run(path: Path):
+    """
+    Moves every file of the most recent run back to where it came from,
+    using the journal. Folders created by the run are left in place.
+    """
+    journal = MoveJournal(path / JOURNAL_NAME)
+    last_run = journal.last_run(with_moves=True)
+    if last_run is None:
+        print(f"Error: No journal found in '{path}'.")
+        return
+    if last_run["undone"]:
+        print(f"Run {last_run['run']} has already been undone.")
+        return
+
+    # A killed run may have moved files after journaling their intent but before confirming them
+    recovered = [(src, dst) for src, dst in last_run["unconfirmed"]
+                 if (path / dst).exists() and not (path / src).exists()]
+    last_run["moves"].extend(recovered)
+
+    print(f"Undoing run {last_run['run']} ({last_run['move_count'] + len(recovered)} file(s))...")
+    started = time.perf_counter()
+    source_device = path.stat().st_dev
+    original_folders = {}  # folder -> same_device, each folder created once
+    moved = Counter()
+    methods = Counter()
+    errors = []
+
+    with journal, ThreadPoolExecutor(max_workers=MOVE_WORKERS) as executor:
+        futures = deque()
+
+        def collect():
+            src, future = futures.popleft()
             try:
-                print(f"Moving '{item.name}' to '{destination_category}'...")
-                shutil.move(str(item), str(destination_folder))
+                methods[future.result()] += 1
+                moved["Restored"] += 1
             except Exception as e:
-                print(f"Could not move '{item.name}'. Error: {e}")
+                errors.append(f"'{src}': {e}")
+
+        for src, dst in reversed(last_run["moves"]):
+            original_folder = (path / src).parent
+            if original_folder not in original_folders:
+                original_folder.mkdir(parents=True, exist_ok=True)
+                original_folders[original_folder] = original_folder.stat().st_dev == source_device
+            same_device = original_folders[original_folder]
+            futures.append((src, executor.submit(move_file, path / dst, original_folder, same_device,
+                                                 name=os.path.basename(src))))
+            if len(futures) >= MAX_PENDING_MOVES:
+                collect()
+        while futures:
+            collect()
+        journal.write({"op": "undo", "run": last_run["run"]}, flush=True)
+
+    _print_summary("Restored", moved, methods, errors, time.perf_counter() - started)
 
 if __name__ == "__main__":
-    organize_folder(FOLDER_TO_ORGANIZE)
-    print("\n✅ Organization complete.")
+    parser = argparse.ArgumentParser(description="Sort a folder into subfolders by file type.")
+    parser.add_argument("folder", nargs="?", type=Path, default=FOLDER_TO_ORGANIZE, help="The folder to organize.")
+    parser.add_argument("--recursive", action="store_true", help="Also organize files in subfolders.")
+    parser.add_argument("--resume", action="store_true", help="Continue the last interrupted run.")
+    parser.add_argument("--undo", action="store_true", help="Move the files of the last run back.")
+    parser.add_argument("--dedup", choices=["hardlink", "quarantine", "skip"], default=DEDUP_MODE,
+                        help="What to do with files whose content was already seen.")
+    args = parser.parse_args()
+
+    if args.undo:
+        undo_last_run(args.folder)
+        print("\n✅ Undo complete.")
+    else:
+        organize_folder(args.folder, recursive=args.recursive, resume=args.resume, dedup=args.dedup)
+        print("\n✅ Organization complete.")
@@ -1,6 +1,22 @@
 import requests
+import urllib3
 import time
 import os
+import argparse
+import hashlib
+import heapq
+import math
+import mmap
+import queue
+import random
+import socket
+import struct
+import threading
+from pathlib import Path
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
 
 # --- CONFIGURATION ---
 # Get your Discord webhook URL from an environment variable for security
@@ -8,17 +24,409 @@ import os
 # or: set DISCORD_WEBHOOK_URL="your_webhook_url_here" (Windows)
 WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL")
 
-# List of websites you want to monitor
+# List of websites you want to monitor. An entry is either a URL, or a dict
+# with a "url" and any of "interval", "jitter" and "timeout" to override the defaults below.
 SITES_TO_MONITOR = [
     "https://google.com",
-    "https://api.github.com",
+    {"url": "https://api.github.com", "interval": 60, "timeout": 5},
     "https://a-site-that-doesnt-exist-to-test.com" # A failing site for testing
 ]
 
-# Time to wait between checks, in seconds
+# Default time between checks of the same site, in seconds
 CHECK_INTERVAL = 300  # 5 minutes
+
+# Random spread added to each interval (0.1 = +/-10%) so checks don't all fire at once
+CHECK_JITTER = 0.1
+
+# How long a single check may take, in seconds
+REQUEST_TIMEOUT = 10
+
+# After a failure the site is checked again sooner: RETRY_INTERVAL seconds
+# later, doubling on every further failure, but never slower than its normal interval
+RETRY_INTERVAL = 15
+
+# How many checks run at the same time, in total and per host
+MAX_CONCURRENT_CHECKS = 64
+MAX_CHECKS_PER_HOST = 4
+
+# How a site is probed:
+#   "HEAD" -> a HEAD request (falls back to GET if the server doesn't allow HEAD)
+#   "GET"  -> a streamed GET that is closed as soon as the headers arrive
+PROBE_METHOD = "HEAD"
+
+# Latency history: one fixed-size ring buffer file per site in this folder
+LATENCY_DIR = Path(__file__).resolve().parent / "latency_data"
+LATENCY_HISTORY_SIZE = 2880  # Checks kept per site (e.g. 10 days at one check every 5 minutes)
+# How many of the most recent checks the p50/p95/p99 are computed over
+PERCENTILE_WINDOW = 300
+
+# Alerts are queued and sent by a background thread. Alerts raised within
+# ALERT_COALESCE_SECONDS of each other are merged into one Discord message.
+ALERT_COALESCE_SECONDS = 10
+ALERT_MAX_ATTEMPTS = 5
+DISCORD_MESSAGE_LIMIT = 2000  # Discord rejects longer messages
+
+# Hysteresis: how many checks in a row must fail before a site counts as down,
+# and how many must succeed before it counts as up again
+ALERT_AFTER_FAILURES = 2
+RECOVER_AFTER_SUCCESSES = 2
+
+# A site that changes state FLAP_THRESHOLD times within FLAP_WINDOW_SECONDS is
+# "flapping": one alert is sent, and the rest are held back until it settles
+FLAP_THRESHOLD = 4
+FLAP_WINDOW_SECONDS = 900
+
+# Port for the Prometheus metrics endpoint (http://localhost:PORT/metrics). None turns it off.
+METRICS_PORT = 9108
+# Address the endpoint listens on. Only this machine by default; use "0.0.0.0" to let
+# a Prometheus server elsewhere scrape it (the site list is visible to anyone who can)
+METRICS_HOST = "127.0.0.1"
 # ---------------------
 
+# --- LATENCY TIMING ---
+# urllib3 connections that record how long DNS and the TCP/TLS connect took.
+# The values land in a thread-local, since each check runs on one worker thread.
+# They stay NaN when a kept-alive connection was reused and nothing was measured.
+_timings = threading.local()
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        host = self._dns_host
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(host, self.port, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise urllib3.exceptions.NameResolutionError(self.host, self, e) from e
+        except UnicodeError as e:
+            # An empty or too long label can't be IDNA-encoded: report it as a failed lookup,
+            # which requests turns into a ConnectionError like any other
+            raise urllib3.exceptions.NameResolutionError(self.host, self, e) from e
+        _timings.dns = time.perf_counter() - started
+
+        # Connect to the addresses resolved above, so urllib3 doesn't look the name up again
+        error = None
+        try:
+            for *_, sockaddr in addresses:
+                self._dns_host = sockaddr[0]
+                try:
+                    return super()._new_conn()
+                except (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError) as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        _timings.connect = time.perf_counter() - started - _timings.dns
+
+class _TimedHTTPConnection(_TimedConnectionMixin, urllib3.connection.HTTPConnection):
+    pass
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, urllib3.connection.HTTPSConnection):
+    pass
+
+class _TimedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class _TimedAdapter(requests.adapters.HTTPAdapter):
+    """A requests adapter whose pooled connections report DNS and connect times."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+class SiteChecker:
+    """
+    Checks sites concurrently on a thread pool with a shared, pooled
+    keep-alive session. At most MAX_CONCURRENT_CHECKS run in total and at
+    most MAX_CHECKS_PER_HOST against the same host; extra checks for a busy
+    host wait in a queue instead of tying up a worker thread.
+    """
+
+    def __init__(self, max_workers=MAX_CONCURRENT_CHECKS, per_host=MAX_CHECKS_PER_HOST,
+                 probe=PROBE_METHOD, timeout=REQUEST_TIMEOUT):
+        self.per_host = per_host
+        self.probe = probe
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.session = requests.Session()
+        adapter = _TimedAdapter(pool_connections=max_workers, pool_maxsize=per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._in_flight = defaultdict(int)
+        self._waiting = defaultdict(deque)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def check(self, site: str, timeout=None) -> dict:
+        """
+        Probes one site and returns a result dict with 'site', 'status_code'
+        (None on any error), 'error', the 'timestamp' of the check and
+        its latency in seconds: 'dns' and 'connect' (NaN when a kept-alive
+        connection was reused), 'ttfb' (until the headers arrived) and 'elapsed'.
+        """
+        timeout = timeout or self.timeout
+        _timings.dns = _timings.connect = math.nan
+        timestamp = time.time()
+        started = time.perf_counter()
+        try:
+            if self.probe == "HEAD":
+                response = self.session.head(site, timeout=timeout, allow_redirects=True)
+                if response.status_code in (405, 501):
+                    response = self.session.get(site, timeout=timeout, stream=True)
+            else:
+                response = self.session.get(site, timeout=timeout, stream=True)
+            # Only the status line and headers matter, so never download the body
+            response.close()
+            elapsed = time.perf_counter() - started
+            return {"site": site, "status_code": response.status_code, "error": None,
+                    "timestamp": timestamp, "dns": _timings.dns, "connect": _timings.connect,
+                    "ttfb": min(response.elapsed.total_seconds(), elapsed), "elapsed": elapsed}
+        except Exception as e:
+            # Never raise: the caller's on_done has to run so the site gets rescheduled
+            elapsed = time.perf_counter() - started
+            return {"site": site, "status_code": None, "error": type(e).__name__,
+                    "timestamp": timestamp, "dns": _timings.dns, "connect": _timings.connect,
+                    "ttfb": elapsed, "elapsed": elapsed}
+
+    def submit(self, site: str, on_done, timeout=None):
+        """
+        Schedules a check and calls on_done(result) from a worker thread when it finishes.
+        The check starts right away unless its host is already at the per-host limit.
+        """
+        host = urlsplit(site).netloc
+        with self._lock:
+            if self._in_flight[host] >= self.per_host:
+                self._waiting[host].append((site, on_done, timeout))
+                return
+            self._in_flight[host] += 1
+        self.executor.submit(self._run, host, site, on_done, timeout)
+
+    def _run(self, host, site, on_done, timeout):
+        while True:
+            try:
+                on_done(self.check(site, timeout))
+            except Exception as e:
+                print(f"Error while handling the result for {site}: {e}")
+            # Reuse this worker for the next queued check on the same host
+            with self._lock:
+                if not self._waiting[host]:
+                    self._in_flight[host] -= 1
+                    return
+                site, on_done, timeout = self._waiting[host].popleft()
+
+    def check_many(self, sites) -> list:
+        """Checks every site concurrently and returns the results in the same order."""
+        sites = list(sites)
+        results = [None] * len(sites)
+        finished = threading.Semaphore(0)
+
+        def store(index):
+            def on_done(result):
+                results[index] = result
+                finished.release()
+            return on_done
+
+        for index, site in enumerate(sites):
+            self.submit(site, store(index))
+        for _ in sites:
+            finished.acquire()
+        return results
+
+class LatencyRing:
+    """
+    A fixed-size ring buffer of check results for one site, kept in a
+    memory-mapped file. The file never grows: once it is full the oldest
+    record is overwritten. Each record holds the timestamp, the DNS, connect,
+    TTFB and total times in milliseconds and the status code (0 on error).
+    """
+
+    MAGIC = b"WMRING1\0"
+    HEADER = struct.Struct("<8sIIIH")  # magic, capacity, next slot, record count, URL length
+    HEADER_SIZE = 512
+    RECORD = struct.Struct("<d4fh2x")
+    PHASES = ("dns", "connect", "ttfb", "total")
+
+    def __init__(self, path: Path, url: str, capacity: int = LATENCY_HISTORY_SIZE):
+        self.path = path
+        self.url = url
+        self.capacity = capacity
+        size = self.HEADER_SIZE + capacity * self.RECORD.size
+        encoded_url = url.encode("utf-8")[:self.HEADER_SIZE - self.HEADER.size]
+
+        self._file = open(path, "r+b" if path.exists() else "w+b")
+        header = self._file.read(self.HEADER.size)
+        valid = (
+            len(header) == self.HEADER.size
+            and self.HEADER.unpack(header)[0] == self.MAGIC
+            and self.HEADER.unpack(header)[1] == capacity
+            and os.path.getsize(path) == size
+        )
+        if not valid:
+            # New file, or one written with another capacity: start over
+            self._file.truncate(0)
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), size)
+        if valid:
+            _, _, self.next_slot, self.count, _ = self.HEADER.unpack_from(self._map, 0)
+        else:
+            self.next_slot, self.count = 0, 0
+            self._map[self.HEADER.size:self.HEADER.size + len(encoded_url)] = encoded_url
+            self._write_header(len(encoded_url))
+        self._url_length = len(encoded_url)
+
+    def _write_header(self, url_length: int):
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, self.capacity, self.next_slot, self.count, url_length)
+
+    def append(self, timestamp: float, dns: float, connect: float, ttfb: float, total: float, status_code: int):
+        """Stores one check (times in seconds) and overwrites the oldest one when full."""
+        offset = self.HEADER_SIZE + self.next_slot * self.RECORD.size
+        self.RECORD.pack_into(self._map, offset, timestamp, dns * 1000, connect * 1000,
+                              ttfb * 1000, total * 1000, status_code or 0)
+        self.next_slot = (self.next_slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self._write_header(self._url_length)
+
+    def recent(self, limit: int = None) -> list:
+        """Returns up to 'limit' records, newest first."""
+        limit = self.count if limit is None else min(limit, self.count)
+        records = []
+        for step in range(1, limit + 1):
+            slot = (self.next_slot - step) % self.capacity
+            records.append(self.RECORD.unpack_from(self._map, self.HEADER_SIZE + slot * self.RECORD.size))
+        return records
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+class LatencyStore:
+    """
+    Keeps a LatencyRing per site and turns them into rolling percentiles and
+    Prometheus metrics. Results are written by the monitor loop and read by
+    the metrics endpoint, so access goes through a lock.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, directory: Path = LATENCY_DIR, capacity: int = LATENCY_HISTORY_SIZE):
+        self.directory = directory
+        self.capacity = capacity
+        self.rings = {}
+        self._lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def _ring(self, url: str) -> LatencyRing:
+        ring = self.rings.get(url)
+        if ring is None:
+            file_name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".ring"
+            ring = self.rings[url] = LatencyRing(self.directory / file_name, url, self.capacity)
+        return ring
+
+    def record(self, result: dict):
+        with self._lock:
+            self._ring(result["site"]).append(result["timestamp"], result["dns"], result["connect"],
+                                              result["ttfb"], result["elapsed"], result["status_code"])
+
+    def percentiles(self, url: str, window: int = PERCENTILE_WINDOW) -> dict:
+        """
+        Returns {phase: {quantile: seconds}} over the successful checks among the last
+        'window' ones: errors (status 0) and 4xx/5xx answers are left out. Checks that reused a connection have no DNS or connect time and are left out of those.
+        """
+        with self._lock:
+            records = [record for record in self._ring(url).recent(window) if 0 < record[5] < 400]
+        stats = {}
+        for index, phase in enumerate(LatencyRing.PHASES, start=1):
+            values = sorted(record[index] / 1000 for record in records if not math.isnan(record[index]))
+            if values:
+                stats[phase] = {q: _percentile(values, q) for q in self.QUANTILES}
+        return stats
+
+    def render_metrics(self, site_status: dict) -> str:
+        """Builds the Prometheus text exposition for every site."""
+        lines = [
+            "# HELP site_up Whether the last check of the site succeeded (1) or not (0).",
+            "# TYPE site_up gauge",
+        ]
+        latency_lines = []
+        timestamp_lines = []
+        status_lines = []
+        for url in sorted(site_status):
+            label = url.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            lines.append(f'site_up{{site="{label}"}} {1 if site_status[url] == "up" else 0}')
+            for phase, quantiles in self.percentiles(url).items():
+                for quantile, seconds in quantiles.items():
+                    latency_lines.append(
+                        f'site_latency_seconds{{site="{label}",phase="{phase}",quantile="{quantile}"}} {seconds:.6f}'
+                    )
+            with self._lock:
+                last = self._ring(url).recent(1)
+            if last:
+                timestamp_lines.append(f'site_last_check_timestamp_seconds{{site="{label}"}} {last[0][0]:.3f}')
+                status_lines.append(f'site_last_status_code{{site="{label}"}} {last[0][5]}')
+
+        lines += [
+            f"# HELP site_latency_seconds Latency quantiles over the checks answered below 400 among the last {PERCENTILE_WINDOW}.",
+            "# TYPE site_latency_seconds gauge",
+        ] + latency_lines
+        lines += [
+            "# HELP site_last_check_timestamp_seconds Unix time of the last check.",
+            "# TYPE site_last_check_timestamp_seconds gauge",
+        ] + timestamp_lines
+        lines += [
+            "# HELP site_last_status_code HTTP status code of the last check (0 on a connection error).",
+            "# TYPE site_last_status_code gauge",
+        ] + status_lines
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        with self._lock:
+            for ring in self.rings.values():
+                ring.close()
+            self.rings.clear()
+
+def start_metrics_server(store: LatencyStore, site_status: dict, port: int = METRICS_PORT,
+                         host: str = METRICS_HOST):
+    """Serves the metrics at http://HOST:PORT/metrics from a background thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = store.render_metrics(dict(site_status)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics available at http://{host}:{port}/metrics")
+    return server
+
 def send_discord_notification(message: str):
     """
     Sends a message to the configured Discord webhook URL.
@@ -34,49 +442,364 @@ def send_discord_notification(message: str):
     except requests.exceptions.RequestException as e:
         print(f"Error sending notification to Discord: {e}")
 
+class AlertDispatcher:
+    """
+    Sends alerts from a background thread so the check loop never waits on
+    Discord. Alerts that arrive within ALERT_COALESCE_SECONDS of the first one
+    are sent as a single digest, and a 429 response is answered by waiting as
+    long as the Retry-After header asks before trying again.
+    """
+
+    _STOP = object()
+
+    def __init__(self, webhook_url=WEBHOOK_URL, window=ALERT_COALESCE_SECONDS, sleep=time.sleep,
+                 clock=time.monotonic):
+        self.webhook_url = webhook_url
+        self.window = window
+        self.sleep = sleep
+        self.clock = clock
+        self.queue = queue.Queue()
+        self.session = requests.Session()
+        self.sent_messages = 0
+        self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def send(self, message: str):
+        """Queues an alert and returns immediately."""
+        self.queue.put(message)
+
+    def close(self, timeout: float = 30):
+        """Sends whatever is still queued and stops the background thread."""
+        self.queue.put(self._STOP)
+        self._thread.join(timeout)
+        self.session.close()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            message = self.queue.get()
+            if message is self._STOP:
+                break
+            batch = [message]
+            deadline = self.clock() + self.window
+            while True:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    break
+                try:
+                    message = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if message is self._STOP:
+                    stopping = True
+                    break
+                batch.append(message)
+            self._deliver(batch)
+
+    def _deliver(self, batch: list):
+        """Posts one digest, split into as few messages as Discord's length limit allows."""
+        if len(batch) == 1:
+            lines = batch
+        else:
+            lines = [f"📋 {len(batch)} monitor alerts:"] + [f"• {message}" for message in batch]
+
+        chunk = ""
+        for line in lines:
+            line = line[:DISCORD_MESSAGE_LIMIT]
+            if chunk and len(chunk) + 1 + len(line) > DISCORD_MESSAGE_LIMIT:
+                self._post(chunk)
+                chunk = ""
+            chunk = f"{chunk}\n{line}" if chunk else line
+        if chunk:
+            self._post(chunk)
+
+    def _post(self, content: str):
+        if not self.webhook_url:
+            print("WARNING: Discord webhook URL is not configured. Cannot send notification.")
+            return
+
+        for attempt in range(ALERT_MAX_ATTEMPTS):
+            last_attempt = attempt == ALERT_MAX_ATTEMPTS - 1
+            try:
+                response = self.session.post(self.webhook_url, json={"content": content}, timeout=10)
+                if response.status_code == 429:
+                    if not last_attempt:
+                        self.sleep(self._retry_after(response))
+                    continue
+                response.raise_for_status() # Raise an exception for bad status codes
+                self.sent_messages += 1
+                return
+            except requests.exceptions.RequestException as e:
+                print(f"Error sending notification to Discord: {e}")
+                if not last_attempt:
+                    self.sleep(2 ** attempt)
+        print(f"Giving up on a Discord notification after {ALERT_MAX_ATTEMPTS} attempts.")
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        """Reads how long Discord wants us to wait, from the header or the JSON body."""
+        try:
+            return max(float(response.headers["Retry-After"]), 0.0)
+        except (KeyError, ValueError):
+            pass
+        try:
+            return max(float(response.json()["retry_after"]), 0.0)
+        except (ValueError, KeyError, TypeError):
+            return 1.0
+
+def _alert(message: str, notify):
+    print(message)
+    notify(message)
+
+def handle_result(result: dict, site_status: dict, site_state: dict, notify=send_discord_notification,
+                  clock=time.monotonic):
+    """
+    Compares a check result with the last known status of the site and
+    sends an alert when it goes down or comes back up. A site only changes
+    state after ALERT_AFTER_FAILURES failures or RECOVER_AFTER_SUCCESSES
+    successes in a row, and alerts are held back while it is flapping.
+    'clock' times the flap window, so it can be driven by a fake clock.
+    """
+    site = result["site"]
+    status_code = result["status_code"]
+    # Check if the status code indicates an error (4xx or 5xx)
+    failed = status_code is None or status_code >= 400
+
+    state = site_state.setdefault(site, {"failures": 0, "successes": 0, "changes": deque(), "flapping": False})
+    if failed:
+        state["failures"] += 1
+        state["successes"] = 0
+    else:
+        state["successes"] += 1
+        state["failures"] = 0
+
+    now = clock()
+    changes = state["changes"]
+    while changes and now - changes[0] > FLAP_WINDOW_SECONDS:
+        changes.popleft()
+
+    current = site_status[site]
+    if current == "up" and failed and state["failures"] >= ALERT_AFTER_FAILURES:
+        new_status = "down"
+    elif current == "down" and not failed and state["successes"] >= RECOVER_AFTER_SUCCESSES:
+        new_status = "up"
+    else:
+        new_status = current
+
+    if new_status == current:
+        if state["flapping"] and not changes:
+            state["flapping"] = False
+            _alert(f"ℹ️ {site} has settled and is {current}.", notify)
+        elif not failed and current == "up":
+            print(f"✅ {site} is running correctly.")
+        return
+
+    site_status[site] = new_status
+    changes.append(now)
+    if state["flapping"]:
+        print(f"{site} is flapping, now {new_status} (alert held back).")
+        return
+    if len(changes) >= FLAP_THRESHOLD:
+        state["flapping"] = True
+        _alert(f"⚠️ {site} is flapping ({len(changes)} changes in {FLAP_WINDOW_SECONDS // 60} minutes). "
+               f"Alerts are paused until it settles.", notify)
+        return
+
+    if new_status == "down" and status_code is None:
+        _alert(f"🚨 Alert! Cannot access {site}. Error: {result['error']}", notify)
+    elif new_status == "down":
+        _alert(f"🚨 Alert! The site {site} is down. Status code: {status_code}", notify)
+    else:
+        _alert(f"✅ Resolved! The site {site} is back up. Status code: {status_code}", notify)
+
+def load_site_configs(sites) -> list:
+    """Turns SITES_TO_MONITOR entries into dicts with every setting filled in."""
+    configs = []
+    for site in sites:
+        config = {"url": site} if isinstance(site, str) else dict(site)
+        config.setdefault("interval", CHECK_INTERVAL)
+        config.setdefault("jitter", CHECK_JITTER)
+        config.setdefault("timeout", REQUEST_TIMEOUT)
+        configs.append(config)
+    return configs
+
+class MonitorScheduler:
+    """
+    Runs each site's checks on its own schedule. Upcoming checks sit in a heap
+    ordered by due time; the main thread starts every check that is due and
+    sleeps until the next one, while results come back through a queue. A
+    slow site never delays the others, and a failing site is retried with
+    exponential backoff.
+    """
+
+    def __init__(self, sites=None, checker=None, clock=time.monotonic, store=None,
+                 notify=send_discord_notification):
+        self.sites = load_site_configs(SITES_TO_MONITOR if sites is None else sites)
+        self.checker = checker or SiteChecker()
+        self.store = store
+        self.notify = notify
+        self.clock = clock
+        self.results = queue.Queue()
+        self.heap = []
+        self._sequence = 0  # Tie-breaker so the heap never compares the dicts
+        # A dictionary to keep track of the status of each site to avoid spamming alerts
+        self.site_status = {config["url"]: "up" for config in self.sites}
+        self.site_state = {}
+        self.failures = {config["url"]: 0 for config in self.sites}
+
+        now = self.clock()
+        for config in self.sites:
+            # Spread the first round of checks a little
+            self._push(now + random.uniform(0, config["interval"] * config["jitter"]), config)
+
+    def _push(self, due: float, config: dict):
+        self._sequence += 1
+        heapq.heappush(self.heap, (due, self._sequence, config))
+
+    def next_delay(self, config: dict) -> float:
+        """Seconds until the next check of a site, based on how many times in a row it failed."""
+        failures = self.failures[config["url"]]
+        if failures:
+            delay = min(RETRY_INTERVAL * 2 ** (failures - 1), config["interval"])
+        else:
+            delay = config["interval"]
+        return delay * (1 + random.uniform(-config["jitter"], config["jitter"]))
+
+    def start_due_checks(self):
+        """Starts every check whose time has come."""
+        now = self.clock()
+        while self.heap and self.heap[0][0] <= now:
+            _, _, config = heapq.heappop(self.heap)
+            self.checker.submit(config["url"], lambda result, c=config: self.results.put((c, result)),
+                                timeout=config["timeout"])
+
+    def process_result(self, config: dict, result: dict):
+        """Handles one finished check and schedules the next one for that site."""
+        handle_result(result, self.site_status, self.site_state, self.notify, self.clock)
+        if self.store is not None:
+            self.store.record(result)
+        failed = result["status_code"] is None or result["status_code"] >= 400
+        self.failures[config["url"]] = self.failures[config["url"]] + 1 if failed else 0
+        self._push(self.clock() + self.next_delay(config), config)
+
+    def run_once(self, max_wait=None):
+        """
+        Starts the due checks and waits for one result (at most until the next
+        check is due). Returns False if nothing arrived in time.
+        """
+        self.start_due_checks()
+        timeout = max(self.heap[0][0] - self.clock(), 0) if self.heap else None
+        if max_wait is not None:
+            timeout = max_wait if timeout is None else min(timeout, max_wait)
+        try:
+            config, result = self.results.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        self.process_result(config, result)
+        return True
+
+    def run(self):
+        """Runs until interrupted."""
+        try:
+            while True:
+                self.run_once()
+        finally:
+            self.checker.close()
+
 def monitor_sites():
     """
     Continuously monitors the list of websites and sends alerts on failure.
     """
     print("Website monitor is running. Press Ctrl+C to stop.")
-    
-    # A dictionary to keep track of the status of each site to avoid spamming alerts
-    site_status = {site: "up" for site in SITES_TO_MONITOR}
+    store = LatencyStore()
+    dispatcher = AlertDispatcher()
+    scheduler = MonitorScheduler(store=store, notify=dispatcher.send)
+    server = start_metrics_server(store, scheduler.site_status) if METRICS_PORT else None
+    try:
+        scheduler.run()
+    finally:
+        if server:
+            server.shutdown()
+        dispatcher.close()
+        store.close()
 
-    while True:
-        for site in SITES_TO_MONITOR:
-            try:
-                # Set a timeout to avoid hanging indefinitely
-                response = requests.get(site, timeout=10)
-                
-                # Check if the status code indicates an error (4xx or 5xx)
-                if response.status_code >= 400:
-                    if site_status[site] == "up":
-                        message = f"🚨 Alert! The site {site} is down. Status code: {response.status_code}"
-                        print(message)
-                        send_discord_notification(message)
-                        site_status[site] = "down"
-                else: # The site is up
-                    if site_status[site] == "down":
-                        message = f"✅ Resolved! The site {site} is back up. Status code: {response.status_code}"
-                        print(message)
-                        send_discord_notification(message)
-                        site_status[site] = "up"
-                    else:
-                        print(f"✅ {site} is running correctly.")
+class _StubHandler(BaseHTTPRequestHandler):
+    """A tiny keep-alive HTTP server used by the benchmark. Every response takes 'delay' seconds."""
 
-            except requests.exceptions.RequestException as e:
-                if site_status[site] == "up":
-                    message = f"🚨 Alert! Cannot access {site}. Error: {type(e).__name__}"
-                    print(message)
-                    send_discord_notification(message)
-                    site_status[site] = "down"
-        
-        print(f"\nNext check in {CHECK_INTERVAL // 60} minutes...\n")
-        time.sleep(CHECK_INTERVAL)
+    protocol_version = "HTTP/1.1"
+    delay = 0.05
+    body = b"x" * 16384
+
+    def _respond(self, send_body: bool):
+        time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(self.body)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_message(self, format, *args):
+        pass
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Streamed GET probes hang up before reading the body, which is expected
+
+def benchmark(site_count: int = 200, hosts: int = 4, delay: float = 0.05):
+    """
+    Starts a few local stub servers and compares the old one-by-one checks
+    with the concurrent checker.
+    """
+    _StubHandler.delay = delay
+    servers = []
+    for _ in range(hosts):
+        server = _StubServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    sites = [
+        f"http://127.0.0.1:{servers[index % hosts].server_address[1]}/page/{index}"
+        for index in range(site_count)
+    ]
+
+    try:
+        started = time.perf_counter()
+        for site in sites:
+            requests.get(site, timeout=REQUEST_TIMEOUT)
+        sequential = time.perf_counter() - started
+        print(f"Sequential requests.get: {sequential:.2f} s ({site_count / sequential:.0f} checks/s)")
+
+        for probe in ("HEAD", "GET"):
+            checker = SiteChecker(probe=probe)
+            started = time.perf_counter()
+            results = checker.check_many(sites)
+            concurrent = time.perf_counter() - started
+            checker.close()
+            failures = sum(1 for result in results if result["status_code"] != 200)
+            print(f"Concurrent {probe:<4} probe:   {concurrent:.2f} s ({site_count / concurrent:.0f} checks/s, "
+                  f"{sequential / concurrent:.1f}x faster, {failures} failure(s))")
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
 
 if __name__ == "__main__":
-    if not WEBHOOK_URL:
+    parser = argparse.ArgumentParser(description="Monitor websites and send Discord alerts on failure.")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=200, metavar="SITES",
+                        help="Compare sequential and concurrent checks against local stub servers and exit.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    elif not WEBHOOK_URL:
         print("ERROR: DISCORD_WEBHOOK_URL environment variable is not set.")
         print("Please set it before running the script.")
     else:
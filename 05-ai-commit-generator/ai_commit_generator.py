@@ -1,12 +1,89 @@
 import subprocess
 import ollama
+import fnmatch
+import hashlib
+import os
+import re
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 # --- CONFIGURATION ---
 # The local AI model you want to use (e.g., 'llama3', 'phi3', 'mistral')
 # Make sure you have pulled it with 'ollama pull <model_name>'
-AI_MODEL = 'phi3' 
+AI_MODEL = 'phi3'
+
+# Rough token budget for a single prompt. Diffs that fit are sent in one go;
+# bigger ones are summarized file by file (and hunk by hunk) first.
+MAX_PROMPT_TOKENS = 3000
+
+# How many per-file summaries are requested from Ollama at the same time
+MAP_WORKERS = 4
+
+# Files that are only described by their line counts, never sent to the model
+LOCKFILE_NAMES = {
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock", "Pipfile.lock",
+    "Cargo.lock", "composer.lock", "Gemfile.lock", "go.sum", "uv.lock",
+}
+GENERATED_PATTERNS = [
+    "*.min.js", "*.min.css", "*.map", "*_pb2.py", "*.pb.go", "*.snap",
+    "dist/*", "build/*", "vendor/*", "node_modules/*",
+]
+
+# Generated messages are cached on disk, so running the tool again on the same
+# staged diff returns instantly. The least recently used entries are removed
+# once the cache grows past CACHE_MAX_BYTES.
+CACHE_DIR = Path.home() / ".cache" / "ai_commit_generator"
+CACHE_MAX_BYTES = 5 * 1024 * 1024  # 5 MiB
+
+# Bump this whenever the prompts below change, so old cached answers are not reused
+PROMPT_VERSION = "2"
 # ---------------------
 
+COMMIT_PROMPT = """
+    Based on the following 'git diff', please generate a concise and professional commit message.
+    The message must follow the Conventional Commits specification.
+    The format should be: <type>[optional scope]: <description>
+
+    Common types include: feat, fix, docs, style, refactor, test, chore.
+
+    The description should be in the present tense, e.g., "add feature" not "added feature".
+    Do not include any explanations, just the raw commit message itself.
+
+    Diff:
+    ---
+    {diff}
+    ---
+    """
+
+MAP_PROMPT = """
+    Summarize what the following change to '{path}' does in one or two short sentences.
+    Describe the intent of the change, not the individual lines.
+    Do not include any explanations, just the summary itself.
+
+    Diff:
+    ---
+    {diff}
+    ---
+    """
+
+REDUCE_PROMPT = """
+    Below is a summary of every file changed in a commit.
+    Based on it, please generate a concise and professional commit message.
+    The message must follow the Conventional Commits specification.
+    The format should be: <type>[optional scope]: <description>
+
+    Common types include: feat, fix, docs, style, refactor, test, chore.
+
+    The description should be in the present tense, e.g., "add feature" not "added feature".
+    Do not include any explanations, just the raw commit message itself.
+
+    Changed files:
+    ---
+    {summaries}
+    ---
+    """
+
 def get_staged_changes() -> str:
     """
     Gets the changes staged for commit using 'git diff --staged'.
@@ -29,53 +106,257 @@ def get_staged_changes() -> str:
         print("No staged changes found. Use 'git add' to stage your files.")
         return ""
 
-def generate_commit_message(diff: str) -> str:
+class ResponseCache:
+    """
+    A small on-disk cache with one file per entry. A file's modification time
+    doubles as its last-used time: hits touch the file, and eviction removes
+    the least recently used files first.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(diff: str, model: str, prompt_version: str = PROMPT_VERSION) -> str:
+        digest = hashlib.sha256()
+        for part in (prompt_version, model, diff):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """Returns the cached text, or None on a miss."""
+        path = self.directory / f"{key}.txt"
+        try:
+            text = path.read_text(encoding="utf-8")
+            os.utime(path)  # Mark as recently used
+            return text
+        except OSError:
+            return None
+
+    def put(self, key: str, text: str):
+        """Stores an entry and evicts old ones if the cache is too big."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp_path = self.directory / f"{key}.tmp"
+            temp_path.write_text(text, encoding="utf-8")
+            os.replace(temp_path, self.directory / f"{key}.txt")
+            self.evict()
+        except OSError as e:
+            print(f"Could not write to the cache: {e}")
+
+    def evict(self):
+        entries = []
+        for path in self.directory.glob("*.txt"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+def estimate_tokens(text: str) -> int:
+    """A cheap token estimate (about four characters per token)."""
+    return len(text) // 4 + 1
+
+def split_diff(diff: str) -> list:
+    """
+    Splits a unified git diff into one dict per file with its 'path', 'header'
+    (the lines before the first hunk), 'hunks', 'added'/'removed' line counts
+    and whether it is 'binary'.
+    """
+    files = []
+    current = None
+    for line in diff.splitlines(keepends=True):
+        if line.startswith("diff --git "):
+            match = re.match(r"diff --git a/(.*) b/(.*)", line.rstrip("\n"))
+            path = match.group(2) if match else line[len("diff --git "):].strip()
+            current = {"path": path, "header": [line], "hunks": [], "added": 0, "removed": 0, "binary": False}
+            files.append(current)
+        elif current is None:
+            continue
+        elif line.startswith("@@"):
+            current["hunks"].append([line])
+        elif current["hunks"]:
+            current["hunks"][-1].append(line)
+            if line.startswith("+"):
+                current["added"] += 1
+            elif line.startswith("-"):
+                current["removed"] += 1
+        else:
+            current["header"].append(line)
+            if line.startswith("Binary files") or line.startswith("GIT binary patch"):
+                current["binary"] = True
+    return files
+
+def skip_reason(file: dict):
+    """Returns why a file should only be described by stats ('binary', 'lockfile', 'generated'), or None."""
+    path = file["path"]
+    if file["binary"]:
+        return "binary"
+    if path.rsplit("/", 1)[-1] in LOCKFILE_NAMES:
+        return "lockfile"
+    if any(fnmatch.fnmatch(path, pattern) for pattern in GENERATED_PATTERNS):
+        return "generated"
+    return None
+
+def chunk_file(file: dict, budget: int = MAX_PROMPT_TOKENS) -> list:
+    """
+    Splits one file's diff into pieces that fit the token budget, keeping
+    whole hunks together when possible and truncating a hunk that is too big on its own.
+    """
+    header = "".join(file["header"])
+    chunks = []
+    current = header
+    for hunk in file["hunks"]:
+        text = "".join(hunk)
+        if estimate_tokens(text) + estimate_tokens(header) > budget:
+            text = text[:max(budget - estimate_tokens(header), 1) * 4] + "\n... (hunk truncated)\n"
+        if current != header and estimate_tokens(current) + estimate_tokens(text) > budget:
+            chunks.append(current)
+            current = header
+        current += text
+    chunks.append(current)
+    return chunks
+
+def _chat(client, prompt: str, on_token=None) -> str:
+    """Sends one prompt. With on_token, the answer is streamed and each piece is passed to it as it arrives."""
+    messages = [{'role': 'user', 'content': prompt}]
+    if on_token is None:
+        response = client.chat(model=AI_MODEL, messages=messages)
+        return response['message']['content'].strip()
+
+    pieces = []
+    for chunk in client.chat(model=AI_MODEL, messages=messages, stream=True):
+        piece = chunk['message']['content']
+        pieces.append(piece)
+        on_token(piece)
+    return "".join(pieces).strip()
+
+def summarize_file(client, file: dict) -> tuple:
+    """Map step: asks the model to summarize one file. Returns (summary line, seconds spent, succeeded)."""
+    started = time.perf_counter()
+    stats = f"+{file['added']} -{file['removed']}"
+    try:
+        parts = [_chat(client, MAP_PROMPT.format(path=file["path"], diff=chunk)) for chunk in chunk_file(file)]
+        summary, succeeded = " ".join(parts), True
+    except Exception as e:
+        summary, succeeded = f"(could not summarize: {e})", False
+    return f"- {file['path']} ({stats}): {summary}", time.perf_counter() - started, succeeded
+
+def generate_commit_message(diff: str, client=None, cache=None, on_token=None, timings=None) -> str:
     """
     Uses a local LLM via Ollama to generate a commit message based on the diff.
+    A diff that was seen before is answered from the cache. Small diffs go out
+    in a single prompt. Larger ones are split per file: lockfiles, generated
+    and binary files are reduced to their stats, the rest are summarized
+    concurrently, and one final prompt turns the summaries into the commit message.
+    The final answer is streamed to on_token as it is generated, if given.
+    Messages built from a failed file summary are not cached.
+    Step durations are written into the 'timings' dict, if given.
     """
     if not diff.strip():
         return "No changes to generate a message for."
 
-    # This prompt is designed to guide the AI to give a high-quality commit message
-    prompt = f"""
-    Based on the following 'git diff', please generate a concise and professional commit message.
-    The message must follow the Conventional Commits specification.
-    The format should be: <type>[optional scope]: <description>
-    
-    Common types include: feat, fix, docs, style, refactor, test, chore.
-    
-    The description should be in the present tense, e.g., "add feature" not "added feature".
-    Do not include any explanations, just the raw commit message itself.
+    client = client or ollama.Client()
+    cache = cache if cache is not None else ResponseCache()
+    timings = {} if timings is None else timings
+    started = time.perf_counter()
 
-    Diff:
-    ---
-    {diff}
-    ---
-    """
-    
+    cache_key = cache.make_key(diff, AI_MODEL)
+    cached = cache.get(cache_key)
+    timings["cache"] = time.perf_counter() - started
+    if cached is not None:
+        print("⚡ Using the cached message for this diff.")
+        timings["total"] = time.perf_counter() - started
+        return cached
+
+    complete = True
     try:
-        print(f"🤖 Contacting model '{AI_MODEL}' to generate commit message...")
-        response = ollama.chat(
-            model=AI_MODEL,
-            messages=[{'role': 'user', 'content': prompt}]
-        )
-        return response['message']['content'].strip()
+        files = split_diff(diff)
+        to_summarize = [file for file in files if not skip_reason(file)]
+        stats_only = [
+            f"- {file['path']} ({skip_reason(file)}, +{file['added']} -{file['removed']})"
+            for file in files if skip_reason(file)
+        ]
+        timings["split"] = time.perf_counter() - started
+
+        filtered_diff = "".join("".join(file["header"]) + "".join("".join(h) for h in file["hunks"])
+                                for file in to_summarize)
+        if estimate_tokens(filtered_diff) <= MAX_PROMPT_TOKENS:
+            # Fits in one prompt: no need for the map step
+            print(f"🤖 Contacting model '{AI_MODEL}' to generate commit message...")
+            step_started = time.perf_counter()
+            prompt_diff = filtered_diff + ("\n" + "\n".join(stats_only) if stats_only else "")
+            message = _chat(client, COMMIT_PROMPT.format(diff=prompt_diff), on_token)
+            timings["generate"] = time.perf_counter() - step_started
+        else:
+            print(f"🤖 Summarizing {len(to_summarize)} file(s) with model '{AI_MODEL}' "
+                  f"({len(stats_only)} skipped as lockfile/generated/binary)...")
+            step_started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=MAP_WORKERS) as executor:
+                results = list(executor.map(lambda file: summarize_file(client, file), to_summarize))
+            timings["map"] = time.perf_counter() - step_started
+            timings["map (sum of calls)"] = sum(seconds for _, seconds, _ in results)
+            complete = all(succeeded for _, _, succeeded in results)
+
+            summaries = [summary for summary, _, _ in results] + stats_only
+            # Keep the reduce prompt inside the budget too
+            while len(summaries) > 1 and estimate_tokens("\n".join(summaries)) > MAX_PROMPT_TOKENS:
+                summaries.pop()
+            if len(summaries) < len(results) + len(stats_only):
+                summaries.append(f"- ... and {len(results) + len(stats_only) - len(summaries)} more file(s)")
+
+            print("🤖 Combining the summaries into a commit message...")
+            step_started = time.perf_counter()
+            message = _chat(client, REDUCE_PROMPT.format(summaries="\n".join(summaries)), on_token)
+            timings["reduce"] = time.perf_counter() - step_started
     except Exception as e:
         # This will catch errors if Ollama isn't running or the model isn't found
         return f"Error generating message: {e}\nIs the Ollama server running and the model '{AI_MODEL}' pulled?"
 
+    if complete:
+        cache.put(cache_key, message)
+    timings["total"] = time.perf_counter() - started
+    return message
+
 def main():
     """
     Main function to orchestrate getting the diff and generating the message.
     """
     staged_diff = get_staged_changes()
-    
+
     if staged_diff:
-        commit_message = generate_commit_message(staged_diff)
-        print("\n--- Suggested Commit Message ---")
-        print(commit_message)
-        print("------------------------------\n")
-        
+        streamed = []
+
+        def show_token(piece: str):
+            # The message appears as the model writes it
+            if not streamed:
+                print("\n--- Suggested Commit Message ---")
+            streamed.append(piece)
+            print(piece, end="", flush=True)
+
+        timings = {}
+        commit_message = generate_commit_message(staged_diff, on_token=show_token, timings=timings)
+        if streamed and "".join(streamed).strip() == commit_message:
+            print("\n------------------------------\n")
+        elif streamed:
+            # The stream broke off, e.g. with an error from Ollama: show what was actually returned
+            print("\n------------------------------\n")
+            print(commit_message + "\n")
+        else:
+            print("\n--- Suggested Commit Message ---")
+            print(commit_message)
+            print("------------------------------\n")
+        if timings:
+            print("⏱️  " + " | ".join(f"{step}: {seconds:.2f} s" for step, seconds in timings.items()))
+
         # Ask the user if they want to use this message
         # use_it = input("Do you want to use this message for your commit? (y/n): ").lower()
         # if use_it == 'y':
@@ -0,0 +1,132 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ai_commit_generator import AI_MODEL, MAX_PROMPT_TOKENS, ResponseCache, generate_commit_message
+
+
+def make_diff(path, lines):
+    body = "".join(f"+line {number} of {path}\n" for number in range(lines))
+    return (f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n"
+            f"@@ -0,0 +1,{lines} @@\n{body}")
+
+
+class StubOllamaClient:
+    """Stands in for ollama.Client: answers every prompt and records what it was sent."""
+
+    def __init__(self, answer="feat: add the thing", fail_after=None, fail_paths=()):
+        self.answer = answer
+        self.fail_after = fail_after  # Pieces streamed before the stream breaks off
+        self.fail_paths = fail_paths  # Files whose summary request fails
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def chat(self, model, messages, stream=False):
+        prompt = messages[-1]["content"]
+        with self.lock:
+            self.prompts.append(prompt)
+        if any(f"change to '{path}'" in prompt for path in self.fail_paths):
+            raise ConnectionError("model crashed")
+        if not stream:
+            return {"message": {"content": self.answer}}
+        return self._stream()
+
+    def _stream(self):
+        for number, piece in enumerate(self.answer.split(" ")):
+            if number == self.fail_after:
+                raise ConnectionError("stream closed")
+            yield {"message": {"content": piece if number == 0 else " " + piece}}
+
+
+class GenerateTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = ResponseCache(Path(directory.name))
+
+    def generate(self, diff, client, on_token=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generate_commit_message(diff, client=client, cache=self.cache, on_token=on_token)
+
+    def test_streams_then_answers_repeats_from_the_cache(self):
+        client = StubOllamaClient()
+        pieces = []
+        diff = make_diff("app.py", 5)
+        self.assertEqual(self.generate(diff, client, pieces.append), "feat: add the thing")
+        self.assertEqual(pieces, ["feat:", " add", " the", " thing"])
+
+        pieces.clear()
+        self.assertEqual(self.generate(diff, client, pieces.append), "feat: add the thing")
+        self.assertEqual(len(client.prompts), 1)
+        self.assertEqual(pieces, [])
+
+    def test_broken_stream_is_reported_and_not_cached(self):
+        diff = make_diff("app.py", 5)
+        message = self.generate(diff, StubOllamaClient(fail_after=2), lambda piece: None)
+        self.assertTrue(message.startswith("Error generating message: stream closed"))
+
+        client = StubOllamaClient()
+        self.assertEqual(self.generate(diff, client), "feat: add the thing")
+        self.assertEqual(len(client.prompts), 1)
+
+    def test_large_diff_is_summarized_per_file(self):
+        lines = MAX_PROMPT_TOKENS // 5  # Each file fits a prompt, two together don't
+        diff = make_diff("a.py", lines) + make_diff("b.py", lines) + make_diff("package-lock.json", lines)
+        client = StubOllamaClient()
+        self.assertEqual(self.generate(diff, client), "feat: add the thing")
+        # One summary per source file, the lockfile only by its stats, then the reduce prompt
+        self.assertEqual(len(client.prompts), 3)
+        self.assertFalse(any("line 0 of package-lock.json" in prompt for prompt in client.prompts))
+        self.assertIn("- package-lock.json (lockfile, +", client.prompts[-1])
+
+        self.generate(diff, client)
+        self.assertEqual(len(client.prompts), 3)
+
+    def test_failed_summary_is_not_cached(self):
+        lines = MAX_PROMPT_TOKENS // 5  # Each file fits a prompt, two together don't
+        diff = make_diff("a.py", lines) + make_diff("b.py", lines)
+        client = StubOllamaClient(fail_paths=["b.py"])
+        self.assertEqual(self.generate(diff, client), "feat: add the thing")
+        self.assertIn("- b.py (+", client.prompts[-1])
+        self.assertIn("could not summarize: model crashed", client.prompts[-1])
+
+        self.generate(diff, client)
+        self.assertEqual(len(client.prompts), 6)
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_key_covers_diff_model_and_prompt_version(self):
+        key = ResponseCache.make_key("diff", AI_MODEL)
+        self.assertEqual(key, ResponseCache.make_key("diff", AI_MODEL))
+        self.assertNotEqual(key, ResponseCache.make_key("diff2", AI_MODEL))
+        self.assertNotEqual(key, ResponseCache.make_key("diff", "other-model"))
+        self.assertNotEqual(key, ResponseCache.make_key("diff", AI_MODEL, prompt_version="old"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(self.directory, max_bytes=25)
+        cache.put("a", "x" * 10)
+        cache.put("b", "x" * 10)
+        os.utime(self.directory / "a.txt", (1000, 1000))
+        os.utime(self.directory / "b.txt", (2000, 2000))
+        self.assertIsNotNone(cache.get("a"))  # Now the most recently used
+
+        cache.put("c", "x" * 10)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
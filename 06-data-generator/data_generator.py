@@ -1,6 +1,16 @@
 from faker import Faker
+import numpy as np
 import pandas as pd
-from typing import List, Dict, Any
+import argparse
+import gzip
+import io
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 
 # --- CONFIGURATION ---
@@ -9,18 +19,35 @@ NUMBER_OF_RECORDS = 2000
 
 # The name of the output CSV file
 OUTPUT_FILE = Path("synthetic_customer_data.csv")
+
+# How many distinct names, emails, phone numbers, addresses and countries
+# Faker pre-generates. Rows pick from these pools, so text columns cost almost nothing per row.
+TEXT_POOL_SIZE = 10_000
+
+# Rows generated and written per step. Peak memory depends on this, not on the total row count.
+CHUNK_SIZE = 100_000
+
+# Rows per shard when generating in parallel (--workers / --seed). Output depends on the seed,
+# the shard size and the chunk size - never on the number of workers.
+SHARD_ROWS = 500_000
 # ---------------------
 
+COLUMNS = [
+    "customer_id", "full_name", "email", "phone_number", "address",
+    "country", "signup_date", "last_login_ip", "total_spent",
+]
+
 def generate_customer_data(count: int) -> List[Dict[str, Any]]:
     """
     Generates a list of synthetic customer data using the Faker library.
+    This is the original row-by-row version, kept as the benchmark baseline.
     """
     # Initialize Faker. You can specify a locale, e.g., 'en_US'.
     fake = Faker()
     customers = []
-    
+
     print(f"Generating {count} records of customer data...")
-    
+
     for _ in range(count):
         customers.append({
             "customer_id": fake.uuid4(),
@@ -35,26 +62,354 @@ def generate_customer_data(count: int) -> List[Dict[str, Any]]:
         })
     return customers
 
-def main():
+def build_text_pools(size: int = TEXT_POOL_SIZE, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Asks Faker once for 'size' values of every text column."""
+    fake = Faker()
+    if seed is not None:
+        fake.seed_instance(seed)
+    return {
+        "full_name": np.array([fake.name() for _ in range(size)], dtype=object),
+        "email": np.array([fake.email() for _ in range(size)], dtype=object),
+        "phone_number": np.array([fake.phone_number() for _ in range(size)], dtype=object),
+        "address": np.array([fake.address().replace('\n', ', ') for _ in range(size)], dtype=object),
+        "country": np.array([fake.country() for _ in range(size)], dtype=object),
+    }
+
+def _uuid4_column(rng: np.random.Generator, count: int) -> np.ndarray:
+    """Builds 'count' random version-4 UUID strings without a Python loop."""
+    raw = rng.integers(0, 256, size=(count, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # Version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    hex_digits = np.frombuffer(raw.tobytes().hex().encode("ascii"), dtype=np.uint8).reshape(count, 32)
+
+    text = np.full((count, 36), ord("-"), dtype=np.uint8)
+    text[:, 0:8] = hex_digits[:, 0:8]
+    text[:, 9:13] = hex_digits[:, 8:12]
+    text[:, 14:18] = hex_digits[:, 12:16]
+    text[:, 19:23] = hex_digits[:, 16:20]
+    text[:, 24:36] = hex_digits[:, 20:32]
+    return text.view("S36").ravel().astype(str).astype(object)
+
+_OCTETS = np.array([str(value) for value in range(256)], dtype=object)
+
+def _ipv4_column(rng: np.random.Generator, count: int) -> np.ndarray:
+    """Builds 'count' random IPv4 addresses in the 1.0.0.0 - 223.255.255.255 range."""
+    octets = rng.integers(0, 256, size=(count, 4))
+    octets[:, 0] = rng.integers(1, 224, size=count)
+    return (_OCTETS[octets[:, 0]] + "." + _OCTETS[octets[:, 1]] + "."
+            + _OCTETS[octets[:, 2]] + "." + _OCTETS[octets[:, 3]])
+
+def generate_customer_columns(count: int, rng: Optional[np.random.Generator] = None,
+                              pools: Optional[Dict[str, np.ndarray]] = None,
+                              today: Optional[date] = None) -> pd.DataFrame:
     """
-    Main function to generate data and save it to a CSV file.
+    Generates the same columns as generate_customer_data, a whole column at a time.
+    Numbers, UUIDs, IPs and dates come straight from NumPy; text columns are
+    picked by index from pools Faker filled once.
+    """
+    rng = rng or np.random.default_rng()
+    pools = pools or build_text_pools()
+    today = today or date.today()
+
+    # Signup dates fall between the start of this decade and today, like Faker's date_this_decade()
+    decade_start = np.datetime64(date(today.year - today.year % 10, 1, 1), "D")
+    span_days = (np.datetime64(today, "D") - decade_start).astype(int)
+
+    columns = {"customer_id": _uuid4_column(rng, count)}
+    for name in ("full_name", "email", "phone_number", "address", "country"):
+        pool = pools[name]
+        columns[name] = pool[rng.integers(0, len(pool), size=count)]
+    columns["signup_date"] = decade_start + rng.integers(0, span_days + 1, size=count).astype("timedelta64[D]")
+    columns["last_login_ip"] = _ipv4_column(rng, count)
+    columns["total_spent"] = rng.integers(1, 100_000, size=count) / 100  # 0.01 - 999.99
+
+    return pd.DataFrame(columns, columns=COLUMNS)
+
+def detect_format(path: Path) -> str:
+    """Picks the output format from the file name: .csv, .csv.gz, .jsonl or .parquet."""
+    name = path.name.lower()
+    for suffix, fmt in ((".csv.gz", "csv.gz"), (".csv", "csv"), (".jsonl", "jsonl"), (".parquet", "parquet")):
+        if name.endswith(suffix):
+            return fmt
+    raise ValueError(f"Can't tell the output format of '{path}'. Use .csv, .csv.gz, .jsonl or .parquet.")
+
+class ChunkWriter:
+    """
+    Appends DataFrame chunks to a single CSV, gzip CSV, JSON Lines or Parquet file,
+    so only one chunk has to be in memory at a time.
+    """
+
+    FORMATS = ("csv", "csv.gz", "jsonl", "parquet")
+
+    def __init__(self, path: Path, fmt: Optional[str] = None, header: bool = True):
+        self.path = Path(path)
+        self.fmt = fmt or detect_format(self.path)
+        if self.fmt not in self.FORMATS:
+            raise ValueError(f"Unknown output format '{self.fmt}'.")
+        self._handle = None
+        self._raw = None
+        self._parquet = None
+        self._header = header
+
+        if self.fmt == "parquet":
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise RuntimeError("Writing Parquet needs pyarrow: pip install pyarrow") from None
+            self._pyarrow = pyarrow
+        elif self.fmt == "csv.gz":
+            # No timestamp or file name in the gzip header, so the same rows always give the same bytes
+            self._raw = open(self.path, "wb")
+            compressed = gzip.GzipFile(filename="", mode="wb", fileobj=self._raw, mtime=0)
+            self._handle = io.TextIOWrapper(compressed, encoding="utf-8", newline="")
+        else:
+            self._handle = open(self.path, "w", encoding="utf-8", newline="")
+
+    def write(self, df: pd.DataFrame):
+        if self.fmt == "parquet":
+            table = self._pyarrow.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = self._pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        elif self.fmt == "jsonl":
+            # Plain YYYY-MM-DD dates, the same as in the CSV output
+            dates = np.datetime_as_string(df["signup_date"].to_numpy().astype("datetime64[D]"))
+            df.assign(signup_date=dates).to_json(self._handle, orient="records", lines=True)
+        else:
+            df.to_csv(self._handle, index=False, header=self._header)
+        self._header = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._handle is not None:
+            self._handle.close()
+        if self._raw is not None:
+            self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def write_customer_data(count: int, output_file: Path, fmt: Optional[str] = None,
+                        chunk_size: int = CHUNK_SIZE, progress: bool = True,
+                        rng: Optional[np.random.Generator] = None,
+                        pools: Optional[Dict[str, np.ndarray]] = None,
+                        today: Optional[date] = None, header: bool = True) -> Optional[pd.DataFrame]:
+    """
+    Generates 'count' rows chunk by chunk and streams them to 'output_file'.
+    Returns the first chunk so the caller can show a preview.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"The chunk size must be a positive number of rows, not {chunk_size}.")
+    rng = rng or np.random.default_rng()
+    pools = pools or build_text_pools()
+    today = today or date.today()
+    first_chunk = None
+    written = 0
+    started = time.perf_counter()
+
+    with ChunkWriter(output_file, fmt, header) as writer:
+        while written < count:
+            df = generate_customer_columns(min(chunk_size, count - written), rng, pools, today)
+            writer.write(df)
+            if first_chunk is None:
+                first_chunk = df.head()
+            written += len(df)
+
+            if progress:
+                elapsed = time.perf_counter() - started
+                sys.stdout.write(f"\r  {written:,}/{count:,} rows ({written / count:.0%}) "
+                                 f"- {written / elapsed:,.0f} rows/s")
+                sys.stdout.flush()
+
+    if progress:
+        print()
+    return first_chunk
+
+def shard_path(output_file: Path, fmt: str, index: int) -> Path:
+    """data.csv.gz -> data.part-00003.csv.gz"""
+    suffix = "." + fmt
+    name = output_file.name
+    stem = name[:-len(suffix)] if name.lower().endswith(suffix) else output_file.stem
+    return output_file.with_name(f"{stem}.part-{index:05d}{suffix}")
+
+# Text pools handed to each worker process once, then reused for every shard it handles
+_worker_pools: Optional[Dict[str, np.ndarray]] = None
+
+def _init_worker(pools: Dict[str, np.ndarray]):
+    global _worker_pools
+    _worker_pools = pools
+
+def generate_shard(index: int, rows: int, seed: int, path: str, fmt: str,
+                   chunk_size: int, today: date, header: bool) -> int:
+    """
+    Process pool worker: writes one shard file. Its rows depend only on the master
+    seed and the shard index, so it doesn't matter which worker runs it.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+    write_customer_data(rows, Path(path), fmt, chunk_size, progress=False,
+                        rng=rng, pools=_worker_pools, today=today, header=header)
+    return rows
+
+def merge_shards(paths: List[Path], output_file: Path, fmt: str):
+    """
+    Joins shard files in order into 'output_file' and deletes them.
+    CSV, JSON Lines and gzip (as multiple gzip members) are plain byte concatenation;
+    Parquet copies row groups one at a time.
+    """
+    tmp_path = output_file.with_name(output_file.name + ".tmp")
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = None
+        for path in paths:
+            shard = pq.ParquetFile(path)
+            for group in range(shard.num_row_groups):
+                table = shard.read_row_group(group)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    else:
+        with open(tmp_path, "wb") as merged:
+            for path in paths:
+                with open(path, "rb") as shard:
+                    shutil.copyfileobj(shard, merged, 1024 * 1024)
+
+    os.replace(tmp_path, output_file)
+    for path in paths:
+        path.unlink()
+
+def generate_sharded(count: int, output_file: Path, fmt: Optional[str] = None, seed: Optional[int] = None,
+                     workers: int = 1, shard_rows: int = SHARD_ROWS, chunk_size: int = CHUNK_SIZE,
+                     merge: bool = True, today: Optional[date] = None) -> List[Path]:
+    """
+    Splits 'count' rows into shards of 'shard_rows' and generates them on a process pool.
+    Each shard gets its own seed derived from the master seed, so the same seed, shard
+    size and chunk size give byte-identical files whatever the number of workers.
+    Returns the merged file, or the shard files when merge is False.
+    """
+    if shard_rows < 1 or chunk_size < 1:
+        raise ValueError("The shard and chunk sizes must be positive numbers of rows.")
+    output_file = Path(output_file)
+    fmt = fmt or detect_format(output_file)
+    today = today or date.today()
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+        print(f"🎲 Seed {seed} (pass --seed to reproduce this data)")
+
+    shards = []
+    for index, start in enumerate(range(0, count, shard_rows)):
+        shards.append((index, min(shard_rows, count - start), shard_path(output_file, fmt, index)))
+
+    # Faker fills the pools once here; workers receive a copy instead of rebuilding them
+    pools = build_text_pools(seed=seed)
+
+    written = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(pools,)) as pool:
+        # When merging, only the first shard carries the CSV header
+        futures = [
+            pool.submit(generate_shard, index, rows, seed, str(path), fmt, chunk_size, today,
+                        not merge or index == 0)
+            for index, rows, path in shards
+        ]
+        for future in as_completed(futures):
+            written += future.result()
+            elapsed = time.perf_counter() - started
+            sys.stdout.write(f"\r  {written:,}/{count:,} rows ({written / count:.0%}) "
+                             f"- {written / elapsed:,.0f} rows/s on {workers} worker(s)")
+            sys.stdout.flush()
+    print()
+
+    paths = [path for _, _, path in shards]
+    if merge:
+        merge_shards(paths, output_file, fmt)
+        return [output_file]
+    return paths
+
+def positive_int(value: str) -> int:
+    """argparse type for sizes that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+def benchmark(count: int = 100_000, baseline_count: int = 10_000):
+    """Compares rows/sec of the row-by-row generator with the columnar one."""
+    baseline_count = min(count, baseline_count)
+
+    started = time.perf_counter()
+    pd.DataFrame(generate_customer_data(baseline_count))
+    baseline = baseline_count / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    pools = build_text_pools()
+    pool_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    generate_customer_columns(count, pools=pools)
+    columnar = count / (time.perf_counter() - started)
+
+    print(f"\nRow-by-row: {baseline:,.0f} rows/s ({baseline_count:,} rows)")
+    print(f"Columnar:   {columnar:,.0f} rows/s ({count:,} rows, plus {pool_seconds:.2f} s to fill the text pools once)")
+    print(f"Speedup:    {columnar / baseline:.0f}x")
+
+def main(count: int = NUMBER_OF_RECORDS, output_file: Path = OUTPUT_FILE,
+         fmt: Optional[str] = None, chunk_size: int = CHUNK_SIZE, seed: Optional[int] = None,
+         workers: int = 1, shard_rows: int = SHARD_ROWS, merge: bool = True, today: Optional[date] = None):
+    """
+    Main function to generate data and stream it to a CSV, gzip CSV, JSON Lines or Parquet file.
+    A seed or more than one worker switches to reproducible sharded generation.
     """
     try:
-        customer_data = generate_customer_data(NUMBER_OF_RECORDS)
-        
-        # Convert the list of dictionaries to a Pandas DataFrame
-        # This is a highly efficient way to handle tabular data
-        df = pd.DataFrame(customer_data)
-        
-        # Save the DataFrame to a CSV file without the default Pandas index
-        df.to_csv(OUTPUT_FILE, index=False, encoding='utf-8')
-        
-        print(f"\n✅ Successfully generated {NUMBER_OF_RECORDS} records in '{OUTPUT_FILE}'")
-        print("Here are the first 5 rows:")
-        print(df.head())
+        print(f"Generating {count} records of customer data...")
+        started = time.perf_counter()
+        if seed is None and workers == 1:
+            preview = write_customer_data(count, output_file, fmt, chunk_size, today=today)
+            paths = [output_file]
+        else:
+            preview = None
+            paths = generate_sharded(count, output_file, fmt, seed, workers, shard_rows, chunk_size, merge, today)
+        elapsed = time.perf_counter() - started
+
+        if len(paths) == 1:
+            print(f"\n✅ Successfully generated {count} records in '{paths[0]}' ({elapsed:.2f} s)")
+        else:
+            print(f"\n✅ Successfully generated {count} records in {len(paths)} shard files ({elapsed:.2f} s):")
+            for path in paths:
+                print(f"  - {path}")
+        if preview is not None:
+            print("Here are the first 5 rows:")
+            print(preview)
 
     except Exception as e:
         print(f"An error occurred: {e}")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate realistic fake customer data.")
+    parser.add_argument("--rows", type=int, default=NUMBER_OF_RECORDS, help="Number of records to generate.")
+    parser.add_argument("--output", type=Path, default=OUTPUT_FILE,
+                        help="Where to write the data. The format follows the extension unless --format is given.")
+    parser.add_argument("--format", choices=ChunkWriter.FORMATS, help="Output format.")
+    parser.add_argument("--chunk-size", type=positive_int, default=CHUNK_SIZE, help="Rows generated and written per step.")
+    parser.add_argument("--seed", type=int, help="Master seed. The same seed always gives the same bytes.")
+    parser.add_argument("--workers", type=positive_int, default=1, help="Generate shards on this many processes.")
+    parser.add_argument("--shard-rows", type=positive_int, default=SHARD_ROWS, help="Rows per shard.")
+    parser.add_argument("--no-merge", action="store_true", help="Keep the shard files instead of joining them.")
+    parser.add_argument("--as-of", type=date.fromisoformat, metavar="YYYY-MM-DD",
+                        help="Pretend today is this date, so seeded signup dates don't drift day to day.")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=100_000, metavar="ROWS",
+                        help="Compare the row-by-row and columnar generators and exit.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        main(args.rows, args.output, args.format, args.chunk_size, args.seed,
+             args.workers, args.shard_rows, not args.no_merge, args.as_of)
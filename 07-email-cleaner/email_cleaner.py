@@ -1,8 +1,24 @@
 import imaplib
 import email
+import email.message
 from email.header import decode_header
 import os
-from datetime import datetime, timedelta
+import re
+import json
+import hashlib
+import argparse
+import queue
+import socketserver
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta, date
+from itertools import chain, zip_longest
+from pathlib import Path
+from typing import Dict, List, Iterable, Iterator, Optional
 
 # --- CONFIGURATION ---
 # Use environment variables for your credentials for security
@@ -10,10 +26,40 @@ IMAP_SERVER = "imap.gmail.com"
 EMAIL_USER = os.getenv("EMAIL_USER")
 EMAIL_PASS = os.getenv("EMAIL_PASS") # IMPORTANT: Use an app-specific password for services like Gmail
 
+# Longest UID set sent in a single command. Servers commonly reject command lines
+# above ~8 KB, so bigger sets are split into several commands.
+UID_SET_MAX_CHARS = 4000
+
+# How far each folder was processed last time (UIDVALIDITY, last UID, HIGHESTMODSEQ),
+# so later runs only search messages that are new or could have started matching since
+SYNC_STATE_FILE = Path.home() / ".cache" / "email_cleaner" / "sync_state.json"
+
+# Headers fetched per UID FETCH for rules matched on the client (subject_pattern)
+FETCH_BATCH_SIZE = 500
+
+# Folders cleaned at the same time, across all accounts
+MAX_WORKERS = 16
+
+# --- ACCOUNTS ---
+# Every folder of every account is cleaned with the same RULES. Each account gets at most
+# 'max_connections' IMAP connections (Gmail allows 15), shared by the folders it lists.
+ACCOUNTS = [
+    {
+        "server": IMAP_SERVER,
+        "user": EMAIL_USER,
+        "password": EMAIL_PASS,
+        "folders": ["inbox"],
+        "max_connections": 4,
+    },
+]
+
 # --- RULES ---
-# You can define multiple rules. The script will apply them in order.
+# You can define multiple rules. Rules with the same action (and destination) are combined
+# into one search, and a message is handled by the first action that matches it.
 # Action can be 'DELETE' or 'MOVE'
 # For 'MOVE', specify a 'destination_folder'
+# 'subject_pattern' is a regular expression checked against the decoded subject. The server
+# can't search by regex, so only the headers of messages matching the other criteria are fetched.
 RULES = [
     {
         "description": "Delete old promotional emails from Example Inc.",
@@ -27,70 +73,864 @@ RULES = [
         "older_than_days": 7,
         "action": "MOVE",
         "destination_folder": "[Gmail]/Archived"
+    },
+    {
+        "description": "Delete old shipping updates.",
+        "subject_pattern": r"(?i)your (order|package) has (shipped|been delivered)",
+        "older_than_days": 60,
+        "action": "DELETE"
     }
 ]
 # ---------------------
 
-def clean_inbox():
+def compress_uids(uids: Iterable[int]) -> str:
+    """
+    Turns UIDs into an IMAP sequence set with runs collapsed into ranges,
+    e.g. [1, 2, 3, 5, 7, 8] -> "1:3,5,7:8".
+    """
+    parts = []
+    start = previous = None
+    for uid in sorted(set(uids)):
+        if previous is not None and uid == previous + 1:
+            previous = uid
+            continue
+        if start is not None:
+            parts.append(str(start) if start == previous else f"{start}:{previous}")
+        start = previous = uid
+    if start is not None:
+        parts.append(str(start) if start == previous else f"{start}:{previous}")
+    return ",".join(parts)
+
+def uid_set_chunks(uids: Iterable[int], max_chars: int = UID_SET_MAX_CHARS) -> Iterator[str]:
+    """Yields compressed UID sets, each short enough to send as one command."""
+    chunk = []
+    length = 0
+    for part in compress_uids(uids).split(","):
+        if not part:
+            continue
+        if chunk and length + len(part) + 1 > max_chars:
+            yield ",".join(chunk)
+            chunk, length = [], 0
+        chunk.append(part)
+        length += len(part) + 1
+    if chunk:
+        yield ",".join(chunk)
+
+def quote_mailbox(name: str) -> str:
+    """imaplib sends arguments as-is, so folder names like '[Gmail]/All Mail' need quoting."""
+    return '"' + name.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def _imap_date(day: date) -> str:
+    return day.strftime("%d-%b-%Y")
+
+def build_search_criteria(rule: dict, today: Optional[date] = None) -> str:
+    """Builds the IMAP SEARCH criteria for a rule (everything except subject_pattern)."""
+    today = today or date.today()
+    keys = []
+    if "sender" in rule:
+        keys.append(f'(FROM "{rule["sender"]}")')
+    if "older_than_days" in rule:
+        keys.append(f'BEFORE "{_imap_date(today - timedelta(days=rule["older_than_days"]))}"')
+    return " ".join(keys) or "ALL"
+
+def incremental_window(rule: dict, previous: dict, folder_info: dict, today: date) -> Optional[str]:
+    """
+    Narrows a rule's search to messages that may have started matching since the last run:
+    messages that are new (or changed, with CONDSTORE), plus, for age rules, messages that
+    have crossed the age threshold since then. Returns None when nothing can match.
+    """
+    keys = []
+    if folder_info["highestmodseq"] and previous.get("highestmodseq"):
+        if folder_info["highestmodseq"] > previous["highestmodseq"]:
+            keys.append(f"MODSEQ {previous['highestmodseq'] + 1}")
+    elif not folder_info["uidnext"] or folder_info["uidnext"] > previous["last_uid"] + 1:
+        # Only when something is new: "UID n:*" also matches the highest UID if n is past it
+        keys.append(f"UID {previous['last_uid'] + 1}:*")
+
+    last_run = date.fromisoformat(previous["last_run"])
+    if "older_than_days" in rule and last_run < today:
+        keys.append(f'SINCE "{_imap_date(last_run - timedelta(days=rule["older_than_days"]))}"')
+
+    if not keys:
+        return None
+    return keys[0] if len(keys) == 1 else f"OR {keys[0]} {keys[1]}"
+
+def compile_rules(rules: List[dict], combine: bool = True) -> List[dict]:
+    """
+    Groups consecutive rules that do the same thing (same action and destination) so that
+    each group needs a single SEARCH, with the rules' criteria joined by OR. Only
+    neighbours are merged, so the groups keep the rules' order and the first matching
+    rule still wins. Rules with a subject_pattern stay on their own because the
+    pattern is checked after the search.
+    """
+    compiled = []
+    for rule in rules:
+        mergeable = combine and "subject_pattern" not in rule
+        previous = compiled[-1] if compiled else None
+        if (mergeable and previous and previous["mergeable"] and previous["action"] == rule["action"]
+                and previous["destination_folder"] == rule.get("destination_folder")):
+            previous["rules"].append(rule)
+            continue
+        compiled.append({"action": rule["action"], "destination_folder": rule.get("destination_folder"),
+                         "rules": [rule], "mergeable": mergeable})
+    return compiled
+
+def group_search_criteria(group: dict, today: date, previous: Optional[dict] = None,
+                          folder_info: Optional[dict] = None) -> Optional[str]:
+    """
+    Builds one SEARCH for a compiled group: "UNDELETED OR (rule 1) OR (rule 2) (rule 3)".
+    UNDELETED keeps a message already handled by an earlier group out of later ones.
+    Returns None if, incrementally, none of the rules can have new matches.
+    """
+    parts = []
+    for rule in group["rules"]:
+        criteria = build_search_criteria(rule, today)
+        if previous:
+            window = incremental_window(rule, previous, folder_info, today)
+            if window is None:
+                continue
+            criteria = f"{criteria} {window}"
+        parts.append(f"({criteria})")
+    if not parts:
+        return None
+
+    combined = parts[-1]
+    for part in reversed(parts[:-1]):
+        combined = f"OR {part} {combined}"
+    return f"UNDELETED {combined}"
+
+def rules_fingerprint(rules: List[dict]) -> str:
+    """Changes whenever the rules change, which invalidates the saved sync state."""
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def decode_subject(raw: Optional[str]) -> str:
+    """Decodes an RFC 2047 encoded subject such as '=?utf-8?q?Caf=C3=A9?='."""
+    parts = []
+    for text, charset in decode_header(raw or ""):
+        if isinstance(text, bytes):
+            try:
+                text = text.decode(charset or "utf-8", errors="replace")
+            except LookupError:
+                text = text.decode("utf-8", errors="replace")
+        parts.append(text)
+    return "".join(parts)
+
+class SyncState:
+    """
+    Per account and folder: UIDVALIDITY, the last UID already looked at, HIGHESTMODSEQ
+    when the server supports CONDSTORE, the day of the last run and a fingerprint of the
+    rules used. Stored as one JSON file, replaced atomically.
+    """
+
+    def __init__(self, path: Path = SYNC_STATE_FILE):
+        self.path = path
+        # Folders finish on different worker threads
+        self.lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.folders = json.load(f)
+        except (OSError, ValueError):
+            self.folders = {}
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.folders.get(key)
+
+    def update(self, key: str, entry: dict):
+        with self.lock:
+            self.folders[key] = entry
+
+    def save(self):
+        with self.lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = self.path.with_suffix(".tmp")
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.folders, f, indent=2)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                print(f"Could not save the sync state '{self.path}'. Error: {e}")
+
+class ImapSession:
+    """
+    Wraps a logged-in imaplib connection. Works on UIDs, sends whole UID sets per
+    command instead of one command per message, and counts the round trips it makes.
+    """
+
+    def __init__(self, mail: imaplib.IMAP4, account: str = ""):
+        self.mail = mail
+        self.account = account
+        self.round_trips = 0
+        # Servers often advertise more after login than in their greeting, so ask again
+        data = self._check("CAPABILITY", mail.capability())
+        self.capabilities = set(data[0].decode().upper().split())
+        self.can_move = "MOVE" in self.capabilities
+        self.condstore = "CONDSTORE" in self.capabilities
+
+    def _check(self, command: str, response) -> list:
+        self.round_trips += 1
+        status, data = response
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"{command} failed: {data}")
+        return data
+
+    def select(self, folder: str) -> dict:
+        """Selects a folder and returns its EXISTS, UIDVALIDITY, UIDNEXT and HIGHESTMODSEQ."""
+        mailbox = quote_mailbox(folder)
+        if self.condstore:
+            mailbox += " (CONDSTORE)"
+        data = self._check("SELECT", self.mail.select(mailbox))
+        info = {"exists": int(data[0] or 0)}
+        for name in ("UIDVALIDITY", "UIDNEXT", "HIGHESTMODSEQ"):
+            _, values = self.mail.response(name)
+            info[name.lower()] = int(values[-1]) if values and values[-1] else None
+        return info
+
+    def search(self, criteria: str) -> List[int]:
+        data = self._check("UID SEARCH", self.mail.uid("SEARCH", criteria))
+        # Searches using MODSEQ end with "(MODSEQ n)"
+        return [int(uid) for uid in data[0].split(b"(")[0].split()]
+
+    def fetch_headers(self, uids: List[int], fields=("SUBJECT",)) -> Dict[int, email.message.Message]:
+        """Fetches only the named header fields, in batches, without setting \\Seen."""
+        headers = {}
+        names = " ".join(fields)
+        for start in range(0, len(uids), FETCH_BATCH_SIZE):
+            uid_set = compress_uids(uids[start:start + FETCH_BATCH_SIZE])
+            data = self._check("UID FETCH", self.mail.uid("FETCH", uid_set, f"(BODY.PEEK[HEADER.FIELDS ({names})])"))
+            # A response is split around its literal: (b'1 (UID 5 BODY[...] {42}', header bytes),
+            # then b')'. Servers may send the UID after the literal instead, in that trailing part.
+            message = None
+            for item in data:
+                if isinstance(item, tuple):
+                    prefix, message = item[0], email.message_from_bytes(item[1])
+                else:
+                    prefix = item
+                match = re.search(rb"\bUID (\d+)", prefix or b"")
+                if match and message is not None:
+                    headers[int(match.group(1))] = message
+                    message = None
+        return headers
+
+    def delete(self, uids: List[int]):
+        # .SILENT stops the server from echoing one FETCH line per message back
+        for uid_set in uid_set_chunks(uids):
+            self._check("UID STORE", self.mail.uid("STORE", uid_set, "+FLAGS.SILENT", "(\\Deleted)"))
+
+    def move(self, uids: List[int], folder: str):
+        for uid_set in uid_set_chunks(uids):
+            if self.can_move:
+                self._check("UID MOVE", self.mail.uid("MOVE", uid_set, quote_mailbox(folder)))
+            else:
+                self._check("UID COPY", self.mail.uid("COPY", uid_set, quote_mailbox(folder)))
+                self._check("UID STORE", self.mail.uid("STORE", uid_set, "+FLAGS.SILENT", "(\\Deleted)"))
+
+    def expunge(self):
+        self._check("EXPUNGE", self.mail.expunge())
+
+def apply_rules(session: ImapSession, rules: List[dict], folder: str = "inbox",
+                state: Optional[SyncState] = None, combine: bool = True) -> dict:
+    """
+    Applies the rules to one folder and expunges it. Returns the folder's message count,
+    how many messages were scanned (all of them on a full run, only those the searches
+    returned on an incremental one) and how many were matched.
+    With a sync state, only messages that could have started matching since the last run
+    are searched; a changed UIDVALIDITY or changed rules force a full rescan.
+    """
+    today = date.today()
+    key = f"{session.account}/{folder}"
+
+    def log(message: str):
+        print(f"[{key}] {message}")
+
+    info = session.select(folder)
+    log(f"Selected, {info['exists']} messages.")
+    if info["uidnext"] is None:
+        # UIDNEXT is optional in the SELECT response; "UID *" finds the highest UID instead
+        highest = session.search("UID *")
+        info["uidnext"] = (max(highest) + 1) if highest else 1
+
+    fingerprint = rules_fingerprint(rules)
+    previous = state.get(key) if state else None
+    if previous and (previous["uidvalidity"] != info["uidvalidity"] or previous["rules"] != fingerprint):
+        log("UIDVALIDITY or the rules changed since the last run, rescanning the whole folder.")
+        previous = None
+    elif previous:
+        log(f"Incremental run: looking at messages after UID {previous['last_uid']} "
+            f"and those that aged into a rule since {previous['last_run']}.")
+    matched = 0
+    returned = set()
+
+    for group in compile_rules(rules, combine):
+        description = "; ".join(rule["description"] for rule in group["rules"])
+
+        # Search for emails that match any rule in the group
+        criteria = group_search_criteria(group, today, previous, info)
+        if criteria is None:
+            log(f"Nothing new since the last run for: {description}")
+            continue
+        uids = session.search(criteria)
+        returned.update(uids)
+
+        subject_pattern = group["rules"][0].get("subject_pattern")
+        if uids and subject_pattern:
+            pattern = re.compile(subject_pattern)
+            headers = session.fetch_headers(uids)
+            uids = [uid for uid in uids
+                    if uid in headers and pattern.search(decode_subject(headers[uid]["Subject"]))]
+
+        if not uids:
+            log(f"No emails match: {description}")
+            continue
+        matched += len(uids)
+
+        if group["action"] == "DELETE":
+            session.delete(uids)
+            log(f"Marked {len(uids)} emails for deletion ({description}).")
+
+        elif group["action"] == "MOVE":
+            dest_folder = group["destination_folder"]
+            session.move(uids, dest_folder)
+            log(f"Moved {len(uids)} emails to '{dest_folder}' ({description}).")
+
+    # Permanently delete all emails marked for deletion
+    session.expunge()
+
+    if state is not None:
+        state.update(key, {
+            "uidvalidity": info["uidvalidity"],
+            "last_uid": info["uidnext"] - 1,
+            "highestmodseq": info["highestmodseq"],
+            "last_run": today.isoformat(),
+            "rules": fingerprint,
+        })
+        state.save()
+    scanned = len(returned) if previous else info["exists"]
+    return {"account": session.account, "folder": folder, "exists": info["exists"],
+            "scanned": scanned, "matched": matched}
+
+class ConnectionPool:
+    """
+    Up to 'max_connections' logged-in sessions to one account. A worker borrows a session
+    for one folder at a time; if the folder fails, its session is logged out and dropped
+    rather than handed to the next folder in an unknown state.
+    """
+
+    def __init__(self, account: dict):
+        self.account = account
+        self.name = f"{account['user']}@{account['server']}"
+        self.sessions = []  # Every session opened, for the round trip total
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(account.get("max_connections", 4))
+        self._lock = threading.Lock()
+
+    def _connect(self) -> ImapSession:
+        account = self.account
+        if account.get("ssl", True):
+            mail = imaplib.IMAP4_SSL(account["server"], account.get("port", imaplib.IMAP4_SSL_PORT))
+        else:
+            mail = imaplib.IMAP4(account["server"], account.get("port", imaplib.IMAP4_PORT))
+        mail.login(account["user"], account["password"])
+        session = ImapSession(mail, self.name)
+        with self._lock:
+            self.sessions.append(session)
+        return session
+
+    @staticmethod
+    def _logout(session: ImapSession):
+        try:
+            session.mail.logout()
+        except (imaplib.IMAP4.error, OSError):
+            pass
+
+    @contextmanager
+    def session(self):
+        with self._slots:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                session = self._connect()
+            try:
+                yield session
+            except BaseException:
+                self._logout(session)
+                raise
+            self._idle.put(session)
+
+    @property
+    def round_trips(self) -> int:
+        with self._lock:
+            return sum(session.round_trips for session in self.sessions)
+
+    def close(self):
+        while True:
+            try:
+                self._logout(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+def _clean_folder(pool: ConnectionPool, folder: str, rules: List[dict],
+                  state: Optional[SyncState], combine: bool) -> dict:
+    with pool.session() as session:
+        return apply_rules(session, rules, folder, state, combine)
+
+def clean_accounts(accounts: List[dict], rules: List[dict], state: Optional[SyncState] = None,
+                   max_workers: int = MAX_WORKERS, combine: bool = True) -> dict:
     """
-    Connects to the email server and applies the defined rules to the inbox.
+    Cleans every folder of every account in parallel, each account over its own bounded
+    connection pool. A failing folder is reported and skipped; the others carry on.
+    """
+    pools = [ConnectionPool(account) for account in accounts]
+    # Interleave accounts so one account's busy pool doesn't hold up the workers
+    tasks = [
+        task for task in chain.from_iterable(zip_longest(
+            *[[(pool, folder) for folder in pool.account["folders"]] for pool in pools]
+        )) if task is not None
+    ]
+
+    results, failures = [], []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+        futures = {
+            executor.submit(_clean_folder, pool, folder, rules, state, combine): (pool, folder)
+            for pool, folder in tasks
+        }
+        for future in as_completed(futures):
+            pool, folder = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                failures.append(f"{pool.name}/{folder}")
+                print(f"🚨 [{pool.name}/{folder}] failed: {e}")
+    elapsed = time.perf_counter() - started
+    for pool in pools:
+        pool.close()
+
+    report = {
+        "folders": len(results),
+        "failed": failures,
+        "messages": sum(result["scanned"] for result in results),
+        "matched": sum(result["matched"] for result in results),
+        "round_trips": sum(pool.round_trips for pool in pools),
+        "connections": sum(len(pool.sessions) for pool in pools),
+        "seconds": elapsed,
+    }
+    print(f"\n{report['folders']} folders cleaned, {len(failures)} failed, in {elapsed:.2f} s")
+    print(f"  {report['messages']} messages checked ({report['messages'] / max(elapsed, 1e-9):,.0f}/s), "
+          f"{report['matched']} matched ({report['matched'] / max(elapsed, 1e-9):,.0f}/s)")
+    print(f"  {report['round_trips']} round trips over {report['connections']} connections")
+    return report
+
+def clean_inbox(full_rescan: bool = False):
+    """
+    Connects to the email servers and applies the defined rules to every configured folder.
     """
     try:
-        # Connect to the IMAP server with SSL
-        mail = imaplib.IMAP4_SSL(IMAP_SERVER)
-        mail.login(EMAIL_USER, EMAIL_PASS)
-        
-        # Select the mailbox you want to clean (e.g., "inbox")
-        mail.select("inbox")
-        print("Successfully connected to the inbox.")
-
-        for rule in RULES:
-            print(f"\nApplying rule: {rule['description']}")
-            
-            # Build the search criteria based on the rule
-            search_criteria = f'(FROM "{rule["sender"]}")'
-            if "older_than_days" in rule:
-                date_threshold = (datetime.now() - timedelta(days=rule["older_than_days"])).strftime("%d-%b-%Y")
-                search_criteria += f' BEFORE "{date_threshold}"'
-
-            # Search for emails that match the criteria
-            status, messages = mail.search(None, search_criteria)
-            
-            if status == "OK":
-                email_ids = messages[0].split()
-                print(f"Found {len(email_ids)} emails matching the rule.")
-                
-                if not email_ids:
-                    continue
+        report = clean_accounts(ACCOUNTS, RULES, state=None if full_rescan else SyncState())
+        if not report["failed"]:
+            print("✅ Email cleanup complete.")
 
-                if rule["action"] == "DELETE":
-                    for email_id in email_ids:
-                        mail.store(email_id, '+FLAGS', '\\Deleted')
-                    print(f"Marked {len(email_ids)} emails for deletion.")
-                
-                elif rule["action"] == "MOVE":
-                    dest_folder = rule["destination_folder"]
-                    for email_id in email_ids:
-                        mail.copy(email_id, dest_folder)
-                        mail.store(email_id, '+FLAGS', '\\Deleted')
-                    print(f"Moved {len(email_ids)} emails to '{dest_folder}'.")
-            
-        # Permanently delete all emails marked for deletion
-        print("\nExpunging emails...")
-        mail.expunge()
-        
-        # Close the connection
-        mail.logout()
-        print("✅ Email cleanup complete.")
-        
-    except imaplib.IMAP4.error as e:
-        print(f"IMAP Error: {e}")
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
 
+# --- LOCAL IMAP STAND-IN (used by --benchmark) ---
+
+_TOKEN_RE = re.compile(r'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()]+')
+
+def _unquote(token: str) -> str:
+    if token.startswith('"'):
+        return re.sub(r'\\(.)', r'\1', token[1:-1])
+    return token
+
+def _parse_set(sequence_set: str, largest: int) -> list:
+    """'1:3,7,9:*' -> [(1, 3), (7, 7), (9, largest)]"""
+    ranges = []
+    for part in sequence_set.split(","):
+        low, _, high = part.partition(":")
+        low = largest if low == "*" else int(low)
+        high = low if not high else (largest if high == "*" else int(high))
+        ranges.append((min(low, high), max(low, high)))
+    return ranges
+
+def _in_set(number: int, ranges: list) -> bool:
+    return any(low <= number <= high for low, high in ranges)
+
+class _StubImapHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough IMAP4rev1 for the benchmark: SELECT, SEARCH, FETCH of header fields,
+    STORE, COPY, MOVE and EXPUNGE, with and without UID, plus CONDSTORE mod-sequences.
+    Every command sleeps 'delay' seconds to stand in for network latency, and the
+    server counts the commands (in total and by name) and header fetches it receives.
+    """
+
+    # Buffer each reply and flush it in one write, otherwise Nagle's algorithm adds ~40 ms per command
+    wbufsize = 65536
+
+    def _send(self, line: str, flush: bool = False):
+        self.wfile.write(line.encode() + b"\r\n")
+        if flush:
+            self.wfile.flush()
+
+    def handle(self):
+        server = self.server
+        self.folder = None
+        self._send(f"* OK [CAPABILITY {' '.join(server.capabilities)}] Stub IMAP ready", flush=True)
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            tokens = _TOKEN_RE.findall(line.decode())
+            tag, command, args = tokens[0], tokens[1].upper(), tokens[2:]
+            use_uid = command == "UID"
+            if use_uid:
+                command, args = args[0].upper(), args[1:]
+
+            time.sleep(server.delay)
+            with server.lock:
+                server.commands += 1
+                server.received[f"UID {command}" if use_uid else command] += 1
+                if command == "LOGOUT":
+                    self._send("* BYE")
+                    self._send(f"{tag} OK LOGOUT completed", flush=True)
+                    return
+                try:
+                    result = getattr(self, f"do_{command}")(args, use_uid)
+                except (AttributeError, IndexError, KeyError, ValueError) as e:
+                    self._send(f"{tag} BAD {command} {e}", flush=True)
+                    continue
+            self._send(f"{tag} {result or 'OK'} {command} completed", flush=True)
+
+    def _messages(self) -> list:
+        return self.server.folders[self.folder]["messages"]
+
+    def _matching(self, sequence_set: str, use_uid: bool) -> list:
+        """(sequence number, message) pairs in the set, by UID or by sequence number."""
+        messages = self._messages()
+        largest = (messages[-1]["uid"] if use_uid else len(messages)) if messages else 0
+        ranges = _parse_set(sequence_set, largest)
+        return [
+            (number, message) for number, message in enumerate(messages, 1)
+            if _in_set(message["uid"] if use_uid else number, ranges)
+        ]
+
+    def _parse_key(self, tokens: list, pos: int):
+        """Parses one search key starting at tokens[pos]. Returns (predicate, next position)."""
+        key = tokens[pos].upper()
+        if key == "(":
+            predicates = []
+            pos += 1
+            while tokens[pos] != ")":
+                predicate, pos = self._parse_key(tokens, pos)
+                predicates.append(predicate)
+            return (lambda n, m: all(p(n, m) for p in predicates)), pos + 1
+        if key == "ALL":
+            return (lambda n, m: True), pos + 1
+        if key == "OR":
+            left, pos = self._parse_key(tokens, pos + 1)
+            right, pos = self._parse_key(tokens, pos)
+            return (lambda n, m: left(n, m) or right(n, m)), pos
+        if key in ("DELETED", "UNDELETED"):
+            wanted = key == "DELETED"
+            return (lambda n, m: ("\\Deleted" in m["flags"]) == wanted), pos + 1
+        if key == "NOT":
+            inner, pos = self._parse_key(tokens, pos + 1)
+            return (lambda n, m: not inner(n, m)), pos
+        if key in ("FROM", "SUBJECT"):
+            value = _unquote(tokens[pos + 1]).lower()
+            field = "sender" if key == "FROM" else "subject"
+            return (lambda n, m: value in m[field].lower()), pos + 2
+        if key in ("BEFORE", "SINCE"):
+            day = datetime.strptime(_unquote(tokens[pos + 1]), "%d-%b-%Y").date()
+            if key == "BEFORE":
+                return (lambda n, m: m["date"] < day), pos + 2
+            return (lambda n, m: m["date"] >= day), pos + 2
+        if key == "MODSEQ":
+            modseq = int(tokens[pos + 1])
+            return (lambda n, m: m["modseq"] >= modseq), pos + 2
+        if key == "UID":
+            largest = self._messages()[-1]["uid"] if self._messages() else 0
+            ranges = _parse_set(tokens[pos + 1], largest)
+            return (lambda n, m: _in_set(m["uid"], ranges)), pos + 2
+        raise ValueError(f"unsupported search key {key}")
+
+    def do_CAPABILITY(self, args, use_uid):
+        self._send(f"* CAPABILITY {' '.join(self.server.capabilities)}")
+
+    def do_LOGIN(self, args, use_uid):
+        pass
+
+    def do_NOOP(self, args, use_uid):
+        pass
+
+    def do_SELECT(self, args, use_uid):
+        self.folder = _unquote(args[0])
+        folder = self.server.folders[self.folder]
+        self._send(f"* {len(folder['messages'])} EXISTS")
+        self._send(f"* OK [UIDVALIDITY {folder['uidvalidity']}] UIDs valid")
+        self._send(f"* OK [UIDNEXT {folder['uidnext']}] Predicted next UID")
+        if "CONDSTORE" in self.server.capabilities:
+            self._send(f"* OK [HIGHESTMODSEQ {self.server.modseq}] Highest")
+        return "OK [READ-WRITE]"
+
+    def do_SEARCH(self, args, use_uid):
+        predicates = []
+        pos = 0
+        while pos < len(args):
+            predicate, pos = self._parse_key(args, pos)
+            predicates.append(predicate)
+        found = [
+            (message["uid"] if use_uid else number, message["modseq"])
+            for number, message in enumerate(self._messages(), 1)
+            if all(p(number, message) for p in predicates)
+        ]
+        modseq = ""
+        if found and any(arg.upper() == "MODSEQ" for arg in args):
+            modseq = f" (MODSEQ {max(value for _, value in found)})"
+        self._send("* SEARCH" + "".join(f" {value}" for value, _ in found) + modseq)
+
+    def do_FETCH(self, args, use_uid):
+        if "BODY.PEEK[HEADER.FIELDS" not in [arg.upper() for arg in args]:
+            raise ValueError("only BODY.PEEK[HEADER.FIELDS (SUBJECT)] is supported")
+        for number, message in self._matching(args[0], use_uid):
+            self.server.header_fetches += 1
+            header = f"Subject: {message['subject']}\r\n\r\n".encode()
+            if not use_uid:
+                before, after = "", ""
+            elif self.server.uid_after_literal:
+                before, after = "", f" UID {message['uid']}"
+            else:
+                before, after = f"UID {message['uid']} ", ""
+            self.wfile.write(f"* {number} FETCH ({before}BODY[HEADER.FIELDS (SUBJECT)] {{{len(header)}}}\r\n".encode())
+            self.wfile.write(header + f"{after})\r\n".encode())
+
+    def do_STORE(self, args, use_uid):
+        sequence_set, action, flags = args[0], args[1].upper(), [flag for flag in args[2:] if flag not in "()"]
+        for number, message in self._matching(sequence_set, use_uid):
+            if action.startswith("+"):
+                message["flags"].update(flags)
+            elif action.startswith("-"):
+                message["flags"].difference_update(flags)
+            else:
+                message["flags"] = set(flags)
+            self.server.modseq += 1
+            message["modseq"] = self.server.modseq
+            if not action.endswith(".SILENT"):
+                uid = f"UID {message['uid']} " if use_uid else ""
+                self._send(f"* {number} FETCH ({uid}FLAGS ({' '.join(sorted(message['flags']))}))")
+
+    def do_COPY(self, args, use_uid):
+        target = self.server.folders[_unquote(args[1])]
+        for _, message in self._matching(args[0], use_uid):
+            self.server.modseq += 1
+            copy = dict(message, uid=target["uidnext"], flags=set(message["flags"]), modseq=self.server.modseq)
+            target["uidnext"] += 1
+            target["messages"].append(copy)
+
+    def do_MOVE(self, args, use_uid):
+        if "MOVE" not in self.server.capabilities:
+            raise ValueError("MOVE not supported")
+        moved = self._matching(args[0], use_uid)
+        self.do_COPY(args, use_uid)
+        for number, message in reversed(moved):
+            self._messages().remove(message)
+            self._send(f"* {number} EXPUNGE")
+
+    def do_EXPUNGE(self, args, use_uid):
+        for number in range(len(self._messages()), 0, -1):
+            if "\\Deleted" in self._messages()[number - 1]["flags"]:
+                del self._messages()[number - 1]
+                self._send(f"* {number} EXPUNGE")
+
+class _StubImapServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, capabilities: List[str], delay: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _StubImapHandler)
+        self.capabilities = ["IMAP4rev1"] + capabilities
+        self.delay = delay
+        self.commands = 0
+        self.received = Counter()  # command name -> times received, e.g. "UID MOVE"
+        self.header_fetches = 0
+        self.modseq = 1
+        # Some servers put the UID after the header literal in a FETCH response
+        self.uid_after_literal = False
+        self.lock = threading.Lock()
+        self.folders = {}
+
+    def add_folder(self, name: str, messages: Optional[list] = None):
+        self.folders[name] = {"uidvalidity": 1, "uidnext": 1, "messages": []}
+        self.add_messages(name, messages or [])
+
+    def add_messages(self, name: str, messages: list):
+        folder = self.folders[name]
+        for message in messages:
+            self.modseq += 1
+            folder["messages"].append(dict(message, uid=folder["uidnext"], flags=set(), modseq=self.modseq))
+            folder["uidnext"] += 1
+
+def _benchmark_mailbox(count: int, first_index: int = 0, rules: List[dict] = RULES) -> list:
+    """
+    Builds 'count' old messages: the rule senders and a sender to keep take turns,
+    and every fifth subject is a shipping update.
+    """
+    senders = [rule["sender"] for rule in rules if "sender" in rule] + ["friend@example.org"]
+    old = date.today() - timedelta(days=90)
+    messages = []
+    for index in range(first_index, first_index + count):
+        subject = "Your order has shipped" if index % 5 == 0 else f"Message {index}"
+        messages.append({"sender": senders[index % len(senders)], "subject": subject, "date": old})
+    return messages
+
+def _start_stub(capabilities: List[str], count: int, delay: float) -> _StubImapServer:
+    server = _StubImapServer(capabilities, delay)
+    server.add_folder("inbox", _benchmark_mailbox(count))
+    for rule in RULES:
+        if rule["action"] == "MOVE":
+            server.add_folder(rule["destination_folder"])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _run_session(server: _StubImapServer, rules: List[dict], state: Optional[SyncState] = None) -> tuple:
+    """Runs apply_rules against the stand-in. Returns (round trips, header fetches, seconds, matched)."""
+    mail = imaplib.IMAP4(*server.server_address)
+    mail.login("user", "pass")
+    server.commands = server.header_fetches = 0
+    server.received.clear()
+    started = time.perf_counter()
+    session = ImapSession(mail, "benchmark")
+    matched = apply_rules(session, rules, state=state)["matched"]
+    result = (server.commands, server.header_fetches, time.perf_counter() - started, matched)
+    mail.logout()
+    return result
+
+def _start_accounts(account_count: int, folder_count: int, messages: int, rules: List[dict],
+                    delay: float) -> tuple:
+    """One stand-in server per account, each with 'folder_count' folders plus one missing folder."""
+    servers, accounts = [], []
+    for index in range(account_count):
+        server = _StubImapServer(["MOVE"], delay)
+        folders = [f"Folder {number}" for number in range(folder_count)]
+        for folder in folders:
+            server.add_folder(folder, _benchmark_mailbox(messages, rules=rules))
+        for rule in rules:
+            if rule["action"] == "MOVE":
+                server.add_folder(rule["destination_folder"])
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+        servers.append(server)
+        accounts.append({
+            "server": host, "port": port, "ssl": False, "user": f"user{index}", "password": "pass",
+            "folders": folders + ["Does not exist"], "max_connections": 4,
+        })
+    return servers, accounts
+
+def benchmark(count: int = 1000, delay: float = 0.001):
+    """
+    Runs the old one-command-per-message loop and the UID-set session against a local
+    IMAP stand-in, with and without the MOVE capability, and compares round trips.
+    Then compares a full rescan with an incremental run after new mail arrives, and
+    one-search-per-rule on a single connection with compiled rules on pooled connections.
+    """
+    # The original loop had no subject rules, so compare like with like
+    legacy_rules = [rule for rule in RULES if "subject_pattern" not in rule]
+    report = []
+
+    for capabilities in (["MOVE"], []):
+        label = "MOVE" if capabilities else "COPY+STORE"
+
+        server = _start_stub(capabilities, count, delay)
+        try:
+            # The original clean_inbox() loop: one STORE (and one COPY) per message
+            mail = imaplib.IMAP4(*server.server_address)
+            mail.login("user", "pass")
+            started = time.perf_counter()
+            server.commands = 0
+            mail.select("inbox")
+            for rule in legacy_rules:
+                status, messages = mail.search(None, build_search_criteria(rule))
+                for email_id in messages[0].split():
+                    if rule["action"] == "MOVE":
+                        mail.copy(email_id, quote_mailbox(rule["destination_folder"]))
+                    mail.store(email_id, '+FLAGS', '\\Deleted')
+            mail.expunge()
+            per_message = (server.commands, time.perf_counter() - started)
+            mail.logout()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        server = _start_stub(capabilities, count, delay)
+        try:
+            uid_sets = _run_session(server, legacy_rules)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        report.append(f"\n[{label}] {count} messages in the inbox")
+        report.append(f"  Per message: {per_message[0]:>6} round trips in {per_message[1]:.2f} s")
+        report.append(f"  UID sets:    {uid_sets[0]:>6} round trips in {uid_sets[2]:.2f} s")
+
+    # Second run after 5% more mail arrived: full rescan vs. saved sync state
+    new_count = max(1, count // 20)
+    for capabilities in (["MOVE", "CONDSTORE"], ["MOVE"]):
+        label = "CONDSTORE" if "CONDSTORE" in capabilities else "UID only"
+        runs = {}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for mode in ("Full rescan", "Incremental"):
+                server = _start_stub(capabilities, count, delay)
+                try:
+                    state = SyncState(Path(temp_dir) / f"{mode}.json")
+                    _run_session(server, RULES, state)
+                    server.add_messages("inbox", _benchmark_mailbox(new_count, first_index=count))
+                    runs[mode] = _run_session(server, RULES, state if mode == "Incremental" else None)
+                finally:
+                    server.shutdown()
+                    server.server_close()
+
+        report.append(f"\n[Rerun, {label}] {new_count} new messages on top of {count}")
+        for mode, (trips, fetches, seconds, matched) in runs.items():
+            report.append(f"  {mode + ':':<13}{trips:>6} round trips, {fetches:>5} headers fetched, "
+                          f"{matched:>4} matched in {seconds:.2f} s")
+
+    # Many folders on several accounts, with a few more sender rules sharing an action
+    many_rules = RULES + [
+        {"description": f"Delete old newsletters from list {number}", "sender": f"news{number}@lists.example.com",
+         "older_than_days": 14, "action": "DELETE"}
+        for number in range(5)
+    ]
+    account_count, folder_count = 3, 8
+    modes = {}
+    for mode, options in (("One search per rule, 1 connection", {"max_workers": 1, "combine": False}),
+                          ("Compiled rules, pooled connections", {})):
+        servers, accounts = _start_accounts(account_count, folder_count, count // 10, many_rules, delay)
+        try:
+            modes[mode] = clean_accounts(accounts, many_rules, **options)
+        finally:
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+
+    report.append(f"\n[{account_count} accounts x {folder_count} folders] {len(many_rules)} rules, "
+                  f"one missing folder per account")
+    for mode, result in modes.items():
+        report.append(f"  {mode + ':':<36}{result['round_trips']:>5} round trips, "
+                      f"{result['messages'] / result['seconds']:>7,.0f} messages/s, "
+                      f"{len(result['failed'])} folders failed, {result['seconds']:.2f} s")
+
+    print("\n".join(report))
+
 if __name__ == "__main__":
-    if not EMAIL_USER or not EMAIL_PASS:
+    parser = argparse.ArgumentParser(description="Delete or move emails that match simple rules.")
+    parser.add_argument("--full-rescan", action="store_true",
+                        help="Ignore the saved sync state and search the whole inbox.")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=1000, metavar="MESSAGES",
+                        help="Compare per-message and UID-set commands against a local IMAP stand-in and exit.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    elif not EMAIL_USER or not EMAIL_PASS:
         print("ERROR: EMAIL_USER and EMAIL_PASS environment variables are not set.")
         print("Please set them before running the script. Use an app password for security.")
     else:
-        clean_inbox()
+        clean_inbox(args.full_rescan)
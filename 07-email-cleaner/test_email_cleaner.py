@@ -0,0 +1,97 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from email_cleaner import RULES, SyncState, _benchmark_mailbox, _run_session, _start_stub
+
+ARCHIVE = next(rule["destination_folder"] for rule in RULES if rule["action"] == "MOVE")
+PROMOTIONS = "promotions@example.com"
+NOTIFICATIONS = "notifications@socialmedia.com"
+
+
+def shipped(message):
+    return message["subject"] == "Your order has shipped"
+
+
+class StubImapTestCase(unittest.TestCase):
+    """Runs apply_rules against the benchmark's in-process IMAP server."""
+
+    def start(self, capabilities, count):
+        server = _start_stub(capabilities, count, 0.0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def run_rules(self, server, rules=RULES, state=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return _run_session(server, rules, state)
+
+
+class MoveTests(StubImapTestCase):
+    def check_mailboxes(self, server):
+        inbox = server.folders["inbox"]["messages"]
+        archive = server.folders[ARCHIVE]["messages"]
+        mailbox = _benchmark_mailbox(30)
+        # Only the sender nobody has a rule for is left, minus the shipping updates
+        self.assertEqual([m["subject"] for m in inbox],
+                         [m["subject"] for m in mailbox if m["sender"] == "friend@example.org" and not shipped(m)])
+        self.assertTrue(archive)
+        self.assertTrue(all(m["sender"] == NOTIFICATIONS for m in archive))
+        self.assertTrue(all("\\Deleted" not in m["flags"] for m in inbox + archive))
+
+    def test_move_capability_uses_uid_move(self):
+        server = self.start(["MOVE"], 30)
+        self.run_rules(server)
+        self.check_mailboxes(server)
+        self.assertEqual(server.received["UID MOVE"], 1)
+        self.assertEqual(server.received["UID COPY"], 0)
+
+    def test_without_move_copy_and_store_give_the_same_result(self):
+        server = self.start([], 30)
+        self.run_rules(server)
+        self.check_mailboxes(server)
+        self.assertEqual(server.received["UID MOVE"], 0)
+        self.assertEqual(server.received["UID COPY"], 1)
+        # One STORE for the copied messages, one per delete group
+        self.assertGreaterEqual(server.received["UID STORE"], 2)
+        self.assertEqual(server.received["EXPUNGE"], 1)
+
+
+class RoundTripTests(StubImapTestCase):
+    def test_round_trips_do_not_grow_with_the_mailbox(self):
+        small = self.run_rules(self.start(["MOVE"], 30))
+        large = self.run_rules(self.start(["MOVE"], 600))
+        self.assertEqual(small[0], large[0])
+        self.assertLess(large[0], 20)
+        self.assertGreater(large[3], small[3])
+
+    def test_uid_after_the_header_literal(self):
+        before = self.start(["MOVE"], 50)
+        after = self.start(["MOVE"], 50)
+        after.uid_after_literal = True
+        matched = [self.run_rules(server)[3] for server in (before, after)]
+        self.assertEqual(matched[0], matched[1])
+        self.assertEqual([m["subject"] for m in before.folders["inbox"]["messages"]],
+                         [m["subject"] for m in after.folders["inbox"]["messages"]])
+        self.assertFalse(any(shipped(m) for m in after.folders["inbox"]["messages"]))
+
+    def test_incremental_run_fetches_only_new_headers(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            state = SyncState(Path(temp_dir) / "state.json")
+            server = self.start(["MOVE", "CONDSTORE"], 200)
+            self.run_rules(server, state=state)
+            server.add_messages("inbox", _benchmark_mailbox(10, first_index=200))
+            _, fetches, _, matched = self.run_rules(server, state=state)
+        self.assertLessEqual(fetches, 10)
+        self.assertGreater(matched, 0)
+        self.assertFalse(any(shipped(m) for m in server.folders["inbox"]["messages"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,26 @@ from bs4 import BeautifulSoup
 import smtplib
 import time
 import os
+import argparse
+import codecs
+import csv
+import json
+import re
+import socketserver
+import sqlite3
+import tempfile
+import threading
+import tracemalloc
+from html.parser import HTMLParser
+from pathlib import Path
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from email.message import EmailMessage
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import chain, zip_longest
+from typing import Optional
+from urllib.parse import urlsplit
 
 # --- CONFIGURATION ---
 # URL of the product you want to track
@@ -11,90 +31,1010 @@ PRODUCT_URL = "URL_OF_THE_PRODUCT_YOU_WANT_TO_TRACK" # IMPORTANT: PASTE THE URL
 # The price (in your currency) that will trigger a notification
 DESIRED_PRICE = 100.00
 
+# To track many products, list them in this file instead: a JSON list of
+# {"url": ..., "desired_price": ..., "name": ...} objects, or a CSV file with those columns.
+# When the file exists it replaces PRODUCT_URL / DESIRED_PRICE.
+PRODUCT_CATALOG = Path(__file__).resolve().parent / "products.json"
+
 # Email configuration using environment variables for security
 EMAIL_ADDRESS = os.getenv("EMAIL_USER")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASS") # Use an app-specific password
 EMAIL_SMTP_SERVER = "smtp.gmail.com"
 EMAIL_SMTP_PORT = 587
+EMAIL_SMTP_STARTTLS = True
 
 # Time to wait between checks, in seconds
 CHECK_INTERVAL = 3600  # 1 hour
+
+# How many product pages are fetched at the same time, and how many
+# keep-alive connections each retailer gets
+MAX_CONCURRENT_FETCHES = 32
+MAX_CONNECTIONS_PER_DOMAIN = 4
+REQUEST_TIMEOUT = 15
+
+# Requests per second and burst size allowed per retailer domain, so a big
+# catalog doesn't hammer one site. Domains are matched like EXTRACTION_PROFILES below,
+# but each host still gets its own limit. "default" applies to every domain not listed.
+DOMAIN_RATE_LIMITS = {
+    "default": (1.0, 5),
+    "amazon.*": (0.5, 2),
+}
+
+# Where the title and price are found on each retailer's pages. Every field lists
+# sources to try in order of preference:
+#   {"css": "#productTitle"}                  text of the first matching element
+#   {"css": [".a-price-whole", ".a-price-fraction"]}  texts of several elements joined
+#   {"json_ld": "offers.price"}               a value from the page's JSON-LD Product data
+#   {"meta": "product:price:amount"}          the content of a <meta property/name/itemprop>
+# Simple selectors (tag, #id, .class and combinations like span.price) are matched while
+# streaming through the page, stopping as soon as every field has its first choice.
+# Anything more complex falls back to building the full BeautifulSoup tree.
+# A key like "example.com" also covers its subdomains (www.example.com, shop.example.com);
+# "amazon.*" covers a site under every top-level domain (amazon.com, www.amazon.co.uk,
+# amazon.de). "default" applies to every domain not listed.
+EXTRACTION_PROFILES = {
+    "default": {
+        "title": [{"json_ld": "name"}, {"meta": "og:title"}, {"css": "title"}],
+        "price": [{"json_ld": "offers.price"}, {"meta": "product:price:amount"}, {"meta": "og:price:amount"}],
+    },
+    "amazon.*": {
+        "title": [{"css": "#productTitle"}],
+        "price": [{"css": [".a-price-whole", ".a-price-fraction"]}],
+    },
+}
+
+# Characters of HTML decoded and parsed at a time by the streaming extractor
+PARSE_CHUNK_SIZE = 64 * 1024
+
+# Every observed price is stored here, and the rules below are checked against it.
+# A product at or below its desired_price always triggers an alert as well.
+HISTORY_DB = Path(__file__).resolve().parent / "price_history.db"
+ALERT_RULES = [
+    {"type": "lowest_in_days", "days": 90},  # Cheaper than at any point in the last 90 days
+    {"type": "drop_percent", "percent": 10},  # At least 10% cheaper than at the previous check
+]
+
+# ETag / Last-Modified and the last parsed title and price of every page, so
+# unchanged pages can be answered with a 304 and skipped by the parser
+VALIDATORS_FILE = Path.home() / ".cache" / "price_tracker" / "validators.json"
 # ---------------------
 
-def check_price():
+# A realistic User-Agent is crucial to avoid being blocked by sites like Amazon
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+def parse_with_full_tree(content: bytes) -> tuple:
     """
-    Scrapes the product page, checks the price, and sends an alert if it's low enough.
+    The original Amazon-only parser: builds the whole BeautifulSoup tree to read three
+    elements. Kept as the baseline for the benchmarks.
     """
-    # A realistic User-Agent is crucial to avoid being blocked by sites like Amazon
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-        "Accept-Language": "en-US,en;q=0.9",
-    }
-    
+    soup = BeautifulSoup(content, "html.parser")
+    title_element = soup.find(id="productTitle")
+    price_whole_element = soup.find(class_="a-price-whole")
+    price_fraction_element = soup.find(class_="a-price-fraction")
+
+    if not title_element or not price_whole_element or not price_fraction_element:
+        raise ValueError("Could not find title or price elements. The website structure may have changed.")
+
+    title = title_element.get_text().strip()
+    price_str = f"{price_whole_element.get_text().strip().replace(',', '')}{price_fraction_element.get_text().strip()}"
+    return title, float(price_str)
+
+def parse_price(text: str) -> float:
+    """'$1,299.99' -> 1299.99, '1.299,99 €' -> 1299.99, '1,299.' + '99' -> 1299.99"""
+    number = re.sub(r"[^\d.,]", "", text)
+    if "," in number and "." in number:
+        decimal = "," if number.rfind(",") > number.rfind(".") else "."
+    elif "," in number and re.search(r",\d{1,2}$", number):
+        decimal = ","
+    else:
+        decimal = "."
+    thousands = "." if decimal == "," else ","
+    return float(number.replace(thousands, "").replace(decimal, "."))
+
+_SIMPLE_SELECTOR_RE = re.compile(r"^([a-zA-Z][\w-]*)?((?:[#.][\w-]+)*)$")
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+def _simple_selector(selector: str) -> Optional[tuple]:
+    """'span.a-price-whole' -> ('span', None, {'a-price-whole'}); None for anything more complex."""
+    selector = selector.strip()
+    match = _SIMPLE_SELECTOR_RE.match(selector)
+    if not selector or not match:
+        return None
+    element_id, classes = None, set()
+    for kind, name in re.findall(r"([#.])([\w-]+)", match.group(2)):
+        if kind == "#":
+            element_id = name
+        else:
+            classes.add(name)
+    return (match.group(1) or "").lower() or None, element_id, classes
+
+def _css_selectors(source: dict) -> list:
+    return source["css"] if isinstance(source["css"], list) else [source["css"]]
+
+def _profile_is_simple(profile: dict) -> bool:
+    return all(
+        _simple_selector(selector) is not None
+        for sources in profile.values() for source in sources if "css" in source
+        for selector in _css_selectors(source)
+    )
+
+def _json_ld_products(text: str) -> list:
+    """Returns the Product objects in a JSON-LD block, including ones inside @graph."""
     try:
-        print(f"Checking price for product at: {PRODUCT_URL}")
-        page = requests.get(PRODUCT_URL, headers=headers, timeout=15)
-        page.raise_for_status()
-        
-        soup = BeautifulSoup(page.content, "html.parser")
-        
-        # --- THIS IS THE PART YOU MUST CUSTOMIZE ---
-        # Use your browser's "Inspect" tool to find the correct element for title and price.
-        # This example is for Amazon, but it might change and will be different for other sites.
-        title_element = soup.find(id="productTitle")
-        price_whole_element = soup.find(class_="a-price-whole")
-        price_fraction_element = soup.find(class_="a-price-fraction")
-        
-        if not title_element or not price_whole_element or not price_fraction_element:
-            print("Error: Could not find title or price elements. The website structure may have changed.")
+        data = json.loads(text)
+    except ValueError:
+        return []
+    pending = data if isinstance(data, list) else [data]
+    products = []
+    while pending:
+        item = pending.pop(0)
+        if not isinstance(item, dict):
+            continue
+        pending.extend(item.get("@graph", []))
+        kind = item.get("@type")
+        if kind == "Product" or (isinstance(kind, list) and "Product" in kind):
+            products.append(item)
+    return products
+
+def _json_path(item, path: str):
+    """Follows 'offers.price' through dicts, taking the first entry of any list on the way."""
+    for key in path.split("."):
+        if isinstance(item, list):
+            item = item[0] if item else None
+        item = item.get(key) if isinstance(item, dict) else None
+    return item
+
+class _AllFound(Exception):
+    pass
+
+class _FieldExtractor(HTMLParser):
+    """
+    Streams through a page keeping only what a profile asks for: the text of elements
+    matching simple CSS selectors, JSON-LD Product data and meta tags. Raises _AllFound
+    once every field has its first-choice value, so the rest of the page is skipped.
+    """
+
+    def __init__(self, profile: dict):
+        super().__init__(convert_charrefs=True)
+        self.found = {field: {} for field in profile}  # field -> {source index: value}
+        self.selectors = []  # (field, source index, part, parts, parsed selector) not matched yet
+        self.metas = {}  # meta name -> [(field, source index)]
+        self.json_ld = []  # (field, source index, path)
+        self.parts = {}  # (field, source index) -> {part: text}
+        self.captures = []  # Elements whose text is being collected
+        self.json_text = None
+
+        for field, sources in profile.items():
+            for index, source in enumerate(sources):
+                if "css" in source:
+                    selectors = _css_selectors(source)
+                    for part, selector in enumerate(selectors):
+                        self.selectors.append((field, index, part, len(selectors), _simple_selector(selector)))
+                elif "meta" in source:
+                    self.metas.setdefault(source["meta"].lower(), []).append((field, index))
+                elif "json_ld" in source:
+                    self.json_ld.append((field, index, source["json_ld"]))
+
+    def _found(self, field: str, index: int, value):
+        if value is None or str(value).strip() == "":
+            return
+        self.found[field].setdefault(index, str(value).strip())
+        if all(0 in values for values in self.found.values()):
+            raise _AllFound
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if tag == "meta":
+            name = (attributes.get("property") or attributes.get("name") or attributes.get("itemprop") or "").lower()
+            for field, index in self.metas.get(name, ()):
+                self._found(field, index, attributes.get("content"))
             return
+        if tag == "script" and self.json_ld and (attributes.get("type") or "").lower() == "application/ld+json":
+            self.json_text = []
+            return
+
+        for capture in self.captures:
+            if capture["tag"] == tag:
+                capture["depth"] += 1
+        if tag in _VOID_TAGS or not self.selectors:
+            return
+        element_id = attributes.get("id")
+        classes = set((attributes.get("class") or "").split())
+        for entry in list(self.selectors):
+            selector_tag, selector_id, selector_classes = entry[4]
+            if (selector_tag in (None, tag) and (selector_id is None or selector_id == element_id)
+                    and selector_classes <= classes):
+                self.selectors.remove(entry)
+                self.captures.append({"tag": tag, "depth": 1, "text": [], "entry": entry})
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self.json_text is not None:
+            text, self.json_text = "".join(self.json_text), None
+            for product in _json_ld_products(text):
+                for field, index, path in self.json_ld:
+                    self._found(field, index, _json_path(product, path))
+            return
+
+        for capture in list(self.captures):
+            if capture["tag"] != tag:
+                continue
+            capture["depth"] -= 1
+            if capture["depth"] == 0:
+                self.captures.remove(capture)
+                field, index, part, parts, _ = capture["entry"]
+                texts = self.parts.setdefault((field, index), {})
+                texts[part] = "".join(capture["text"]).strip()
+                if len(texts) == parts:
+                    self._found(field, index, "".join(texts[number] for number in range(parts)))
+
+    def handle_data(self, data):
+        if self.json_text is not None:
+            self.json_text.append(data)
+        for capture in self.captures:
+            capture["text"].append(data)
+
+def _extract_with_soup(content: bytes, profile: dict) -> dict:
+    """Slow path for profiles with complex CSS selectors: builds the full tree."""
+    soup = BeautifulSoup(content, "html.parser")
+    products = [product for script in soup.find_all("script", type="application/ld+json")
+                for product in _json_ld_products(script.string or "")]
+    fields = {}
+    for field, sources in profile.items():
+        for source in sources:
+            value = None
+            if "css" in source:
+                elements = [soup.select_one(selector) for selector in _css_selectors(source)]
+                if all(elements):
+                    value = "".join(element.get_text().strip() for element in elements)
+            elif "meta" in source:
+                for attribute in ("property", "name", "itemprop"):
+                    element = soup.find("meta", attrs={attribute: source["meta"]})
+                    if element and element.get("content"):
+                        value = element["content"]
+                        break
+            elif "json_ld" in source:
+                value = next((found for found in (_json_path(product, source["json_ld"]) for product in products)
+                              if found is not None), None)
+            if value is not None and str(value).strip():
+                fields[field] = str(value).strip()
+                break
+    return fields
+
+def extract_fields(content: bytes, profile: dict, encoding: Optional[str] = None) -> dict:
+    """
+    Returns {field: text} for every field of the profile found in the page. Uses the
+    streaming extractor when the profile only has simple selectors. An unknown
+    encoding (e.g. a bogus charset in Content-Type) falls back to UTF-8.
+    """
+    if not _profile_is_simple(profile):
+        return _extract_with_soup(content, profile)
 
-        title = title_element.get_text().strip()
-        price_str = f"{price_whole_element.get_text().strip().replace(',', '')}{price_fraction_element.get_text().strip()}"
-        current_price = float(price_str)
-        
-        print(f"Product: {title}")
-        print(f"Current price: ${current_price}")
-
-        if current_price <= DESIRED_PRICE:
-            print("🎉 Price is below the desired threshold! Sending alert...")
-            send_alert(title, current_price)
-            return True # Return True to stop checking after a successful alert
-            
-    except requests.RequestException as e:
-        print(f"Error accessing the URL: {e}")
-    except (AttributeError, ValueError) as e:
-        print(f"Error parsing the page. The HTML structure has likely changed. Details: {e}")
-    
-    return False
-
-def send_alert(title, price):
-    """Sends an email notification about the price drop."""
-    if not EMAIL_ADDRESS or not EMAIL_PASSWORD:
-        print("WARNING: Email credentials are not configured. Cannot send alert.")
-        return
-
-    subject = f"Price Alert! {title}"
-    body = f"The product '{title}' has dropped to ${price}.\n\nBuy it now here: {PRODUCT_URL}"
-    message = f"Subject: {subject}\n\n{body}".encode('utf-8')
-    
     try:
-        with smtplib.SMTP(EMAIL_SMTP_SERVER, EMAIL_SMTP_PORT) as server:
-            server.starttls() # Secure the connection
-            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            server.sendmail(EMAIL_ADDRESS, EMAIL_ADDRESS, message)
-        print("✅ Email alert sent successfully.")
-    except Exception as e:
-        print(f"Error sending email: {e}")
+        codec = codecs.lookup(encoding or "utf-8")
+    except LookupError:
+        codec = codecs.lookup("utf-8")
+    extractor = _FieldExtractor(profile)
+    decoder = codec.incrementaldecoder(errors="replace")
+    try:
+        for start in range(0, len(content), PARSE_CHUNK_SIZE):
+            extractor.feed(decoder.decode(content[start:start + PARSE_CHUNK_SIZE]))
+        extractor.close()
+    except _AllFound:
+        pass
+    return {field: values[min(values)] for field, values in extractor.found.items() if values}
 
-if __name__ == "__main__":
-    if PRODUCT_URL == "URL_OF_THE_PRODUCT_YOU_WANT_TO_TRACK":
-        print("ERROR: Please configure the PRODUCT_URL in the script.")
+def match_domain(host: str, table: dict):
+    """
+    Looks a host up in a table keyed by domain: the host itself, then each parent
+    domain, then "name.*" keys for any of its labels. Falls back to table["default"].
+    """
+    labels = host.lower().rstrip(".").split(".")
+    for i in range(len(labels)):
+        domain = ".".join(labels[i:])
+        if domain in table:
+            return table[domain]
+    # The name has to be followed by a suffix, so "amazon.*" doesn't match a host called "amazon"
+    for label in labels[:-1]:
+        if label + ".*" in table:
+            return table[label + ".*"]
+    return table["default"]
+
+def profile_for(url: str, profiles: dict = EXTRACTION_PROFILES) -> dict:
+    return match_domain(urlsplit(url).hostname or "", profiles)
+
+def parse_product_page(content: bytes, profile: Optional[dict] = None, encoding: Optional[str] = None) -> tuple:
+    """
+    Returns (title, price) from a product page. Raises ValueError if the page
+    doesn't have the expected elements.
+    """
+    fields = extract_fields(content, profile or EXTRACTION_PROFILES["default"], encoding)
+    if "title" not in fields or "price" not in fields:
+        raise ValueError("Could not find title or price elements. The website structure may have changed.")
+    return fields["title"], parse_price(fields["price"])
+
+def load_catalog(path: Path = PRODUCT_CATALOG) -> list:
+    """
+    Reads the product catalog (JSON or CSV). Falls back to the single
+    PRODUCT_URL / DESIRED_PRICE product when there is no catalog file.
+    """
+    if not path.exists():
+        return [{"url": PRODUCT_URL, "desired_price": DESIRED_PRICE}]
+
+    if path.suffix.lower() == ".csv":
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            products = list(csv.DictReader(f))
     else:
+        with open(path, "r", encoding="utf-8") as f:
+            products = json.load(f)
+
+    for product in products:
+        product["desired_price"] = float(product["desired_price"])
+    return products
+
+class TokenBucket:
+    """
+    Allows 'rate' requests per second on average, with bursts of up to 'burst'.
+    acquire() blocks until a token is free. Safe to share between threads.
+    """
+
+    def __init__(self, rate: float, burst: int, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self):
         while True:
-            alert_sent = check_price()
-            if alert_sent:
-                print("Alert sent. Stopping the tracker.")
-                break
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+class PriceTracker:
+    """
+    Checks a catalog of products concurrently. Every retailer domain gets its own
+    pooled keep-alive session and token bucket, and pages are requested conditionally
+    (If-None-Match / If-Modified-Since) so an unchanged page costs a 304 and no parsing.
+    """
+
+    def __init__(self, products: list, max_workers: int = MAX_CONCURRENT_FETCHES,
+                 rate_limits: dict = DOMAIN_RATE_LIMITS, validators_path: Path = VALIDATORS_FILE,
+                 profiles: dict = EXTRACTION_PROFILES, history: Optional["PriceHistory"] = None,
+                 rules: list = ALERT_RULES):
+        self.products = products
+        self.history = history
+        self.rules = rules
+        self.max_workers = max_workers
+        self.rate_limits = rate_limits
+        self.profiles = profiles
+        self.validators_path = validators_path
+        self.validators = self._load_validators()
+        self.alerted = {}  # url -> price we last sent an alert for
+        self._domains = {}  # netloc -> (session, token bucket)
+        self._lock = threading.Lock()
+
+    def _load_validators(self) -> dict:
+        try:
+            with open(self.validators_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_validators(self):
+        try:
+            self.validators_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.validators_path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.validators, f)
+            os.replace(temp_path, self.validators_path)
+        except OSError as e:
+            print(f"Could not save '{self.validators_path}'. Error: {e}")
+
+    def _domain(self, url: str) -> tuple:
+        """Returns the (session, token bucket) for the URL's domain, creating them on first use."""
+        netloc = urlsplit(url).netloc.lower()
+        with self._lock:
+            if netloc not in self._domains:
+                rate, burst = match_domain(urlsplit(url).hostname or "", self.rate_limits)
+                session = requests.Session()
+                session.headers.update(HEADERS)
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONNECTIONS_PER_DOMAIN)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._domains[netloc] = (session, TokenBucket(rate, burst))
+            return self._domains[netloc]
+
+    def fetch(self, product: dict) -> dict:
+        """Fetches and parses one product page. Never raises; errors end up in the result."""
+        url = product["url"]
+        session, bucket = self._domain(url)
+        cached = self.validators.get(url)
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        result = {"url": url, "name": product.get("name"), "desired_price": product["desired_price"]}
+        bucket.acquire()
+        started = time.perf_counter()
+        try:
+            response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 304 and cached:
+                result.update(status="not_modified", title=cached["title"], price=cached["price"])
+            else:
+                response.raise_for_status()
+                # requests guesses ISO-8859-1 when there's no charset; the page's bytes are usually UTF-8
+                encoding = response.encoding if "charset" in response.headers.get("Content-Type", "") else None
+                title, price = parse_product_page(response.content, profile_for(url, self.profiles), encoding)
+                result.update(status="ok", title=title, price=price)
+                self.validators[url] = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "title": title,
+                    "price": price,
+                }
+        except requests.RequestException as e:
+            result.update(status="error", error=f"Error accessing the URL: {e}")
+        except (AttributeError, ValueError, LookupError) as e:
+            result.update(status="error", error=f"Error parsing the page. The HTML structure has likely changed. Details: {e}")
+        result["elapsed"] = time.perf_counter() - started
+        return result
+
+    def _interleaved(self) -> list:
+        """Orders products round-robin by domain so the workers don't all queue on one rate limit."""
+        by_domain = defaultdict(list)
+        for product in self.products:
+            by_domain[urlsplit(product["url"]).netloc.lower()].append(product)
+        return [product for product in chain.from_iterable(zip_longest(*by_domain.values())) if product is not None]
+
+    def sweep(self, notify=None) -> list:
+        """
+        Checks every product once, records the prices and sends one digest covering every
+        product that is at or below its desired price (unless it was already alerted at
+        that price or lower) or that triggered one of the history rules.
+        """
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.fetch, self._interleaved()))
+
+        counts = defaultdict(int)
+        alerts = {}
+        for result in results:
+            counts[result["status"]] += 1
+            if result["status"] == "error":
+                print(f"🚨 {result['url']}: {result['error']}")
+                continue
+
+            url, price = result["url"], result["price"]
+            if price > result["desired_price"]:
+                self.alerted.pop(url, None)  # Back above the threshold; alert again next time it drops
+            elif url not in self.alerted or price < self.alerted[url]:
+                alerts[url] = {"title": result["title"], "price": price, "url": url,
+                               "reasons": [f"at or below your target of ${result['desired_price']:.2f}"]}
+                self.alerted[url] = price
+
+        if self.history is not None:
+            for alert in self.history.record_sweep(results, self.rules):
+                alerts.setdefault(alert["url"], dict(alert, reasons=[]))["reasons"].extend(alert["reasons"])
+
+        if alerts:
+            for alert in alerts.values():
+                print(f"🎉 {alert['title']} is ${alert['price']:.2f}: {'; '.join(alert['reasons'])}")
+            (notify or send_digest)(list(alerts.values()))
+
+        self._save_validators()
+        print(f"Checked {len(results)} products in {time.perf_counter() - started:.2f} s: "
+              f"{counts['ok']} fetched, {counts['not_modified']} unchanged (304), "
+              f"{counts['error']} errors, {len(alerts)} alerts")
+        return results
+
+class PriceHistory:
+    """
+    Every observed price in SQLite (WAL mode): one row per product and check, keyed and
+    clustered by (product, time), with prices in cents. Each product's last price and
+    its lowest price in every rule window are kept up to date as rows come in, so the
+    alert rules never scan the history; only when a window's lowest price ages out of
+    the window is that one product's window read again, through the index.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY,
+            url TEXT UNIQUE NOT NULL,
+            title TEXT,
+            first_at INTEGER,
+            last_price INTEGER,
+            last_at INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS observations (
+            product_id INTEGER NOT NULL,
+            observed_at INTEGER NOT NULL,
+            price INTEGER NOT NULL,
+            PRIMARY KEY (product_id, observed_at)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS window_lows (
+            product_id INTEGER NOT NULL,
+            days INTEGER NOT NULL,
+            price INTEGER NOT NULL,
+            observed_at INTEGER NOT NULL,
+            PRIMARY KEY (product_id, days)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: Path = HISTORY_DB):
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+
+        # The maintained aggregates, loaded once and written back after every sweep
+        self.products = {
+            url: {"id": product_id, "first_at": first_at, "last_price": last_price}
+            for product_id, url, first_at, last_price in
+            self.db.execute("SELECT id, url, first_at, last_price FROM products")
+        }
+        self.lows = {
+            (product_id, days): (price, observed_at)
+            for product_id, days, price, observed_at in
+            self.db.execute("SELECT product_id, days, price, observed_at FROM window_lows")
+        }
+
+    def _product(self, url: str, title: str, now: int) -> dict:
+        product = self.products.get(url)
+        if product is None:
+            cursor = self.db.execute("INSERT INTO products (url, title, first_at) VALUES (?, ?, ?)", (url, title, now))
+            product = self.products[url] = {"id": cursor.lastrowid, "first_at": now, "last_price": None}
+        return product
+
+    def _window_low(self, product_id: int, days: int, now: int) -> Optional[tuple]:
+        """The lowest (price, time) in the last 'days' days, from the aggregate or, if it expired, the index."""
+        low = self.lows.get((product_id, days))
+        if low is None or low[1] < now - days * 86400:
+            low = self.db.execute(
+                "SELECT price, observed_at FROM observations WHERE product_id = ? AND observed_at >= ? "
+                "ORDER BY price, observed_at DESC LIMIT 1",
+                (product_id, now - days * 86400),
+            ).fetchone()
+            self.lows[(product_id, days)] = low
+        return low
+
+    def record_sweep(self, results: list, rules: list, now: Optional[int] = None) -> list:
+        """
+        Stores one observation per successful result in a single transaction and returns
+        [{"title", "price", "url", "reasons"}] for the products that triggered a rule.
+        """
+        now = int(now if now is not None else time.time())
+        alerts, observations, low_updates = [], [], {}
+
+        with self.db:
+            for result in results:
+                if result["status"] == "error":
+                    continue
+                price = round(result["price"] * 100)
+                product = self._product(result["url"], result["title"], now)
+                product_id, previous = product["id"], product["last_price"]
+                reasons = []
+
+                for rule in rules:
+                    if rule["type"] == "drop_percent":
+                        if previous and price <= previous * (1 - rule["percent"] / 100):
+                            reasons.append(f"down {(previous - price) / previous:.0%} from ${previous / 100:.2f}")
+                    elif rule["type"] == "lowest_in_days":
+                        days = rule["days"]
+                        low = self._window_low(product_id, days, now)
+                        if low is not None and price < low[0]:
+                            if product["first_at"] <= now - days * 86400:
+                                reasons.append(f"lowest price in {days} days")
+                            else:
+                                since = time.strftime("%Y-%m-%d", time.localtime(product["first_at"]))
+                                reasons.append(f"lowest price since tracking started on {since}")
+                        if low is None or price <= low[0]:
+                            self.lows[(product_id, days)] = (price, now)
+                            low_updates[(product_id, days)] = (product_id, days, price, now)
+
+                if reasons:
+                    alerts.append({"title": result["title"], "price": result["price"],
+                                   "url": result["url"], "reasons": reasons})
+                product["last_price"] = price
+                observations.append((product_id, now, price, result["title"]))
+
+            self.db.executemany(
+                "INSERT OR REPLACE INTO observations (product_id, observed_at, price) VALUES (?, ?, ?)",
+                [row[:3] for row in observations],
+            )
+            self.db.executemany(
+                "UPDATE products SET last_price = ?, last_at = ?, title = ? WHERE id = ?",
+                [(price, observed_at, title, product_id) for product_id, observed_at, price, title in observations],
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO window_lows (product_id, days, price, observed_at) VALUES (?, ?, ?, ?)",
+                list(low_updates.values()),
+            )
+        return alerts
+
+    def close(self):
+        self.db.close()
+
+class AlertMailer:
+    """
+    Sends each sweep's alerts as one digest email. The SMTP session (connection,
+    STARTTLS and login) is kept open and reused for the next digest as long as the
+    server still answers NOOP.
+    """
+
+    def __init__(self, host: str = EMAIL_SMTP_SERVER, port: int = EMAIL_SMTP_PORT,
+                 user: Optional[str] = EMAIL_ADDRESS, password: Optional[str] = EMAIL_PASSWORD,
+                 starttls: bool = EMAIL_SMTP_STARTTLS, recipient: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.recipient = recipient or user
+        self.smtp = None
+        self.sessions = 0
+
+    def _session(self) -> smtplib.SMTP:
+        if self.smtp is not None:
+            try:
+                if self.smtp.noop()[0] == 250:
+                    return self.smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+
+        smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            smtp.starttls() # Secure the connection
+        smtp.login(self.user, self.password)
+        self.smtp = smtp
+        self.sessions += 1
+        return smtp
+
+    def send_digest(self, alerts: list):
+        """Emails every alert from one sweep in a single message."""
+        if not self.user or not self.password:
+            print("WARNING: Email credentials are not configured. Cannot send alert.")
+            return
+
+        message = EmailMessage()
+        if len(alerts) == 1:
+            message["Subject"] = f"Price Alert! {alerts[0]['title']}"
+        else:
+            message["Subject"] = f"Price Alert! {len(alerts)} products dropped in price"
+        message["From"] = self.user
+        message["To"] = self.recipient
+        message.set_content("\n\n".join(
+            f"{alert['title']} is now ${alert['price']:.2f} ({'; '.join(alert['reasons'])}).\n"
+            f"Buy it now here: {alert['url']}"
+            for alert in alerts
+        ))
+
+        try:
+            self._session().send_message(message)
+            print(f"✅ Email digest with {len(alerts)} alert(s) sent successfully.")
+        except (smtplib.SMTPException, OSError) as e:
+            self.close()
+            print(f"Error sending email: {e}")
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
+
+def send_digest(alerts: list):
+    """Sends one digest through a fresh session, for callers without an AlertMailer."""
+    mailer = AlertMailer()
+    mailer.send_digest(alerts)
+    mailer.close()
+
+def track_prices(products: list, once: bool = False):
+    """Checks the whole catalog every CHECK_INTERVAL seconds. Alerts don't stop the tracker."""
+    history = PriceHistory()
+    mailer = AlertMailer()
+    tracker = PriceTracker(products, history=history)
+    try:
+        while True:
+            tracker.sweep(mailer.send_digest)
+            if once:
+                return
             print(f"Next check in {CHECK_INTERVAL // 3600} hour(s)...")
             time.sleep(CHECK_INTERVAL)
+    finally:
+        mailer.close()
+        history.close()
+
+class _StubProductHandler(BaseHTTPRequestHandler):
+    """
+    A keep-alive stub retailer used by the benchmark. /product/<n> returns an
+    Amazon-like page, honours If-None-Match, and takes 'delay' seconds per request.
+    """
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.02
+    filler = "<div class='review'>" + "Great product, would buy again. " * 40 + "</div>\n"
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        server = self.server
+        try:
+            number = int(self.path.rsplit("/", 1)[1])
+            price = server.prices[number]
+        except (ValueError, KeyError):
+            self.send_error(404)
+            return
+
+        server.requests += 1
+        etag = f'"{number}-{price}"'
+        if self.headers.get("If-None-Match") == etag:
+            server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        whole, fraction = f"{price:.2f}".split(".")
+        body = (
+            f"<html><head><title>Product {number}</title></head><body>\n"
+            + self.filler * 60
+            + f"<span id='productTitle'> Product {number} </span>\n"
+            + f"<span class='a-price-whole'>{int(whole):,}.</span><span class='a-price-fraction'>{fraction}</span>\n"
+            + self.filler * 60
+            + "</body></html>"
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(usegmt=True))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class _StubRetailer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, prices: dict):
+        super().__init__(("127.0.0.1", 0), _StubProductHandler)
+        self.prices = prices
+        self.requests = 0
+        self.not_modified = 0
+
+class _StubSmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP (EHLO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, RSET, QUIT) for the benchmark."""
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost stub SMTP")
+        for line in self.rfile:
+            command = line.decode("ascii", "replace").strip().split(" ", 1)[0].upper()
+            if command in ("EHLO", "HELO"):
+                self.wfile.write(b"250-localhost\r\n")
+                self.reply("250 AUTH PLAIN")
+            elif command == "AUTH":
+                with server.lock:
+                    server.logins += 1
+                self.reply("235 Authentication successful")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for data in self.rfile:
+                    if data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data)
+                with server.lock:
+                    server.messages += 1
+                    server.received.append(b"".join(lines))
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:  # MAIL, RCPT, NOOP, RSET
+                self.reply("250 OK")
+
+class _StubSmtpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StubSmtpHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.logins = 0
+        self.messages = 0
+        self.received = []  # Raw DATA of every message
+
+def benchmark(product_count: int = 200, domains: int = 4, delay: float = 0.02):
+    """
+    Runs the old one-page-at-a-time check and two sweeps of the concurrent tracker
+    against local stub retailers. Between the sweeps 10% of the prices drop, and the
+    resulting alerts are mailed to a stub SMTP server once per alert, as before, and
+    as one digest.
+    """
+    _StubProductHandler.delay = delay
+    servers = [_StubRetailer({}) for _ in range(domains)]
+    products = []
+    for number in range(product_count):
+        server = servers[number % domains]
+        server.prices[number] = 150.0 + number
+        products.append({
+            "url": f"http://127.0.0.1:{server.server_address[1]}/product/{number}",
+            "desired_price": 120.0,
+            "name": f"Product {number}",
+        })
+    smtp_server = _StubSmtpServer()
+    for server in servers + [smtp_server]:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    alerts = []
+    smtp_settings = {"host": "127.0.0.1", "port": smtp_server.server_address[1],
+                     "user": "tracker@example.com", "password": "secret", "starttls": False}
+    try:
+        # The original check_price(): a fresh connection and a full parse for every page
+        started = time.perf_counter()
+        for product in products:
+            page = requests.get(product["url"], headers=HEADERS, timeout=REQUEST_TIMEOUT)
+            parse_with_full_tree(page.content)
+        sequential = time.perf_counter() - started
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Generous limits so the benchmark measures fetching, not waiting for tokens
+            history = PriceHistory(Path(temp_dir) / "history.db")
+            tracker = PriceTracker(products, rate_limits={"default": (200.0, 20)},
+                                   validators_path=Path(temp_dir) / "validators.json",
+                                   profiles={"default": EXTRACTION_PROFILES["amazon.*"]},
+                                   history=history)
+            started = time.perf_counter()
+            tracker.sweep(notify=alerts.extend)
+            cold = time.perf_counter() - started
+
+            changed = products[::10]
+            for product in changed:
+                number = int(product["url"].rsplit("/", 1)[1])
+                servers[number % domains].prices[number] = 99.0
+            started = time.perf_counter()
+            results = tracker.sweep(notify=alerts.extend)
+            warm = time.perf_counter() - started
+            history.close()
+
+        # The original send_alert(): a new SMTP session and login for every alert
+        started = time.perf_counter()
+        for alert in alerts:
+            mailer = AlertMailer(**smtp_settings)
+            mailer.send_digest([alert])
+            mailer.close()
+        per_alert = time.perf_counter() - started
+        per_alert_counts = (smtp_server.connections, smtp_server.logins, smtp_server.messages)
+
+        smtp_server.connections = smtp_server.logins = smtp_server.messages = 0
+        mailer = AlertMailer(**smtp_settings)
+        started = time.perf_counter()
+        mailer.send_digest(alerts)
+        mailer.send_digest(alerts)  # The next sweep's digest reuses the open session
+        digest = time.perf_counter() - started
+        mailer.close()
+        digest_counts = (smtp_server.connections, smtp_server.logins, smtp_server.messages)
+    finally:
+        for server in servers + [smtp_server]:
+            server.shutdown()
+            server.server_close()
+
+    not_modified = sum(1 for result in results if result["status"] == "not_modified")
+    print(f"\n{product_count} products on {domains} stub retailers ({delay * 1000:.0f} ms per request)")
+    print(f"Sequential, fresh connections:  {sequential:.2f} s")
+    print(f"Concurrent, first sweep:        {cold:.2f} s")
+    print(f"Concurrent, second sweep:       {warm:.2f} s ({not_modified} answered 304, "
+          f"{len(changed)} re-parsed, {len(alerts)} alerts)")
+    print(f"Email per alert:                {per_alert:.3f} s "
+          "({} connections, {} logins, {} messages)".format(*per_alert_counts))
+    print(f"Email digest, two sweeps:       {digest:.3f} s "
+          "({} connections, {} logins, {} messages)".format(*digest_counts))
+
+def _write_sample_fixtures(directory: Path):
+    """Writes three ~1 MB product pages: Amazon-style markup, JSON-LD, and meta tags."""
+    filler = "<div class='review'><p>" + "Great product, would buy again. " * 30 + "</p></div>\n"
+    scripts = "<script>var config = {" + "'flag': true, " * 500 + "};</script>\n"
+    head = "<head><meta charset='utf-8'><title>Sample product</title>" + scripts * 20
+    pages = {
+        "www.amazon.com": (
+            f"<html>{head}</head><body>{filler * 200}"
+            "<span id='productTitle'> Sample Headphones </span>"
+            "<span class='a-price'><span class='a-price-whole'>1,299<span class='a-price-decimal'>.</span></span>"
+            "<span class='a-price-fraction'>99</span></span>"
+            f"{filler * 600}</body></html>"
+        ),
+        "shop.example.com": (
+            f"<html>{head}"
+            '<script type="application/ld+json">{"@context": "https://schema.org", "@type": "Product", '
+            '"name": "Sample Headphones", "offers": {"@type": "Offer", "price": "1299.99", "priceCurrency": "USD"}}'
+            f"</script></head><body>{filler * 800}</body></html>"
+        ),
+        "store.example.org": (
+            f"<html>{head}<meta property='og:title' content='Sample Headphones'>"
+            f"<meta property='product:price:amount' content='1299.99'></head><body>{filler * 800}</body></html>"
+        ),
+    }
+    for domain, html in pages.items():
+        (directory / f"{domain}.html").write_text(html, encoding="utf-8")
+
+def benchmark_parsing(fixtures_dir: Optional[Path] = None, repeat: int = 10):
+    """
+    Compares the original full-tree parse with the profile extractor on saved pages.
+    A fixture's file name is the domain whose profile applies, e.g. www.amazon.com.html
+    (anything after '--' is ignored, so www.amazon.com--headphones.html works too).
+    Without a directory, three generated sample pages are used.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if fixtures_dir is None:
+            fixtures_dir = Path(temp_dir)
+            _write_sample_fixtures(fixtures_dir)
+
+        for path in sorted(fixtures_dir.glob("*.html")):
+            content = path.read_bytes()
+            profile = match_domain(path.stem.split("--")[0], EXTRACTION_PROFILES)
+            print(f"\n{path.name} ({len(content) / 1024:,.0f} KB)")
+
+            for label, parse in (("Full tree", parse_with_full_tree),
+                                 ("Profile", lambda page: parse_product_page(page, profile))):
+                def run():
+                    try:
+                        return parse(content)
+                    except ValueError:
+                        return "not found"  # The Amazon-only parser still pays for the whole tree
+
+                tracemalloc.start()
+                result = run()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    run()
+                elapsed = (time.perf_counter() - started) / repeat
+                print(f"  {label + ':':<11}{elapsed * 1000:8.1f} ms, peak {peak / 1024 / 1024:6.1f} MB -> {result}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Track product prices and email an alert when they drop.")
+    parser.add_argument("--catalog", type=Path, default=PRODUCT_CATALOG, help="JSON or CSV product catalog.")
+    parser.add_argument("--once", action="store_true", help="Check every product once and exit.")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=200, metavar="PRODUCTS",
+                        help="Compare one-by-one and concurrent checks against local stub retailers and exit.")
+    parser.add_argument("--benchmark-parse", type=Path, nargs="?", const=False, metavar="FIXTURES_DIR",
+                        help="Compare full-tree and profile parsing on saved .html pages (or generated samples) and exit.")
+    args = parser.parse_args()
+
+    if args.benchmark_parse is not None:
+        benchmark_parsing(args.benchmark_parse or None)
+    elif args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        catalog = load_catalog(args.catalog)
+        if any(product["url"] == "URL_OF_THE_PRODUCT_YOU_WANT_TO_TRACK" for product in catalog):
+            print("ERROR: Please configure the PRODUCT_URL in the script or create a product catalog.")
+        else:
+            try:
+                track_prices(catalog, args.once)
+            except KeyboardInterrupt:
+                print("\nTracker stopped by user.")
@@ -0,0 +1,154 @@
+import contextlib
+import email
+import email.policy
+import io
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from price_tracker import (EXTRACTION_PROFILES, AlertMailer, PriceTracker, TokenBucket, _StubProductHandler,
+                           _StubRetailer, _StubSmtpServer)
+
+
+class StubRetailerTests(unittest.TestCase):
+    """Sweeps against the benchmark's stub retailer: conditional requests and alerts."""
+
+    def setUp(self):
+        self.addCleanup(setattr, _StubProductHandler, "delay", _StubProductHandler.delay)
+        _StubProductHandler.delay = 0
+        self.server = _StubRetailer({number: 150.0 + number for number in range(20)})
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        port = self.server.server_address[1]
+        self.products = [{"url": f"http://127.0.0.1:{port}/product/{number}", "desired_price": 120.0,
+                          "name": f"Product {number}"} for number in range(20)]
+        self.tracker = PriceTracker(self.products, max_workers=4, rate_limits={"default": (1000.0, 20)},
+                                    validators_path=Path(directory.name) / "validators.json",
+                                    profiles={"default": EXTRACTION_PROFILES["amazon.*"]})
+        self.alerts = []
+
+    def sweep(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return {result["url"]: result for result in self.tracker.sweep(notify=self.alerts.extend)}
+
+    def test_first_sweep_parses_every_page(self):
+        results = self.sweep()
+        self.assertEqual(self.server.requests, 20)
+        self.assertEqual(self.server.not_modified, 0)
+        for number, product in enumerate(self.products):
+            result = results[product["url"]]
+            self.assertEqual(result["status"], "ok")
+            self.assertEqual(result["title"], f"Product {number}")
+            self.assertEqual(result["price"], 150.0 + number)
+        self.assertEqual(self.alerts, [])
+
+    def test_unchanged_pages_are_answered_with_304(self):
+        self.sweep()
+        for number in (3, 7):
+            self.server.prices[number] = 99.0
+        results = self.sweep()
+
+        self.assertEqual(self.server.requests, 40)
+        self.assertEqual(self.server.not_modified, 18)
+        statuses = {url: result["status"] for url, result in results.items()}
+        self.assertEqual(sorted(url for url, status in statuses.items() if status == "ok"),
+                         sorted(self.products[number]["url"] for number in (3, 7)))
+        # Unchanged pages keep the cached title and price
+        self.assertEqual(results[self.products[0]["url"]]["price"], 150.0)
+        self.assertEqual(sorted((alert["url"], alert["price"]) for alert in self.alerts),
+                         sorted((self.products[number]["url"], 99.0) for number in (3, 7)))
+
+    def test_no_second_alert_at_the_same_price(self):
+        self.server.prices[5] = 99.0
+        self.sweep()
+        self.sweep()
+        self.assertEqual(len(self.alerts), 1)
+
+    def test_a_missing_page_is_an_error_result(self):
+        del self.server.prices[4]
+        results = self.sweep()
+        self.assertEqual(results[self.products[4]["url"]]["status"], "error")
+        self.assertEqual(sum(result["status"] == "ok" for result in results.values()), 19)
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_waits_once_the_burst_is_spent(self):
+        now = [0.0]
+        waits = []
+
+        def sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2.0, burst=3, clock=lambda: now[0], sleep=sleep)
+        for _ in range(3):
+            bucket.acquire()
+        self.assertEqual(waits, [])
+        bucket.acquire()
+        self.assertEqual(waits, [0.5])
+
+
+class AlertMailerTests(unittest.TestCase):
+    """Digests sent to the benchmark's stub SMTP server."""
+
+    def setUp(self):
+        self.server = _StubSmtpServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.mailer = AlertMailer(host="127.0.0.1", port=self.server.server_address[1],
+                                  user="tracker@example.com", password="secret", starttls=False)
+        self.addCleanup(self.mailer.close)
+        self.alerts = [{"title": f"Product {number}", "price": 99.0 + number,
+                        "url": f"http://shop.example.com/product/{number}", "reasons": ["at or below your target"]}
+                       for number in range(3)]
+
+    def send(self, alerts):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.mailer.send_digest(alerts)
+
+    def received(self, index):
+        return email.message_from_bytes(self.server.received[index], policy=email.policy.default)
+
+    def test_one_message_for_all_alerts(self):
+        self.send(self.alerts)
+        self.assertEqual(self.server.messages, 1)
+        message = self.received(0)
+        self.assertEqual(message["Subject"], "Price Alert! 3 products dropped in price")
+        self.assertEqual(message["To"], "tracker@example.com")
+        body = message.get_content()
+        for alert in self.alerts:
+            self.assertIn(f"{alert['title']} is now ${alert['price']:.2f}", body)
+            self.assertIn(alert["url"], body)
+
+    def test_session_is_reused_between_digests(self):
+        self.send(self.alerts)
+        self.send(self.alerts[:1])
+        self.assertEqual((self.server.connections, self.server.logins, self.server.messages), (1, 1, 2))
+        self.assertEqual(self.received(1)["Subject"], "Price Alert! Product 0")
+
+    def test_reconnects_after_the_connection_drops(self):
+        self.send(self.alerts)
+        self.mailer.smtp.sock.shutdown(socket.SHUT_RDWR)
+        self.send(self.alerts)
+        self.assertEqual((self.server.connections, self.server.logins, self.server.messages), (2, 2, 2))
+        self.assertEqual(self.mailer.sessions, 2)
+
+    def test_nothing_is_sent_without_credentials(self):
+        self.mailer.password = None
+        self.send(self.alerts)
+        self.assertEqual(self.server.connections, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
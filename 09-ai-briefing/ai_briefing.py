@@ -1,5 +1,16 @@
 import requests
 import ollama
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import List, Dict, Optional
 
 # --- CONFIGURATION ---
@@ -8,30 +19,188 @@ NUMBER_OF_ARTICLES = 5
 
 # The local AI model you want to use for summarization
 AI_MODEL = 'phi3'
+
+# Where the Hacker News API and the Ollama server live (None = Ollama's default / $OLLAMA_HOST)
+HN_API_URL = "https://hacker-news.firebaseio.com/v0"
+OLLAMA_HOST = None
+REQUEST_TIMEOUT = 10
+
+# How many story details are downloaded at the same time (over reused keep-alive connections)
+FETCH_WORKERS = 16
+
+# How many summaries are requested from Ollama at the same time. More than the
+# server's OLLAMA_NUM_PARALLEL only makes requests wait in its queue.
+SUMMARY_WORKERS = 2
+
+# Hacker News items and the generated summaries are cached on disk between runs.
+# The ranking goes stale quickly, a story's title and URL hardly ever change, and
+# a summary is reused for as long as the story, model and prompt stay the same.
+# The least recently used summaries are removed once they pass SUMMARY_CACHE_MAX_BYTES.
+CACHE_DIR = Path.home() / ".cache" / "ai_briefing"
+TOP_STORIES_TTL = 10 * 60  # 10 minutes
+ITEM_TTL = 24 * 3600  # 1 day
+SUMMARY_CACHE_MAX_BYTES = 2 * 1024 * 1024  # 2 MiB
+
+# Bump this whenever the prompt below changes, so old cached summaries are not reused
+PROMPT_VERSION = "1"
 # ---------------------
 
-def get_hn_top_story_ids() -> List[int]:
+class ItemCache:
+    """
+    The top story IDs and every fetched item in one JSON file, each stored with the
+    time it was fetched. Entries older than their TTL count as misses and are
+    dropped on the next save.
+    """
+
+    def __init__(self, path: Path = CACHE_DIR / "items.json",
+                 top_stories_ttl: float = TOP_STORIES_TTL, item_ttl: float = ITEM_TTL):
+        self.path = path
+        self.top_stories_ttl = top_stories_ttl
+        self.item_ttl = item_ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        self.top_stories = data.get("top_stories")
+        self.items = data.get("items", {})
+
+    def get_top_stories(self) -> Optional[List[int]]:
+        with self.lock:
+            if self.top_stories and time.time() - self.top_stories["fetched_at"] < self.top_stories_ttl:
+                self.hits += 1
+                return self.top_stories["ids"]
+            self.misses += 1
+            return None
+
+    def put_top_stories(self, ids: List[int]):
+        with self.lock:
+            self.top_stories = {"fetched_at": time.time(), "ids": ids}
+
+    def get_item(self, story_id: int) -> Optional[Dict]:
+        with self.lock:
+            entry = self.items.get(str(story_id))
+            if entry and time.time() - entry["fetched_at"] < self.item_ttl:
+                self.hits += 1
+                return entry["item"]
+            self.misses += 1
+            return None
+
+    def put_item(self, story_id: int, item: Dict):
+        with self.lock:
+            self.items[str(story_id)] = {"fetched_at": time.time(), "item": item}
+
+    def save(self):
+        """Writes the unexpired entries back atomically."""
+        now = time.time()
+        with self.lock:
+            self.items = {key: entry for key, entry in self.items.items()
+                          if now - entry["fetched_at"] < self.item_ttl}
+            data = {"top_stories": self.top_stories, "items": self.items}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("w", dir=self.path.parent, delete=False, encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(f.name, self.path)
+        except OSError as e:
+            print(f"Could not write to the cache: {e}")
+
+class SummaryCache:
+    """
+    Summaries on disk with one file per entry. A file's modification time doubles
+    as its last-used time: hits touch the file, and eviction removes the least
+    recently used files first.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR / "summaries", max_bytes: int = SUMMARY_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(story_id: int, url: str, model: str = AI_MODEL, prompt_version: str = PROMPT_VERSION) -> str:
+        digest = hashlib.sha256()
+        for part in (prompt_version, model, str(story_id), url):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached summary, or None on a miss."""
+        path = self.directory / f"{key}.txt"
+        try:
+            text = path.read_text(encoding="utf-8")
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            text = None
+        with self.lock:
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return text
+
+    def put(self, key: str, text: str):
+        """Stores an entry and evicts old ones if the cache is too big."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp_path = self.directory / f"{key}.tmp"
+            temp_path.write_text(text, encoding="utf-8")
+            os.replace(temp_path, self.directory / f"{key}.txt")
+            with self.lock:
+                self.evict()
+        except OSError as e:
+            print(f"Could not write to the cache: {e}")
+
+    def evict(self):
+        entries = []
+        for path in self.directory.glob("*.txt"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+def make_session(pool_size: int = FETCH_WORKERS) -> requests.Session:
+    """A session whose connection pool is big enough for every fetch worker to keep its connection."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_hn_top_story_ids(session=requests, api_url: str = HN_API_URL) -> List[int]:
     """Gets the IDs of the top stories from the Hacker News API."""
     try:
-        url = "https://hacker-news.firebaseio.com/v0/topstories.json"
-        response = requests.get(url, timeout=10)
+        url = f"{api_url}/topstories.json"
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     except requests.RequestException as e:
         print(f"Error fetching story IDs from Hacker News: {e}")
         return []
 
-def get_article_details(story_id: int) -> Optional[Dict]:
+def get_article_details(story_id: int, session=requests, api_url: str = HN_API_URL) -> Optional[Dict]:
     """Gets the details (title, url) of a specific article by its ID."""
     try:
-        url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
-        response = requests.get(url, timeout=10)
+        url = f"{api_url}/item/{story_id}.json"
+        response = session.get(url, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
     except requests.RequestException:
         return None # Return None if fetching details fails
 
-def generate_summary_with_ai(title: str, url: str) -> str:
+def generate_summary_with_ai(title: str, url: str, client=None) -> str:
     """Uses a local LLM via Ollama to generate a summary of an article."""
     prompt = f"""
     You are a tech analyst providing a briefing for busy developers.
@@ -44,7 +213,7 @@ def generate_summary_with_ai(title: str, url: str) -> str:
     """
     try:
         print(f"🤖 Generating summary for: {title}")
-        response = ollama.chat(
+        response = (client or ollama).chat(
             model=AI_MODEL,
             messages=[{'role': 'user', 'content': prompt}]
         )
@@ -52,12 +221,119 @@ def generate_summary_with_ai(title: str, url: str) -> str:
     except Exception as e:
         return f"Could not generate summary. Error: {e}\nIs the Ollama server running and the model '{AI_MODEL}' pulled?"
 
-def main():
+def build_briefing(count: int = NUMBER_OF_ARTICLES, api_url: str = HN_API_URL, client=None,
+                   fetch_workers: int = FETCH_WORKERS, summary_workers: int = SUMMARY_WORKERS,
+                   timings: Optional[dict] = None, item_cache: Optional[ItemCache] = None,
+                   summary_cache: Optional[SummaryCache] = None) -> List[Dict]:
+    """
+    Fetches and summarizes the top 'count' stories that link to an article, as a
+    two-stage pipeline: story details are downloaded concurrently, and every article
+    is handed to the summarizer pool as soon as its rank is settled, so the LLM is
+    already busy while later details are still arriving. Only as many details as
+    can still be needed are requested. Items and summaries found in the caches, if
+    given, skip the network and the LLM. Returns [{"title", "url", "summary"}] in
+    ranking order. Stage durations are written into the 'timings' dict, if given.
+    """
+    client = client or ollama.Client(host=OLLAMA_HOST)
+    timings = {} if timings is None else timings
+    session = make_session(fetch_workers)
+    started = time.perf_counter()
+
+    story_ids = item_cache.get_top_stories() if item_cache else None
+    if story_ids is None:
+        story_ids = get_hn_top_story_ids(session, api_url)
+        if story_ids and item_cache:
+            item_cache.put_top_stories(story_ids)
+    timings["story_ids"] = time.perf_counter() - started
+    if not story_ids:
+        session.close()
+        return []
+
+    fetch_time, summary_time = [0.0], [0.0]
+    lock = threading.Lock()
+
+    def fetch(story_id):
+        details = item_cache.get_item(story_id) if item_cache else None
+        if details is not None:
+            return details
+        fetch_started = time.perf_counter()
+        details = get_article_details(story_id, session, api_url)
+        with lock:
+            fetch_time[0] += time.perf_counter() - fetch_started
+        if details is not None and item_cache:
+            item_cache.put_item(story_id, details)
+        return details
+
+    def summarize(details):
+        key = SummaryCache.make_key(details["id"], details["url"]) if summary_cache else None
+        summary = summary_cache.get(key) if summary_cache else None
+        if summary is None:
+            summary_started = time.perf_counter()
+            summary = generate_summary_with_ai(details["title"], details["url"], client)
+            with lock:
+                summary_time[0] += time.perf_counter() - summary_started
+            if summary_cache and not summary.startswith("Could not generate summary."):
+                summary_cache.put(key, summary)
+        return {"title": details["title"], "url": details["url"], "summary": summary}
+
+    pending_ids = iter(story_ids)
+    fetches, summaries = [], []
+    position = 0
+
+    def top_up():
+        # Keep fetch_workers details in flight beyond the ones that are still needed
+        wanted = position + (count - len(summaries)) + fetch_workers
+        for story_id in islice(pending_ids, max(0, wanted - len(fetches))):
+            fetches.append(fetch_pool.submit(fetch, story_id))
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+            ThreadPoolExecutor(max_workers=summary_workers) as summary_pool:
+        top_up()
+        while position < len(fetches) and len(summaries) < count:
+            details = fetches[position].result()
+            position += 1
+            # We only want to summarize actual articles, which typically have a URL
+            if details and 'title' in details and 'url' in details:
+                summaries.append(summary_pool.submit(summarize, details))
+            top_up()
+        for future in fetches[position:]:
+            future.cancel()
+        timings["fetch"] = time.perf_counter() - started
+
+        articles = [future.result() for future in summaries]
+        timings["summarize"] = time.perf_counter() - started
+
+    session.close()
+    if item_cache:
+        item_cache.save()
+    timings["total"] = time.perf_counter() - started
+    timings["fetch_busy"] = fetch_time[0]
+    timings["summarize_busy"] = summary_time[0]
+    timings["details_fetched"] = sum(1 for future in fetches if future.done() and not future.cancelled())
+    return articles
+
+def print_timings(timings: dict):
+    print(f"⏱️  Story IDs {timings['story_ids']:.2f} s | details done after {timings['fetch']:.2f} s "
+          f"({timings['details_fetched']} fetched, {timings['fetch_busy']:.2f} s of requests) | "
+          f"summaries done after {timings['summarize']:.2f} s ({timings['summarize_busy']:.2f} s of LLM calls) | "
+          f"total {timings['total']:.2f} s")
+
+def print_cache_stats(item_cache: ItemCache, summary_cache: SummaryCache):
+    for name, cache in (("HN items", item_cache), ("summaries", summary_cache)):
+        lookups = cache.hits + cache.misses
+        rate = f"{cache.hits / lookups:.0%}" if lookups else "n/a"
+        print(f"🗃️  Cache {name}: {cache.hits}/{lookups} hits ({rate})")
+
+def main(count: int = NUMBER_OF_ARTICLES, summary_workers: int = SUMMARY_WORKERS, use_cache: bool = True):
     """Main function to generate and print the tech news briefing."""
     print("Generating your daily tech news briefing...")
-    story_ids = get_hn_top_story_ids()
-    
-    if not story_ids:
+    timings = {}
+    item_cache = ItemCache() if use_cache else None
+    summary_cache = SummaryCache() if use_cache else None
+    articles = build_briefing(count, summary_workers=summary_workers, timings=timings,
+                              item_cache=item_cache, summary_cache=summary_cache)
+
+    if not articles:
         print("Could not retrieve top stories. Exiting.")
         return
 
@@ -65,24 +341,164 @@ def main():
     print("☕ YOUR TECH MORNING BRIEFING ☕")
     print("=============================================\n")
 
-    articles_summarized = 0
-    for story_id in story_ids:
-        if articles_summarized >= NUMBER_OF_ARTICLES:
-            break
-        
-        details = get_article_details(story_id)
-        # We only want to summarize actual articles, which typically have a URL
-        if details and 'title' in details and 'url' in details:
-            title = details['title']
-            article_url = details['url']
-            
-            summary = generate_summary_with_ai(title, article_url)
-            
-            print(f"📰 Title: {title}")
-            print(f"🔗 Link: {article_url}")
-            print(f"📝 AI Summary: {summary}\n")
-            print("---------------------------------------------\n")
-            articles_summarized += 1
+    for article in articles:
+        print(f"📰 Title: {article['title']}")
+        print(f"🔗 Link: {article['url']}")
+        print(f"📝 AI Summary: {article['summary']}\n")
+        print("---------------------------------------------\n")
+    print_timings(timings)
+    if use_cache:
+        print_cache_stats(item_cache, summary_cache)
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    A keep-alive stand-in for both the Hacker News API (GET /v0/...) and Ollama
+    (POST /api/chat). Every request takes the server's 'delay' seconds; chats take
+    'llm_delay' seconds and at most 'llm_parallel' are processed at once, like
+    OLLAMA_NUM_PARALLEL.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.delay)
+        with server.lock:
+            server.item_requests += 1
+        if self.path == "/v0/topstories.json":
+            self.send_json(list(server.items))
+        elif self.path.startswith("/v0/item/"):
+            story_id = int(self.path.rsplit("/", 1)[1].split(".")[0])
+            self.send_json(server.items.get(story_id))
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.llm_slots:
+            with server.lock:
+                server.llm_requests += 1
+            time.sleep(server.llm_delay)
+        title = request["messages"][-1]["content"].split("ARTICLE TITLE: ", 1)[-1].split("\n", 1)[0]
+        self.send_json({
+            "model": request.get("model"),
+            "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": f"A short summary of {title}."},
+            "done": True,
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, story_count: int, delay: float, llm_delay: float, llm_parallel: int):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.delay = delay
+        self.llm_delay = llm_delay
+        self.llm_slots = threading.BoundedSemaphore(llm_parallel)
+        self.lock = threading.Lock()
+        self.item_requests = 0
+        self.llm_requests = 0
+        # Every fourth story is an "Ask HN" without a URL, and one was deleted
+        self.items = {}
+        for story_id in range(1000, 1000 + story_count):
+            item = {"id": story_id, "type": "story", "title": f"Story {story_id}"}
+            if story_id % 4:
+                item["url"] = f"https://example.com/{story_id}"
+            self.items[story_id] = item
+        self.items[1001] = None
+
+    def add_top_stories(self, count: int):
+        """Puts 'count' new stories with URLs at the top of the ranking."""
+        first = max(self.items) + 1
+        new = {story_id: {"id": story_id, "type": "story", "title": f"Story {story_id}",
+                          "url": f"https://example.com/{story_id}"}
+               for story_id in range(first, first + count)}
+        self.items = {**new, **self.items}
+
+def benchmark(count: int = NUMBER_OF_ARTICLES, delay: float = 0.05, llm_delay: float = 0.5, llm_parallel: int = 2):
+    """
+    Builds the same briefing the original way (one story at a time, a new connection
+    per request, waiting for each summary) and with the pipeline, against a local
+    stand-in for the Hacker News API and Ollama. Then the pipeline runs twice more
+    with empty caches and again after two new stories reached the top, as a repeat
+    briefing later in the day would.
+    """
+    server = _StubServer(500, delay, llm_delay, llm_parallel)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_address[1]}"
+    api_url = f"{host}/v0"
+    client = ollama.Client(host=host)
+
+    try:
+        started = time.perf_counter()
+        sequential = []
+        for story_id in get_hn_top_story_ids(api_url=api_url):
+            if len(sequential) >= count:
+                break
+            details = get_article_details(story_id, api_url=api_url)
+            if details and 'title' in details and 'url' in details:
+                sequential.append(generate_summary_with_ai(details['title'], details['url'], client))
+        sequential_time = time.perf_counter() - started
+        sequential_requests = server.item_requests
+
+        server.item_requests = 0
+        timings = {}
+        articles = build_briefing(count, api_url, client, summary_workers=llm_parallel, timings=timings)
+        pipeline_requests = server.item_requests
+
+        cached_runs = []
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for run in ("first", "repeat"):
+                if run == "repeat":
+                    server.add_top_stories(2)
+                server.item_requests = server.llm_requests = 0
+                # The ranking is always re-fetched, as if the TTL ran out between the runs
+                item_cache = ItemCache(Path(temp_dir) / "items.json", top_stories_ttl=0)
+                summary_cache = SummaryCache(Path(temp_dir) / "summaries")
+                cached_timings = {}
+                build_briefing(count, api_url, client, summary_workers=llm_parallel, timings=cached_timings,
+                               item_cache=item_cache, summary_cache=summary_cache)
+                cached_runs.append((run, cached_timings, server.item_requests, server.llm_requests,
+                                    item_cache, summary_cache))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    same = [article["summary"] for article in articles] == sequential
+    print(f"\n{count} articles, {delay * 1000:.0f} ms per API request, {llm_delay * 1000:.0f} ms per summary, "
+          f"{llm_parallel} summaries in parallel")
+    print(f"Sequential: {sequential_time:.2f} s ({sequential_requests} API requests)")
+    print(f"Pipeline:   {timings['total']:.2f} s ({pipeline_requests} API requests, "
+          f"{'same' if same else 'DIFFERENT'} briefing in the same order)")
+    print_timings(timings)
+    for run, cached_timings, api_requests, llm_requests, item_cache, summary_cache in cached_runs:
+        print(f"\nCached, {run} run: {cached_timings['total']:.2f} s "
+              f"({api_requests} API requests, {llm_requests} LLM calls)")
+        print_cache_stats(item_cache, summary_cache)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Summarize the top Hacker News stories with a local LLM.")
+    parser.add_argument("-n", "--articles", type=int, default=NUMBER_OF_ARTICLES, help="Number of articles to summarize.")
+    parser.add_argument("--llm-concurrency", type=int, default=SUMMARY_WORKERS,
+                        help="Summaries requested from Ollama at the same time.")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and don't update the on-disk caches.")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Compare the sequential and pipelined briefing against a local stand-in and exit.")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.articles, llm_parallel=args.llm_concurrency)
+    else:
+        main(args.articles, args.llm_concurrency, not args.no_cache)